@@ -0,0 +1,151 @@
+# ==============================================================================
+# API HTTP HYDROLOGIC
+# Servicio asíncrono (aiohttp) para integrar el dimensionado con el ERP.
+#
+#   POST /calcular          una obra (JSON con campos ENTRADAS) -> JSON entrada + SALIDAS
+#   POST /calcular/batch    NDJSON (una obra por línea) -> NDJSON en streaming, en el mismo orden
+#   POST /informe           {"obra": {...}, "usuario": {"empresa", "logo_url"}} -> application/pdf
+#   GET  /salud             estado y versión del catálogo
+#
+# /informe descarga el logo_url desde el servidor: solo se aceptan URLs que empiecen por uno de los prefijos
+# de HYDROLOGIC_API_LOGOS (separados por comas, p.ej. el bucket público de logos); el resto llevan el logo
+# de HYDROLOGIC. Sin la variable no se descarga ninguno.
+#
+#   python api.py --host 127.0.0.1 --port 8080 --procesos 4
+# ==============================================================================
+import argparse
+import asyncio
+import json
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from aiohttp import web
+
+from motor import dimensionar_fila, catalogo_actual
+
+BLOQUE = 1000          # obras por tarea del pool en /calcular/batch
+NDJSON = 'application/x-ndjson'
+LOGOS_PERMITIDOS = tuple(p.strip() for p in os.environ.get("HYDROLOGIC_API_LOGOS", "").split(",") if p.strip())
+
+# ------------------------------------------------------------------------------
+# Trabajo CPU (se ejecuta en los procesos del pool)
+# ------------------------------------------------------------------------------
+def _no_finito(c):
+    raise ValueError(f"{c} no es un número válido")
+
+def _real(s):
+    v = float(s)
+    return v if math.isfinite(v) else _no_finito(s)
+
+def _cargar(texto):
+    """json.loads sin NaN/Infinity ni reales desbordados (1e400): no son JSON estándar y no podrían devolverse."""
+    return json.loads(texto, parse_constant=_no_finito, parse_float=_real)
+
+def _fila(fila):
+    """dimensionar_fila() que nunca lanza: en /calcular/batch la respuesta ya está empezada y un fallo cortaría el stream."""
+    try: return dimensionar_fila(fila)
+    except Exception as e: return {**fila, 'error': f"{type(e).__name__}: {e}"}
+
+def _linea(linea):
+    try: fila = _cargar(linea)
+    except ValueError as e: return {'error': f"JSON inválido: {e}"}
+    return _fila(fila) if isinstance(fila, dict) else {'error': "Cada línea debe ser un objeto JSON"}
+
+def _bloque(lineas):
+    return "".join(json.dumps(_linea(l), ensure_ascii=False) + "\n" for l in lineas).encode()
+
+def _informe(obra, usuario):
+    from informe import informe_fila
+    return informe_fila(obra, usuario)
+
+# ------------------------------------------------------------------------------
+# Rutas
+# ------------------------------------------------------------------------------
+rutas = web.RouteTableDef()
+
+async def _json(request):
+    try: return await request.json(loads=_cargar)
+    except ValueError as e: raise web.HTTPBadRequest(text=json.dumps({'error': f"JSON inválido: {e}"}, ensure_ascii=False), content_type='application/json')
+
+def _usuario(usuario):
+    """Empresa y logo_url del informe como textos; ValueError si no lo son. Un logo_url no permitido se descarta."""
+    if usuario is None: usuario = {}
+    if not isinstance(usuario, dict): raise ValueError("'usuario' debe ser un objeto JSON")
+    for k in ('empresa', 'logo_url'):
+        if not isinstance(usuario.get(k) or "", str): raise ValueError(f"'usuario.{k}' debe ser texto")
+    logo = usuario.get('logo_url') or ""
+    return {'empresa': usuario.get('empresa') or "HYDROLOGIC", 'logo_url': logo if logo.startswith(LOGOS_PERMITIDOS) else ""}
+
+@rutas.get('/salud')
+async def salud(request):
+    return web.json_response({'ok': True, 'catalogo': catalogo_actual().version})
+
+@rutas.post('/calcular')
+async def calcular(request):
+    fila = await _json(request)
+    if not isinstance(fila, dict): return web.json_response({'error': "Se esperaba un objeto JSON"}, status=400)
+    # Una obra cuesta decenas de microsegundos: se calcula en el propio bucle, sin ida y vuelta al pool.
+    out = _fila(fila)
+    return web.json_response(out, status=422 if 'error' in out else 200, dumps=lambda o: json.dumps(o, ensure_ascii=False))
+
+@rutas.post('/calcular/batch')
+async def calcular_batch(request):
+    loop, pool = asyncio.get_running_loop(), request.app['pool']
+    resp = web.StreamResponse(headers={'Content-Type': NDJSON})
+    await resp.prepare(request)
+    en_vuelo, lineas = deque(), []
+
+    async def escribir(hasta):
+        while len(en_vuelo) > hasta: await resp.write(await en_vuelo.popleft())
+
+    async for linea in request.content:
+        if not linea.strip(): continue
+        lineas.append(linea)
+        if len(lineas) == BLOQUE:
+            en_vuelo.append(loop.run_in_executor(pool, _bloque, lineas)); lineas = []
+            await escribir(request.app['procesos'] * 2)
+    if lineas: en_vuelo.append(loop.run_in_executor(pool, _bloque, lineas))
+    await escribir(0)
+    await resp.write_eof()
+    return resp
+
+@rutas.post('/informe')
+async def informe(request):
+    datos = await _json(request)
+    obra = datos.get('obra') if isinstance(datos, dict) else None
+    if not isinstance(obra, dict): return web.json_response({'error': "Falta 'obra'"}, status=400)
+    try: usuario = _usuario(datos.get('usuario'))
+    except ValueError as e: return web.json_response({'error': str(e)}, status=400)
+    try: pdf = await asyncio.get_running_loop().run_in_executor(request.app['pool'], _informe, obra, usuario)
+    except (ValueError, TypeError, ArithmeticError) as e: return web.json_response({'error': str(e)}, status=422)
+    if pdf is None: return web.json_response({'error': "Sin solución."}, status=422)
+    return web.Response(body=pdf, content_type='application/pdf', headers={'Content-Disposition': 'attachment; filename="informe.pdf"'})
+
+# ------------------------------------------------------------------------------
+# Aplicación
+# ------------------------------------------------------------------------------
+def crear_app(procesos=None):
+    app = web.Application(client_max_size=64 * 1024 ** 2)
+    app['procesos'] = procesos or os.cpu_count() or 1
+
+    async def pool(app):
+        app['pool'] = ProcessPoolExecutor(app['procesos'])
+        yield
+        app['pool'].shutdown(cancel_futures=True)
+
+    app.cleanup_ctx.append(pool)
+    app.add_routes(rutas)
+    return app
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="API HTTP de dimensionado HYDROLOGIC")
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8080)
+    ap.add_argument('--procesos', type=int, default=None, help="procesos de cálculo (por defecto, uno por núcleo)")
+    args = ap.parse_args(argv)
+    web.run_app(crear_app(args.procesos), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,13 @@
 import streamlit as st
-from fpdf import FPDF
-import base64
-import plotly.express as px
-import pandas as pd
-from supabase import create_client, Client
-import requests
-import tempfile
-import math
-from PIL import Image
+import os
+import time
+from metricas import TRAMOS, CARPETA_PERFIL, tramo
+# plotly, pandas, supabase, fpdf y requests se importan donde se usan: el arranque no los necesita.
 
 # ==============================================================================
 # 0. CONFIGURACIÓN VISUAL
 # ==============================================================================
+_inicio = time.perf_counter()
 st.set_page_config(
     page_title="HYDROLOGIC V65",
     page_icon="💧",
@@ -25,10 +21,20 @@ def init_connection():
     try:
         url = st.secrets["supabase"]["url"]
         key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
+        from datos import crear_cliente
+        return crear_cliente(url, key)
     except: return None
 
-supabase = init_connection()
+@st.cache_resource
+def init_datos(_cliente):
+    import atexit
+    from datos import AccesoDatos
+    d = AccesoDatos(_cliente)
+    atexit.register(lambda: d.vaciar())  # escrituras agrupadas pendientes al parar el servidor
+    return d
+
+with tramo('init_connection'): supabase = init_connection()
+DATOS = init_datos(supabase) if supabase else None
 
 def local_css():
     st.markdown("""
@@ -81,7 +87,15 @@ local_css()
 # ==============================================================================
 def check_auth():
     if "auth" not in st.session_state: st.session_state["auth"] = False
-    if st.session_state["auth"]: return True
+    if st.session_state["auth"]:
+        if not DATOS: return True
+        # Perfil desde la caché (TTL): cambios de empresa/logo o bajas de licencia llegan sin volver a entrar
+        try: u = DATOS.perfil(st.session_state["user_info"]["username"])
+        except: return True
+        if u and u.get("activo"):
+            st.session_state["user_info"] = u
+            return True
+        st.session_state["auth"] = False
     
     c1,c2,c3 = st.columns([1,2,1])
     with c2:
@@ -101,9 +115,8 @@ def check_auth():
                 else: st.error("Error conexión DB y credenciales incorrectas.")
                 return
             try:
-                response = supabase.table("usuarios").select("*").eq("username", user).eq("password", pwd).execute()
-                if len(response.data) > 0:
-                    u = response.data[0]
+                u = DATOS.autenticar(user, pwd)
+                if u:
                     if u["activo"]:
                         st.session_state["auth"] = True
                         st.session_state["user_info"] = u
@@ -113,208 +126,346 @@ def check_auth():
             except: st.error("Error de conexión")
     return False
 
-if not check_auth(): st.stop()
+with tramo('check_auth'): autenticado = check_auth()
+if not autenticado: st.stop()
 
 # ==============================================================================
 # 2. LÓGICA
 # ==============================================================================
-class EquipoRO:
-    def __init__(self, n, prod, ppm, ef, kw, mem):
-        self.nombre = n; self.produccion_nominal = prod; self.max_ppm = ppm; self.eficiencia = ef; self.potencia_kw = kw; self.membranas = mem
-class Filtro:
-    def __init__(self, tipo, n, bot, caud, wash, sal=0, cap=0):
-        self.tipo = tipo; self.nombre = n; self.medida_botella = bot; self.caudal_max = caud; self.caudal_wash = wash; self.sal_kg = sal; self.capacidad = cap
-
-ro_db = [
-    EquipoRO("PURHOME PLUS", 300, 3000, 0.5, 0.03, "Membrana HRM"), EquipoRO("DF 800 UV-LED", 3000, 1500, 0.71, 0.08, "2x400 GPD"),
-    EquipoRO("Direct Flow 1200", 4500, 1500, 0.66, 0.10, "3x400 GPD"), EquipoRO("ALFA 140", 5000, 2000, 0.5, 0.75, "1x4040"),
-    EquipoRO("ALFA 240", 10000, 2000, 0.5, 1.1, "2x4040"), EquipoRO("ALFA 340", 15000, 2000, 0.6, 1.5, "3x4040"),
-    EquipoRO("ALFA 440", 20000, 2000, 0.6, 1.5, "4x4040"), EquipoRO("ALFA 640", 30000, 2000, 0.6, 2.2, "6x4040"),
-    EquipoRO("ALFA 840 (Custom)", 40000, 2000, 0.7, 3.0, "8x4040"),
-    EquipoRO("AP-6000 LUXE", 18000, 6000, 0.6, 2.2, "4x4040 High TDS"), EquipoRO("AP-10000 LUXE", 30000, 6000, 0.6, 4.0, "6x4040 High TDS"),
-]
-silex_db = [Filtro("Silex", "SIL 10x35", "10x35", 0.8, 2.0), Filtro("Silex", "SIL 10x44", "10x44", 0.8, 2.0), Filtro("Silex", "SIL 12x48", "12x48", 1.1, 3.5), Filtro("Silex", "SIL 18x65", "18x65", 2.6, 8.0), Filtro("Silex", "SIL 21x60", "21x60", 3.6, 11.0), Filtro("Silex", "SIL 24x69", "24x69", 4.4, 14.0), Filtro("Silex", "SIL 30x72", "30x72", 7.0, 20.0), Filtro("Silex", "SIL 36x72", "36x72", 10.0, 28.0)]
-carbon_db = [Filtro("Carbon", "DEC 30L", "10x35", 0.38, 2.0), Filtro("Carbon", "DEC 45L", "10x54", 0.72, 3.0), Filtro("Carbon", "DEC 60L", "12x48", 0.80, 4.0), Filtro("Carbon", "DEC 75L", "13x54", 1.10, 5.0), Filtro("Carbon", "DEC 90KG", "18x65", 2.68, 8.0), Filtro("Carbon", "DEC 150KG", "21x60", 4.5, 9.0), Filtro("Carbon", "DEC 200KG", "24x69", 6.0, 12.0)]
-descal_db = [Filtro("Descal", "BI BLOC 30L", "10x35", 1.8, 2.0, 4.5, 192), Filtro("Descal", "BI BLOC 60L", "12x48", 3.6, 3.5, 9.0, 384), Filtro("Descal", "TWIN 40L", "10x44", 2.4, 2.5, 6.0, 256), Filtro("Descal", "TWIN 100L", "14x65", 6.0, 5.0, 15.0, 640), Filtro("Descal", "DUPLEX 300L", "24x69", 6.5, 9.0, 45.0, 1800)]
-
-def calcular_bomba(caudal_lh):
-    if caudal_lh < 2000: return "0.75 CV", 0.55
-    elif caudal_lh < 4000: return "1.0 CV", 0.75
-    elif caudal_lh < 6000: return "1.5 CV", 1.1
-    elif caudal_lh < 10000: return "2.0 CV", 1.5
-    elif caudal_lh < 15000: return "3.0 CV", 2.2
-    else: return "5.5 CV", 4.0
-
-def calcular_tuberia(caudal_lh):
-    if caudal_lh < 1500: return '3/4"'
-    elif caudal_lh < 3000: return '1"'
-    elif caudal_lh < 5000: return '1 1/4"'
-    elif caudal_lh < 9000: return '1 1/2"'
-    elif caudal_lh < 20000: return '2"'
-    else: return '2 1/2"'
-
-# --- FIX: UNIFICACIÓN DE NOMBRE DE VARIABLE (man_buffer) ---
-def calcular(origen, modo, consumo, caudal_punta, ppm, dureza, temp, horas, costes, buffer_on, descal_on, man_fin, man_buffer):
-    res = {}
-    msgs = []
-    fs = 1.2 if origen == "Pozo" else 1.0
-    res['v_final'] = man_fin if man_fin > 0 else max(consumo * 0.75, caudal_punta * 60)
-    
-    if modo == "Solo Descalcificación":
-        q_target = (consumo / horas) * fs
-        cands = [d for d in descal_db if (d.caudal_max * 1000) >= q_target]
-        if cands:
-            carga = (consumo/1000)*dureza
-            validos = [d for d in cands if (d.capacidad/carga if carga>0 else 99) >= 5]
-            res['descal'] = validos[0] if validos else cands[-1]
-            res['dias'] = res['descal'].capacidad / carga if carga > 0 else 99
-            res['sal_anual'] = (365/res['dias']) * res['descal'].sal_kg
-            res['opex'] = res['sal_anual'] * costes['sal']
-            res['wash'] = res['descal'].caudal_wash * 1000
-            res['q_filtros'] = q_target
-        else: res['descal'] = None
-        
-        q_bomba = max(res.get('q_filtros', 0), res.get('wash', 0))
-        res['bomba_nom'], res['bomba_kw'] = calcular_bomba(q_bomba)
-        # Aquí usamos man_buffer para el depósito de agua bruta
-        res['v_raw'] = man_buffer if man_buffer > 0 else res.get('wash', 0) * 0.4
-    else: 
-        tcf = 1.0 if temp >= 25 else max(1.0 - ((25 - temp) * 0.03), 0.1)
-        factor_recuperacion = 0.8 if ppm > 2500 else 1.0
-        if ppm > 2500: msgs.append("Nota: Eficiencia reducida por alta salinidad.")
-        q_target = consumo
-        ro_cands = [r for r in ro_db if ppm <= r.max_ppm and ((r.produccion_nominal * tcf / 24) * horas) >= q_target]
-        
-        if ro_cands:
-            res['ro'] = next((r for r in ro_cands if "ALFA" in r.nombre or "AP" in r.nombre), ro_cands[-1]) if q_target > 600 else ro_cands[0]
-            res['efi_real'] = res['ro'].eficiencia * factor_recuperacion
-            res['q_prod_hora'] = (res['ro'].produccion_nominal * tcf) / 24
-            agua_in = consumo / res['efi_real']
-            q_bomba = (res['ro'].produccion_nominal / 24 / res['ro'].eficiencia) * 1.5
-            
-            if buffer_on:
-                q_filtros = (agua_in / 20) * fs 
-                # Aquí usamos man_buffer para el depósito intermedio
-                res['v_buffer'] = man_buffer if man_buffer > 0 else q_bomba * 2
-            else:
-                q_filtros = q_bomba * fs 
-                res['v_buffer'] = 0
-            res['q_filtros'] = q_filtros
-            
-            sx_cands = [s for s in silex_db if (s.caudal_max * 1000) >= q_filtros]
-            res['silex'] = sx_cands[0] if sx_cands else None
-            cb_cands = [c for c in carbon_db if (c.caudal_max * 1000) >= q_filtros]
-            res['carbon'] = cb_cands[0] if cb_cands else None
-            
-            if descal_on and dureza > 5:
-                ds = [d for d in descal_db if (d.caudal_max*1000) >= q_filtros]
-                if ds:
-                    carga = (agua_in/1000)*dureza
-                    v = [d for d in ds if (d.capacidad/carga if carga>0 else 99) >= 5]
-                    res['descal'] = v[0] if v else ds[-1]
-                    res['dias'] = res['descal'].capacidad / carga if carga > 0 else 99
-                    res['sal_anual'] = (365/res['dias']) * res['descal'].sal_kg
-                    res['wash'] = res['descal'].caudal_wash * 1000
-                else: res['descal'] = None
-            
-            kwh = (consumo / res['q_prod_hora']) * res['ro'].potencia_kw * 365
-            sal = res.get('sal_anual', 0)
-            m3 = (agua_in/1000)*365
-            res['opex'] = (kwh*costes['luz']) + (sal*costes['sal']) + (m3*costes['agua'])
-            res['breakdown'] = {'Agua': m3*costes['agua'], 'Sal': sal*costes['sal'], 'Luz': kwh*costes['luz']}
-            res['wash'] = max((res['silex'].caudal_wash if res.get('silex') else 0), (res['carbon'].caudal_wash if res.get('carbon') else 0), (res['descal'].caudal_wash if res.get('descal') else 0)) * 1000
-            
-            q_bomba_aporte = max(res['q_filtros'], res['wash'])
-            res['bomba_nom'], res['bomba_kw'] = calcular_bomba(q_bomba_aporte)
-            # Y aquí si quisiéramos otro depósito bruto manual, necesitaríamos otro input, 
-            # pero por ahora asumimos automático para el bruto en modo RO.
-            res['v_raw'] = res['wash'] * 0.35 
-            
-            kwh_ap = (consumo / res['q_filtros']) * res['bomba_kw'] * 365 
-            res['opex'] += (kwh_ap * costes['luz'])
-            res['breakdown']['Luz'] += (kwh_ap * costes['luz'])
-            
-        else: res['ro'] = None
-
-    max_flow = max(res.get('q_filtros', 0), res.get('wash', 0))
-    res['tuberia'] = calcular_tuberia(max_flow)
-    res['msgs'] = msgs
-    return res
-
-def create_pdf(res, inputs, modo, user_data):
-    pdf = FPDF()
-    pdf.add_page()
-    
-    logo_impreso = False
-    if user_data.get("logo_url") and len(str(user_data["logo_url"])) > 5:
+import catalogo
+from motor import ENTRADAS, MODO_RO, MODO_DESCAL, aplanar
+from cache import RESULTADOS, PDFS, clave, clave_calculo
+from informe import create_pdf, informe_fila
+from historial import registro
+from recursos import CarpetaTemporal, acotar_sesion
+from tablas import calcular_tabla
+
+# CATÁLOGO: compartido entre sesiones y reindexado solo cuando cambia su versión
+@st.cache_resource(max_entries=2)
+def cargar_catalogo(version, _datos=None):
+    return catalogo.Catalogo.desde_registros(_datos, version) if _datos else catalogo.cargar()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def registros_catalogo_supabase():
+    return catalogo.registros_supabase(supabase)
+
+def catalogo_vigente():
+    if supabase and st.secrets.get("catalogo", {}).get("origen") == "supabase":
         try:
-            response = requests.get(user_data["logo_url"])
-            if response.status_code == 200:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                    tmp.write(response.content)
-                    pdf.image(tmp.name, 10, 8, 33)
-                    logo_impreso = True
-        except: pass
-    if not logo_impreso:
-        try: pdf.image('logo.png', 10, 8, 33)
-        except: pass
+            datos = registros_catalogo_supabase()
+            return cargar_catalogo(catalogo.huella(datos), datos)
+        except Exception: pass
+    return cargar_catalogo(catalogo.version_archivo())
 
-    pdf.ln(20)
-    def clean(text): return str(text).encode('latin-1', 'replace').decode('latin-1') if text else "N/A"
-    empresa_nombre = user_data.get("empresa", "HYDROLOGIC").upper()
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(0, 10, clean(f"INFORME TÉCNICO - {empresa_nombre}"), 0, 1, 'C')
-    pdf.ln(10)
-    
-    pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, clean("1. PARAMETROS"), 0, 1)
-    pdf.set_font("Arial", '', 10); pdf.cell(0, 8, clean(f"Consumo: {inputs['consumo']} L/dia | Punta: {inputs['punta']} L/min"), 0, 1)
-    if modo == "Planta Completa (RO)": pdf.cell(0, 8, clean(f"TDS Entrada: {inputs['ppm']} ppm | Dureza: {inputs['dureza']} Hf"), 0, 1)
-    pdf.ln(5)
-    
-    pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, clean("2. EQUIPOS"), 0, 1)
-    pdf.set_font("Arial", '', 10)
-    
-    # AGUA BRUTA
-    pdf.cell(0, 8, clean(f"A. DEPOSITO AGUA BRUTA: {int(res.get('v_raw', 0))} L"), 0, 1)
-    pdf.cell(0, 8, clean(f"B. BOMBA APORTE: {res.get('bomba_nom', 'N/A')} @ 5 Bar"), 0, 1)
-
-    if modo == "Solo Descalcificación":
-        if res.get('descal'):
-            pdf.cell(0, 8, clean(f"C. DESCAL: {res['descal'].nombre} ({res['descal'].medida_botella})"), 0, 1)
-            pdf.set_font("Arial", 'I', 9)
-            pdf.cell(0, 6, clean(f"   Autonomia: {res['dias']:.1f} dias"), 0, 1)
+CATALOGO = catalogo_vigente()
+
+# TABLAS DE DECISIÓN (python tablas.py construir): mapeadas una vez por versión de catálogo; sin ellas, motor completo
+@st.cache_resource(max_entries=2)
+def cargar_tablas(version, _cat):
+    from tablas import Tablas
+    return Tablas.abrir(cat=_cat)
+
+TABLAS = cargar_tablas(CATALOGO.version, CATALOGO)
+
+# HISTORIAL: Supabase si secrets [historial] origen = "supabase"; si no, SQLite local
+@st.cache_resource
+def init_historial(_datos):
+    import historial
+    if _datos and st.secrets.get("historial", {}).get("origen") == "supabase": return historial.HistorialSupabase(_datos)
+    return historial.HistorialSQLite()
+
+HISTORIAL = init_historial(DATOS)
+
+# MARCA: logo y nombre de cada empresa preparados una vez y compartidos de solo lectura por todas sus sesiones
+@st.cache_resource(max_entries=1000, ttl=3600, show_spinner=False)
+def marca_empresa(empresa, logo_url):
+    from recursos import marca
+    return marca(empresa, logo_url)
+
+# ==============================================================================
+# 3. LOTES
+# ==============================================================================
+@st.fragment
+def panel_lote(costes, fijos):
+    st.subheader("📦 Cálculo por Lotes")
+    st.caption("Columnas: " + ", ".join(ENTRADAS) + " (opcional: obra). Solo 'consumo' es obligatoria; el resto toma el valor de la barra lateral.")
+    archivo = st.file_uploader("Obras (CSV/XLSX)", type=['csv', 'xlsx'])
+    con_pdf = st.checkbox("Generar informes PDF (ZIP)", value=False)
+    if archivo and st.button("PROCESAR LOTE", type="primary", use_container_width=True):
+        from lote import contar_filas, procesar_lote
+        previo = st.session_state.pop('lote', None)
+        if previo: previo['dir'].borrar()
+        carpeta = CarpetaTemporal()  # se borra con la sesión o con el siguiente lote
+        csv_path, zip_path = os.path.join(carpeta.ruta, "resultados.csv"), (os.path.join(carpeta.ruta, "informes.zip") if con_pdf else None)
+        crear = (lambda res, inputs, modo: create_pdf(res, inputs, modo, st.session_state["user_info"])) if con_pdf else None
+        total, hechas = contar_filas(archivo, archivo.name), 0
+        barra = st.progress(0.0, text="Procesando...")
+        try:
+            for hechas in procesar_lote(archivo, archivo.name, csv_path, costes, fijos, crear, zip_path, cat=CATALOGO):
+                barra.progress(min(hechas / max(total, 1), 1.0), text=f"{hechas} / {total} obras")
+            st.session_state['lote'] = {'dir': carpeta, 'csv': csv_path, 'zip': zip_path, 'filas': hechas}
+        except Exception as e:
+            carpeta.borrar()
+            st.error(f"Error lote: {e}")
+    lote = st.session_state.get('lote')
+    if lote and not os.path.exists(lote['csv']):  # purgada por antigua
+        del st.session_state['lote']
+        lote = None
+    if lote:
+        st.success(f"{lote['filas']} obras calculadas. Las filas con valores no numéricos llevan el motivo en la columna 'error'.")
+        with open(lote['csv'], 'rb') as f: st.download_button("📥 RESULTADOS CSV", f, file_name="resultados_lote.csv", mime="text/csv", use_container_width=True)
+        if lote['zip']:
+            with open(lote['zip'], 'rb') as f: st.download_button("📥 INFORMES PDF (ZIP)", f, file_name="informes_lote.zip", mime="application/zip", use_container_width=True)
+
+# ==============================================================================
+# 3b. BARRIDO DE PARÁMETROS
+# ==============================================================================
+@st.fragment
+def panel_barrido(base):
+    import numpy as np
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from barrido import VARIABLES, RANGOS, DISCRETOS, Barrido, fronteras, matriz, rejilla
+    st.subheader("🧭 Sensibilidad")
+    nombres = {'ro': "Osmosis", 'descal': "Descal", 'bomba_nom': "Bomba", 'tuberia': "Tubería", 'opex': "OPEX anual (€)"}
+    ejes = {}
+    for col, eje, opciones in ((st.columns(4), "X", list(VARIABLES)), (st.columns(4), "Y", ["—"] + list(VARIABLES))):
+        var = col[0].selectbox(f"Eje {eje}", opciones, format_func=lambda v: VARIABLES.get(v, "Sin eje Y"), key=f"barrido_{eje}")
+        if var == "—" or var == ejes.get("X", (None,))[0]: continue
+        lo, hi = RANGOS[var]
+        desde = col[1].number_input("Desde", value=float(lo), key=f"barrido_{eje}_{var}_desde")
+        hasta = col[2].number_input("Hasta", value=float(hi), key=f"barrido_{eje}_{var}_hasta")
+        pasos = col[3].number_input("Pasos (máx.)", min_value=2, max_value=400, value=200 if eje == "X" else 100, key=f"barrido_{eje}_pasos")
+        ejes[eje] = (var, rejilla(desde, hasta, int(pasos)))
+    var_x, xs = ejes["X"]
+    var_y, ys = ejes.get("Y", (None, None))
+
+    barrido = st.session_state.setdefault("barrido", Barrido())
+    with tramo('barrido'): res = barrido.calcular(base, var_x, xs, var_y, ys, CATALOGO)
+    reutilizados = len(res) - barrido.nuevas
+    st.caption(f"{len(res):,} escenarios" + (f" · {barrido.nuevas:,} calculados ahora, {reutilizados:,} reutilizados" if reutilizados else "") + ".")
+    campos = [c for c in DISCRETOS if res[c].notna().any()] + ['opex']
+
+    if var_y:
+        for fila in (campos[i:i + 2] for i in range(0, len(campos), 2)):
+            for c, campo in zip(st.columns(2), fila):
+                with tramo('grafico'):
+                    z, etiquetas, X, Y = matriz(res, var_x, var_y, campo)
+                    fig = go.Figure(go.Heatmap(z=z, x=X, y=Y, colorscale="Viridis", hoverongaps=False,
+                                               text=None if etiquetas is None else np.array(etiquetas, dtype=object)[z.astype(int)],
+                                               hovertemplate=f"{var_x}=%{{x}}<br>{var_y}=%{{y}}<br>%{{{'text' if etiquetas else 'z'}}}<extra></extra>",
+                                               colorbar=dict(tickvals=list(range(len(etiquetas))), ticktext=etiquetas) if etiquetas else None))
+                    fig.update_layout(title=nombres[campo], xaxis_title=VARIABLES[var_x], yaxis_title=VARIABLES[var_y], height=320, margin=dict(t=40, b=0, l=0, r=0))
+                c.plotly_chart(fig, use_container_width=True)
     else:
-        if res.get('silex'): pdf.cell(0, 8, clean(f"C. SILEX: {res['silex'].nombre} ({res['silex'].medida_botella})"), 0, 1)
-        if res.get('carbon'): pdf.cell(0, 8, clean(f"D. CARBON: {res['carbon'].nombre} ({res['carbon'].medida_botella})"), 0, 1)
-        if res.get('v_buffer', 0)>0: pdf.cell(0, 8, clean(f"E. BUFFER: {int(res['v_buffer'])} Litros"), 0, 1)
-        if res.get('descal'): pdf.cell(0, 8, clean(f"F. DESCAL: {res['descal'].nombre} ({res['descal'].medida_botella})"), 0, 1)
-        if res.get('ro'): 
-            pdf.cell(0, 8, clean(f"G. OSMOSIS: {res['ro'].nombre}"), 0, 1)
-            pdf.set_font("Arial", 'I', 9)
-            pdf.cell(0, 6, clean(f"   Config: {res['ro'].membranas} | Prod. Nominal: {res['ro'].produccion_nominal} L/d"), 0, 1)
-            pdf.set_font("Arial", '', 10)
-    
-    pdf.ln(5)
-    pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, clean("3. REQUISITOS"), 0, 1)
-    pdf.set_font("Arial", '', 10)
-    pdf.cell(0, 8, clean(f"DEPOSITO FINAL: {int(res['v_final'])} Litros"), 0, 1)
-    pdf.set_text_color(200,0,0); pdf.cell(0, 8, clean(f"ACOMETIDA REQUERIDA: {int(res.get('wash', 0))} L/h a 2.5 bar"), 0, 1); pdf.set_text_color(0,0,0)
-    pdf.cell(0, 8, clean(f"TUBERIA: {res['tuberia']}"), 0, 1)
-    return pdf.output(dest='S').encode('latin-1')
+        for campo in campos:
+            serie = res[campo].astype(object).where(res[campo].notna(), "Sin solución") if campo in DISCRETOS else res[campo]
+            with tramo('grafico'):
+                fig = px.line(x=res[var_x], y=serie, line_shape='hv', labels={'x': VARIABLES[var_x], 'y': nombres[campo]})
+                fig.update_layout(title=nombres[campo], height=220, margin=dict(t=40, b=0, l=0, r=0))
+            st.plotly_chart(fig, use_container_width=True)
+        st.markdown("**Cambios de equipo**")
+        with tramo('fronteras'): cambios = fronteras(base, var_x, res[var_x].tolist(), res, cat=CATALOGO)
+        st.dataframe(cambios, hide_index=True, use_container_width=True)
+
+# ==============================================================================
+# 3c. HISTORIAL
+# ==============================================================================
+@st.fragment
+def panel_historial(u):
+    import pandas as pd
+    from datetime import timedelta
+    from historial import EQUIPOS, COLUMNAS
+    st.subheader("🗂️ Historial de Presupuestos")
+    empresa = u.get("empresa", "")
+    c = st.columns([2, 1.4, 1.4, 1, 1])
+    texto = c[0].text_input("Buscar cliente / obra", key="hist_texto").strip()
+    modo_h = c[1].selectbox("Modo", [None, MODO_RO, MODO_DESCAL], format_func=lambda m: m or "Todos", key="hist_modo")
+    equipos = [None] + [(f, e.nombre) for f in EQUIPOS for e in getattr(CATALOGO, f)]
+    equipo = c[2].selectbox("Equipo", equipos, format_func=lambda e: e[1] if e else "Todos", key="hist_equipo")
+    desde = c[3].date_input("Desde", value=None, key="hist_desde")
+    hasta = c[4].date_input("Hasta", value=None, key="hist_hasta")
+    filtros = {'texto': texto, 'modo': modo_h, 'equipo': equipo, 'desde': desde.isoformat() if desde else None,
+               'hasta': (hasta + timedelta(days=1)).isoformat() if hasta else None}
+
+    # Paginación por cursor: pila de ids "antes de" por página visitada, reiniciada al cambiar los filtros
+    nav = st.session_state.setdefault("historial", {'filtros': None, 'cursores': [None]})
+    if nav['filtros'] != filtros: nav.update(filtros=filtros, cursores=[None])
+    try:
+        with tramo('historial'): filas, siguiente = HISTORIAL.pagina(empresa, nav['cursores'][-1], **filtros)
+    except Exception as e:
+        st.error(f"Error historial: {e}"); return
+    if not filas:
+        st.info("Sin presupuestos guardados." if len(nav['cursores']) == 1 else "No hay más resultados."); return
+
+    df = pd.DataFrame(filas, columns=COLUMNAS).set_index('id')
+    df['fecha'] = df['fecha'].astype(str).str[:16].str.replace('T', ' ')
+    sel = st.dataframe(df.drop(columns=['catalogo']), use_container_width=True, on_select="rerun", selection_mode="single-row", key=f"hist_tabla_{len(nav['cursores'])}")
+    p1, p2, p3 = st.columns([1, 2, 1])
+    if p1.button("◀ Recientes", disabled=len(nav['cursores']) == 1): nav['cursores'].pop(); st.rerun(scope="fragment")
+    p2.caption(f"Página {len(nav['cursores'])} · {len(filas)} presupuestos")
+    if p3.button("Anteriores ▶", disabled=siguiente is None): nav['cursores'].append(siguiente); st.rerun(scope="fragment")
+
+    filas_sel = sel.selection.rows if sel else []
+    if not filas_sel: return
+    id_ = int(df.index[filas_sel[0]])
+    p = HISTORIAL.obtener(empresa, id_)
+    if not p: return
+    st.markdown(f"**#{id_} · {p.get('cliente') or 'Sin cliente'}** · {str(p.get('fecha'))[:16].replace('T', ' ')}")
+    if p.get('catalogo') != CATALOGO.version: st.caption(f"⚠️ Guardado con el catálogo {p.get('catalogo')}; se recalcula con el vigente ({CATALOGO.version}).")
+    d1, d2 = st.columns(2)
+    d1.dataframe(pd.Series(p['entrada'], name="Entrada").astype(str), use_container_width=True)
+    d2.dataframe(pd.Series(p['salida'], name="Resultado").astype(str), use_container_width=True)
+    b1, b2 = st.columns(2)
+    if b1.button("↩️ Reabrir", use_container_width=True):
+        st.session_state['reabrir'] = {**p['entrada'], 'cliente': p.get('cliente') or ""}
+        st.rerun()
+    try:
+        pdf = PDFS.obtener(clave('pdf_historial', p['entrada'], CATALOGO.version, u.get("empresa"), u.get("logo_url")), lambda: informe_fila(p['entrada'], u, CATALOGO))
+        if pdf: b2.download_button("📥 Informe PDF", pdf, file_name=f"informe_{id_}.pdf", mime="application/pdf", use_container_width=True)
+        else: b2.caption("Sin solución con el catálogo vigente.")
+    except Exception as e: b2.error(f"Error PDF: {e}")
+
+# ==============================================================================
+# 3d. SIMULACIÓN TEMPORAL
+# ==============================================================================
+@st.fragment
+def panel_simulacion(res, consumo, dureza):
+    if not st.toggle("🔁 Simular un año minuto a minuto", key="sim_on"): return
+    import plotly.graph_objects as go
+    from simulacion import PERFILES, perfil_demanda, simular, deposito_minimo
+    c = st.columns(4)
+    forma = c[0].selectbox("Perfil de consumo", list(PERFILES), index=1, key="sim_perfil")
+    ruido = c[1].slider("Variabilidad diaria", 0.0, 1.0, 0.3, key="sim_ruido")
+    factor = c[2].number_input("Consumo real / diseño", 0.1, 5.0, 1.0, step=0.1, key="sim_factor")
+    q_red = c[3].number_input("Acometida (L/h)", 0, value=int(max(res.get('wash', 0), res['q_filtros'])), key="sim_red")
+    dem = perfil_demanda(consumo * factor, 365, 1, forma, ruido)
+    with tramo('simulacion'): r = simular(res, dem, 1, dureza, q_red, series=True)
+    m = st.columns(4)
+    m[0].metric("Demanda cubierta", f"{r['cobertura']:.2%}", f"-{r['deficit_l']:,.0f} L" if r['deficit_l'] else None, delta_color="inverse")
+    m[1].metric("Arranques bomba / OI", f"{r['arranques_bomba']:,} / {r['arranques_ro']:,}")
+    m[2].metric("Energía anual", f"{r['kwh']:,.0f} kWh")
+    m[3].metric("Lavados / Regen.", f"{r['lavados']} / {r['regeneraciones']}", f"{r['sal_kg']:,.0f} kg sal", delta_color="off")
+    if r['falta_lavado_l'] > 0: st.warning(f"La acometida no cubre los lavados: faltan {r['falta_lavado_l']:,.0f} L al año.")
+    if r['deficit_l'] > 0:
+        v = deposito_minimo(res, dem, 1, dureza, q_red)
+        st.warning(f"{r['minutos_sin_agua']:,} minutos sin agua. " + (f"Depósito final mínimo para cubrir la demanda: {v:,.0f} L." if v else "Falta producción: ampliar equipo u horas."))
+    with tramo('grafico'):
+        niveles = r['niveles'].reshape(365, 1440, 3).min(axis=1)
+        fig = go.Figure()
+        for i, (nombre, v) in enumerate((("Bruto", res.get('v_raw') if res.get('v_raw', 0) >= q_red / 60 else 0), ("Buffer", res.get('v_buffer')), ("Final", res['v_final']))):
+            if v: fig.add_trace(go.Scatter(y=niveles[:, i] / v * 100, name=nombre, mode="lines"))
+        fig.update_layout(title="Nivel mínimo diario (%)", xaxis_title="Día", yaxis_range=[0, 105], height=260, margin=dict(t=40, b=0, l=0, r=0))
+    st.plotly_chart(fig, use_container_width=True)
+
+# ==============================================================================
+# 3e. OPTIMIZACIÓN CAPEX / OPEX
+# ==============================================================================
+@st.fragment
+def panel_optimizacion(res, args):
+    if not st.toggle("💶 Comparar alternativas (CAPEX + OPEX)", key="opt_on"): return
+    import pandas as pd
+    import plotly.express as px
+    from optimizador import optimizar, precio_estimado, precio_bomba
+    c1, c2 = st.columns(2)
+    anios = c1.number_input("Años de explotación", 1, 30, 10, key="opt_anios")
+    sin_descal = c2.checkbox("Incluir alternativa sin descalcificador", value=False, key="opt_sin_descal") if args[1] == MODO_RO else False
+    with tramo('optimizar'): sols = optimizar(*args, anios=anios, sin_descal=sin_descal or None, cat=CATALOGO)
+    if not sols: st.info("Sin combinaciones viables."); return
+    nombre = lambda e: e.nombre if e else "—"
+    capex = sum(precio_estimado(f, res[f]) for f in ('ro', 'silex', 'carbon', 'descal') if res.get(f)) + precio_bomba(res.get('bomba_kw', 0))
+    actual = {'Osmosis': nombre(res.get('ro')), 'Silex': nombre(res.get('silex')), 'Carbón': nombre(res.get('carbon')), 'Descal': nombre(res.get('descal')),
+              'Bomba': res.get('bomba_nom'), 'CAPEX (€)': capex, 'OPEX anual (€)': res['opex'], f'Total {anios} años (€)': capex + anios * res['opex'], 'Origen': "Selección actual"}
+    df = pd.DataFrame([{'Osmosis': nombre(x['ro']), 'Silex': nombre(x['silex']), 'Carbón': nombre(x['carbon']), 'Descal': nombre(x['descal']),
+                        'Bomba': x['bomba'], 'CAPEX (€)': x['capex'], 'OPEX anual (€)': x['opex'], f'Total {anios} años (€)': x['total'], 'Origen': "Óptimo"}
+                       for x in sols] + [actual])
+    ahorro = actual[f'Total {anios} años (€)'] - sols[0]['total']
+    if ahorro > 0.5: st.success(f"La mejor alternativa ahorra {ahorro:,.0f} € a {anios} años frente a la selección actual.")
+    else: st.caption("La selección actual ya es la de menor coste total.")
+    with tramo('grafico'):
+        fig = px.scatter(df, x='CAPEX (€)', y='OPEX anual (€)', color='Origen', hover_data=['Osmosis', 'Descal', 'Bomba'])
+        fig.update_layout(height=260, margin=dict(t=10, b=0, l=0, r=0))
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(df.round(0), hide_index=True, use_container_width=True)
+    st.caption("Precios estimados salvo los que traiga el catálogo (campo `precio`).")
+
+# ==============================================================================
+# 3f. INCERTIDUMBRE (MONTE CARLO)
+# ==============================================================================
+@st.cache_resource
+def pool_montecarlo():
+    # forkserver: el servidor de Streamlit tiene hilos y hacer fork de un proceso con hilos puede bloquearse
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    n = os.cpu_count() or 1
+    return ProcessPoolExecutor(n, mp_context=multiprocessing.get_context("forkserver")) if n > 1 else None
+
+@st.fragment
+def panel_incertidumbre(base):
+    import plotly.express as px
+    from incertidumbre import montecarlo
+    st.subheader("🎲 Incertidumbre")
+    st.caption("Distribución de cada entrada incierta; el resto de parámetros se toma de la barra lateral.")
+    nombres = {'consumo': "Consumo Diario (L)", 'ppm': "TDS (ppm)", 'dureza': "Dureza (Hf)", 'temp': "Temp (C)"}
+    tipos = {'fijo': "Fijo", 'normal': "Normal", 'triangular': "Triangular", 'muestras': "Muestras (analíticas)"}
+    dists = {}
+    for var, nombre in nombres.items():
+        if var in ('ppm', 'temp') and base['modo'] != MODO_RO: continue
+        v = float(base[var])
+        c = st.columns([2, 2, 2, 2])
+        tipo = c[0].selectbox(nombre, list(tipos), index=1, format_func=tipos.get, key=f"mc_{var}")
+        if tipo == 'fijo': dists[var] = ('fijo', v)
+        elif tipo == 'normal':
+            dists[var] = ('normal', v, c[1].number_input("Desviación", 0.0, value=round(v * 0.15, 1), key=f"mc_{var}_sd"))
+        elif tipo == 'triangular':
+            dists[var] = ('triangular', c[1].number_input("Mínimo", value=round(v * 0.7, 1), key=f"mc_{var}_min"), v,
+                          c[2].number_input("Máximo", value=round(v * 1.3, 1), key=f"mc_{var}_max"))
+        else:
+            texto = c[1].text_input("Valores (separados por comas)", value=f"{v:g}", key=f"mc_{var}_muestras")
+            try: dists[var] = ('muestras', [float(x) for x in texto.replace(';', ',').split(',') if x.strip()])
+            except ValueError: st.error(f"{nombre}: valores no numéricos."); return
+    n = st.select_slider("Sorteos", [10_000, 20_000, 50_000, 100_000], value=20_000, key="mc_n")
+    if not st.button("EJECUTAR", type="primary", use_container_width=True, key="mc_ejecutar"):
+        return
+    barra, metricas, graficos = st.progress(0.0, text="Sorteando..."), st.empty(), st.empty()
+    try:
+        with tramo('montecarlo'):
+            for i, acum in enumerate(montecarlo(base, dists, n, pool=pool_montecarlo(), cat=CATALOGO)):
+                r = acum.resumen()
+                barra.progress(r['progreso'], text=f"{r['sorteos']:,} / {n:,} sorteos")
+                with metricas.container():
+                    m = st.columns(4)
+                    m[0].metric("Riesgo sin solución", f"{r['p_sin_solucion']:.1%}")
+                    m[1].metric("OPEX P50 / P90", f"{r['opex_p50']:,.0f} / {r['opex_p90']:,.0f} €")
+                    m[2].metric("Autonomía descal P10", f"{r['dias_p10']:.1f} días")
+                    m[3].metric("Autonomía P50 / P90", f"{r['dias_p50']:.1f} / {r['dias_p90']:.1f} días")
+                # los gráficos se repintan solo cada pocos bloques: el histograma es lo más caro
+                if r['progreso'] < 1 and i % 3: continue
+                with graficos.container(), tramo('grafico'):
+                    g1, g2 = st.columns(2)
+                    for col, clave_p, titulo in ((g1, 'p_ro', "Osmosis"), (g2, 'p_descal', "Descal")):
+                        p = r[clave_p].head(8)
+                        fig = px.bar(x=p.values, y=p.index, orientation='h', labels={'x': "Probabilidad", 'y': ""}, text_auto='.1%')
+                        fig.update_layout(title=titulo, height=260, xaxis_tickformat='.0%', margin=dict(t=40, b=0, l=0, r=0))
+                        col.plotly_chart(fig, use_container_width=True, key=f"mc_{clave_p}_{i}")
+                    if len(r['opex']):
+                        fig = px.histogram(x=r['opex'], nbins=60, labels={'x': "OPEX anual (€)"})
+                        fig.add_vline(x=r['opex_p90'], line_dash="dash", annotation_text="P90")
+                        fig.update_layout(height=220, yaxis_title="Sorteos", margin=dict(t=20, b=0, l=0, r=0))
+                        st.plotly_chart(fig, use_container_width=True, key=f"mc_opex_{i}")
+    except ValueError as e: st.error(str(e))
 
 # ==============================================================================
 # 4. INTERFAZ
 # ==============================================================================
+MARCA = marca_empresa(st.session_state["user_info"].get("empresa"), st.session_state["user_info"].get("logo_url"))
 c_head1, c_head2 = st.columns([1, 5])
 with c_head1:
-    try:
-        logo_url = st.session_state["user_info"].get("logo_url")
-        if logo_url: st.image(logo_url, width=120)
-        else: st.image("logo.png", width=120)
+    try: st.image(MARCA['logo'], width=120)
     except: st.warning("Logo?")
 
 with c_head2:
-    emp = st.session_state["user_info"].get("empresa", "HYDROLOGIC")
+    emp = MARCA['empresa']
     st.markdown('<p class="brand-logo">HYDROLOGIC</p>', unsafe_allow_html=True)
     st.markdown(f'<p class="brand-sub">LICENCIA: {emp}</p>', unsafe_allow_html=True)
 
@@ -331,37 +482,82 @@ with col_sb:
             ul = st.file_uploader("Logo (PNG/JPG)", type=['png','jpg','jpeg','webp'])
             if st.button("➕ Crear"):
                 try:
-                    furl = ""
-                    if ul:
-                        file_bytes = ul.getvalue()
-                        path = f"logos/{nu}_{int(time.time())}.png"
-                        supabase.storage.from_("logos").upload(path, file_bytes, {"content-type": "image/png"})
-                        furl = supabase.storage.from_("logos").get_public_url(path)
-                    supabase.table("usuarios").insert({"username": nu, "password": np, "empresa": nc, "rol": "cliente", "activo": True, "logo_url": furl}).execute()
+                    DATOS.crear_usuario({"username": nu, "password": np, "empresa": nc, "rol": "cliente", "activo": True, "logo_url": ""}, ul.getvalue() if ul else None)
                     st.success("Creado!")
                 except Exception as e: st.error(f"Error: {e}")
 
+        with st.expander("Caché"):
+            for nombre, c in (("Cálculos", RESULTADOS), ("Informes PDF", PDFS)):
+                e = c.estadisticas()
+                st.caption(f"{nombre}: {e['tasa_acierto']:.0%} aciertos ({e['aciertos']}/{e['aciertos'] + e['fallos']}) · {e['entradas']} entradas · {e['expulsiones']} expulsadas"
+                           + (f" · {e['bytes'] / 2**20:.1f} MB en disco" if 'bytes' in e else ""))
+            if TABLAS: st.caption(f"Tablas de decisión {TABLAS.version}: {TABLAS.consultas - TABLAS.fallos}/{TABLAS.consultas} consultas resueltas por tabla")
+            else: st.caption("Tablas de decisión: no construidas para este catálogo (motor completo).")
+            if DATOS:
+                for nombre, m in DATOS.metricas().items():
+                    st.caption(f"DB {nombre}: {m['llamadas']} llamadas · p50 {m['p50_ms']:.0f} ms · p95 {m['p95_ms']:.0f} ms · {m['errores']} errores · {m['reintentos']} reintentos")
+            if st.button("Vaciar caché"):
+                RESULTADOS.limpiar(); PDFS.limpiar(); marca_empresa.clear()
+                if DATOS: DATOS.invalidar()
+
+        with st.expander("⏱️ Rendimiento"):
+            import pandas as pd
+            tiempos = TRAMOS.resumen()
+            if tiempos: st.dataframe(pd.DataFrame(tiempos).T.round(1), use_container_width=True)
+            else: st.caption("Sin datos todavía.")
+            perfil = st.toggle("Volcar cProfile por etapa", value=bool(TRAMOS.perfil), key="perfil_on")
+            TRAMOS.perfil = CARPETA_PERFIL if perfil else None
+            volcados = TRAMOS.volcados(5)
+            if volcados:
+                st.caption(f"{CARPETA_PERFIL} · último: {os.path.basename(volcados[0])}")
+                with open(volcados[0], 'rb') as f: st.download_button("📥 Último .prof", f.read(), file_name=os.path.basename(volcados[0]), use_container_width=True)
+            if st.button("Reiniciar tiempos"): TRAMOS.limpiar()
+
     if st.button("Cerrar Sesión"): st.session_state["auth"] = False; st.rerun()
     st.subheader("Configuración")
-    origen = st.selectbox("Origen", ["Red Pública", "Pozo"])
-    modo = st.selectbox("Modo", ["Planta Completa (RO)", "Solo Descalcificación"])
-    consumo = st.number_input("Consumo Diario (L)", value=2000, step=100)
-    caudal_punta = st.number_input("Caudal Punta (L/min)", value=40)
-    horas = st.number_input("Horas Prod", value=20)
-    buffer = st.checkbox("Buffer Intermedio", value=True) if "RO" in modo else False
-    descal = st.checkbox("Descalcificador", value=True) if "RO" in modo else True
-    ppm = st.number_input("TDS (ppm)", value=800) if "RO" in modo else 0
-    dureza = st.number_input("Dureza (Hf)", value=35)
-    temp = st.number_input("Temp (C)", value=15) if "RO" in modo else 25
+    reabrir = st.session_state.pop('reabrir', None)
+    if reabrir:  # presupuesto del historial: sus entradas pasan a los controles antes de crearlos
+        st.session_state.update(reabrir, vista="Individual", run=True)
+    vista = st.radio("Vista", ["Individual", "Lote", "Barrido", "Historial", "Incertidumbre"], horizontal=True, key="vista")
+    origen = st.selectbox("Origen", ["Red Pública", "Pozo"], key="origen")
+    modo = st.selectbox("Modo", ["Planta Completa (RO)", "Solo Descalcificación"], key="modo")
+    consumo = st.number_input("Consumo Diario (L)", value=2000, step=100, key="consumo")
+    caudal_punta = st.number_input("Caudal Punta (L/min)", value=40, key="caudal_punta")
+    horas = st.number_input("Horas Prod", value=20, key="horas")
+    buffer = st.checkbox("Buffer Intermedio", value=True, key="buffer_on") if "RO" in modo else False
+    descal = st.checkbox("Descalcificador", value=True, key="descal_on") if "RO" in modo else True
+    ppm = st.number_input("TDS (ppm)", value=800, key="ppm") if "RO" in modo else 0
+    dureza = st.number_input("Dureza (Hf)", value=35, key="dureza")
+    temp = st.number_input("Temp (C)", value=15, key="temp") if "RO" in modo else 25
     with st.expander("Costes / Manual"):
-        ca = st.number_input("Agua €", 1.5); cs = st.number_input("Sal €", 0.45); cl = st.number_input("Luz €", 0.20)
-        mf = st.number_input("Dep Final (L)", 0); mb = st.number_input("Buffer (L)", 0)
+        ca = st.number_input("Agua €", 1.5, key="coste_agua"); cs = st.number_input("Sal €", 0.45, key="coste_sal"); cl = st.number_input("Luz €", 0.20, key="coste_luz")
+        mf = st.number_input("Dep Final (L)", 0, key="man_fin"); mb = st.number_input("Buffer (L)", 0, key="man_buffer")
     costes = {'agua': ca, 'sal': cs, 'luz': cl}
-    if st.button("CALCULAR", type="primary", use_container_width=True): st.session_state['run'] = True
+    if vista == "Individual":
+        cliente = st.text_input("Cliente / Obra", key="cliente")
+        if st.button("CALCULAR", type="primary", use_container_width=True): st.session_state['run'] = st.session_state['guardar'] = True
 
-if st.session_state.get('run'):
+fijos = {'origen': origen, 'modo': modo, 'caudal_punta': caudal_punta, 'ppm': ppm, 'dureza': dureza, 'temp': temp, 'horas': horas,
+         'buffer_on': buffer, 'descal_on': descal, 'man_fin': mf, 'man_buffer': mb}
+if vista == "Lote":
+    with col_main: panel_lote(costes, fijos)
+elif vista == "Barrido":
+    with col_main: panel_barrido({**fijos, 'consumo': consumo, **{f'coste_{k}': v for k, v in costes.items()}})
+elif vista == "Historial":
+    with col_main: panel_historial(st.session_state["user_info"])
+elif vista == "Incertidumbre":
+    with col_main: panel_incertidumbre({**fijos, 'consumo': consumo, **{f'coste_{k}': v for k, v in costes.items()}})
+elif st.session_state.get('run'):
     # FIX: Nombre unificado 'man_buffer'
-    res = calcular(origen, modo, consumo, caudal_punta, ppm, dureza, temp, horas, costes, buffer, descal, mf, mb)
+    args_calc = (origen, modo, consumo, caudal_punta, ppm, dureza, temp, horas, costes, buffer, descal, mf, mb, CATALOGO)
+    k_calc = clave_calculo(*args_calc)
+    res = RESULTADOS.obtener(k_calc, lambda: TRAMOS.medir('calcular', calcular_tabla, *args_calc, tablas=TABLAS))
+    if st.session_state.pop('guardar', False):
+        try:
+            u = st.session_state["user_info"]
+            entrada = {**fijos, 'consumo': consumo, **{f'coste_{k}': v for k, v in costes.items()}}
+            HISTORIAL.guardar(registro(u.get("empresa", ""), u.get("username"), cliente, entrada, aplanar(res), CATALOGO.version))
+        except Exception as e: col_main.caption(f"⚠️ No se pudo guardar en el historial: {e}")
     
     if res.get('ro') or res.get('descal'):
         for msg in res['msgs']: col_main.markdown(f"<div class='alert-box alert-yellow'>{msg}</div>", unsafe_allow_html=True)
@@ -394,19 +590,29 @@ if st.session_state.get('run'):
             st.write(f"Tubería: **{res['tuberia']}**")
         with d2:
             if modo == "Planta Completa (RO)":
+                import pandas as pd
+                import plotly.express as px
                 df = pd.DataFrame(list(res['breakdown'].items()), columns=['Item', 'Coste'])
-                fig = px.pie(df, values='Coste', names='Item', hole=0.6, color_discrete_sequence=px.colors.qualitative.Set3)
-                fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="black", showlegend=False, height=150, margin=dict(t=0,b=0,l=0,r=0))
+                with tramo('grafico'):
+                    fig = px.pie(df, values='Coste', names='Item', hole=0.6, color_discrete_sequence=px.colors.qualitative.Set3)
+                    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="black", showlegend=False, height=150, margin=dict(t=0,b=0,l=0,r=0))
                 st.plotly_chart(fig, use_container_width=True)
             st.metric("OPEX Diario", f"{(res['opex']/365):.2f} €")
 
+        with col_main:
+            panel_simulacion(res, consumo, dureza)
+            panel_optimizacion(res, (origen, modo, consumo, ppm, dureza, temp, horas, costes, buffer, descal))
+
         col_main.markdown("---")
         try:
             inputs_pdf = {'consumo': consumo, 'horas': horas, 'origen': origen, 'ppm': ppm, 'dureza': dureza, 'punta': caudal_punta}
-            pdf_data = create_pdf(res, inputs_pdf, modo, st.session_state["user_info"])
-            b64 = base64.b64encode(pdf_data).decode()
-            col_main.markdown(f'<a href="data:application/octet-stream;base64,{b64}" download="informe_{emp}.pdf"><button style="background:#00e5ff;color:black;width:100%;padding:15px;border:none;border-radius:10px;font-weight:bold;">📥 DESCARGAR INFORME OFICIAL</button></a>', unsafe_allow_html=True)
+            u = st.session_state["user_info"]
+            pdf_data = PDFS.obtener(clave('pdf', k_calc, inputs_pdf, modo, u.get("empresa"), u.get("logo_url")), lambda: TRAMOS.medir('create_pdf', create_pdf, res, inputs_pdf, modo, u))
+            with tramo('descarga_pdf'): col_main.download_button("📥 DESCARGAR INFORME OFICIAL", pdf_data, file_name=f"informe_{emp}.pdf", mime="application/pdf", use_container_width=True)
         except Exception as e: col_main.error(f"Error PDF: {e}")
 
     else: col_main.error("Sin solución.")
 else: col_main.info("👈 Introduce parámetros.")
+
+acotar_sesion(st.session_state)
+TRAMOS.registrar('script', time.perf_counter() - _inicio)
@@ -0,0 +1,107 @@
+# ==============================================================================
+# BARRIDO DE PARÁMETROS (SENSIBILIDAD)
+# Rejillas de 1 o 2 variables sobre el motor vectorizado, con los puntos en múltiplos de un paso redondo
+# para reutilizar celdas al mover los controles, y localización exacta de los cambios de equipo.
+# ==============================================================================
+import numpy as np
+import pandas as pd
+
+from cache import clave
+from lote import calcular_lote
+from motor import calcular_fila, aplanar, catalogo_actual
+
+VARIABLES = {'consumo': "Consumo Diario (L)", 'ppm': "TDS (ppm)", 'temp': "Temp (C)", 'horas': "Horas Prod",
+             'dureza': "Dureza (Hf)", 'caudal_punta': "Caudal Punta (L/min)"}
+RANGOS = {'consumo': (500, 40000), 'ppm': (100, 6000), 'temp': (5, 35), 'horas': (4, 24), 'dureza': (0, 80), 'caudal_punta': (10, 300)}
+DISCRETOS = ['ro', 'descal', 'bomba_nom', 'tuberia']
+SIN_SOLUCION = "Sin solución"
+
+PASOS_REDONDOS = (1, 1.2, 1.5, 2, 2.5, 3, 4, 5, 6, 8)
+
+def rejilla(desde, hasta, pasos):
+    """
+    Hasta `pasos` puntos entre desde y hasta, en múltiplos de un paso redondo (1, 1.2, 1.5, 2... x 10^k): al mover
+    un extremo los puntos comunes son idénticos y Barrido los reutiliza. Un solo punto si desde == hasta.
+    """
+    lo, hi = sorted((float(desde), float(hasta)))
+    if hi - lo <= 0 or pasos < 2: return [lo]
+    bruto = (hi - lo) / (pasos - 1)
+    escala = 10 ** np.floor(np.log10(bruto))
+    paso = next(r * escala for r in PASOS_REDONDOS + (10,) if r * escala >= bruto * (1 - 1e-9))
+    primero, ultimo = int(np.ceil(lo / paso - 1e-9)), int(np.floor(hi / paso + 1e-9))
+    return [float(round(k * paso, 10)) for k in range(primero, ultimo + 1)] or [lo]
+
+class Barrido:
+    """
+    Guarda las celdas ya calculadas. Mientras no cambien los parámetros fijos, las variables de los ejes ni el
+    catálogo, solo se calculan los puntos (x, y) nuevos; `nuevas` indica cuántos hubo en la última llamada.
+    Con rejilla() los puntos de un eje desplazado coinciden, así que mover Desde/Hasta reutiliza lo común.
+    Fuera de la rejilla actual se retienen como mucho `max_sobrantes` celdas; al pasar de ahí se sueltan.
+    """
+    def __init__(self, max_sobrantes=20_000):
+        self.max_sobrantes = max_sobrantes
+        self._clave, self._pos, self._res = None, {}, None
+        self.nuevas = 0
+
+    def calcular(self, base, var_x, xs, var_y=None, ys=None, cat=None):
+        if cat is None: cat = catalogo_actual()
+        xs = list(dict.fromkeys(xs))
+        ys = list(dict.fromkeys(ys)) if var_y else [None]
+        k = clave(base, var_x, var_y, cat.version)
+        if k != self._clave: self._clave, self._pos, self._res = k, {}, None
+        pares = [(x, y) for y in ys for x in xs]
+        faltan = [p for p in pares if p not in self._pos]
+        self.nuevas = len(faltan)
+        if faltan:
+            datos = {var_x: [p[0] for p in faltan]}
+            if var_y: datos[var_y] = [p[1] for p in faltan]
+            fijos = {c: v for c, v in base.items() if c not in datos}
+            nuevo = calcular_lote(pd.DataFrame(datos), cat=cat, **fijos)
+            n = 0 if self._res is None else len(self._res)
+            self._res = nuevo if self._res is None else pd.concat([self._res, nuevo], ignore_index=True)
+            self._pos.update((p, n + i) for i, p in enumerate(faltan))
+        idx = [self._pos[p] for p in pares]
+        out = self._res.iloc[idx].reset_index(drop=True)
+        if len(self._res) > len(pares) + self.max_sobrantes:  # acotar: solo las celdas de la rejilla actual
+            self._res, self._pos = out, {p: i for i, p in enumerate(pares)}
+            out = out.copy()
+        out.insert(0, var_x, [p[0] for p in pares])
+        if var_y: out.insert(1, var_y, [p[1] for p in pares])
+        return out
+
+    def peso(self):
+        """Bytes aproximados que retiene (celdas + índice de posiciones, ~150 B por celda)."""
+        return 0 if self._res is None else int(self._res.memory_usage(deep=True).sum()) + 150 * len(self._pos)
+
+def fronteras(base, var, xs, res, campos=DISCRETOS, tolerancia=None, cat=None):
+    """
+    Cambios de equipo a lo largo de un eje. Para cada par de puntos consecutivos de la rejilla con distinto valor
+    se busca por bisección (con calcular() escalar) el umbral exacto, hasta `tolerancia` (1/1000 del paso por defecto).
+    """
+    xs = list(xs)
+    if len(xs) < 2: return pd.DataFrame(columns=['campo', var, 'de', 'a'])
+    tolerancia = tolerancia or abs(xs[1] - xs[0]) / 1000
+    valor = lambda x, campo: aplanar(calcular_fila({**base, var: x}, cat))[campo] or SIN_SOLUCION
+    filas = []
+    for campo in campos:
+        v = res[campo].astype(object).where(res[campo].notna(), SIN_SOLUCION).tolist()
+        for i in range(len(xs) - 1):
+            if v[i] == v[i + 1]: continue
+            lo, hi = xs[i], xs[i + 1]
+            while abs(hi - lo) > tolerancia:
+                mid = (lo + hi) / 2
+                if valor(mid, campo) == v[i]: lo = mid
+                else: hi = mid
+            filas.append({'campo': campo, var: hi, 'de': v[i], 'a': valor(hi, campo)})
+    return pd.DataFrame(filas, columns=['campo', var, 'de', 'a'])
+
+def matriz(res, var_x, var_y, campo):
+    """Pivota un campo de la rejilla 2D: (z, etiquetas, xs, ys). En los discretos z son códigos y `etiquetas` sus nombres."""
+    xs, ys = pd.unique(res[var_x]), pd.unique(res[var_y])
+    col = res[campo]
+    if campo in DISCRETOS:
+        cat = pd.Categorical(col.astype(object).where(col.notna(), SIN_SOLUCION))
+        z, etiquetas = cat.codes.astype(float), list(cat.categories)
+    else:
+        z, etiquetas = col.to_numpy(float), None
+    return np.asarray(z).reshape(len(ys), len(xs)), etiquetas, xs, ys
@@ -0,0 +1,70 @@
+# ==============================================================================
+# BENCHMARK DEL HISTORIAL
+# Llena un SQLite temporal con N presupuestos (la mayoría de una sola empresa) y mide la consulta
+# de una página: primera, profunda (cursor), búsqueda por cliente, filtro por equipo/modo/fechas.
+# Uso: python bench/bench_historial.py [--filas 150000] [--repeticiones 50]
+# ==============================================================================
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from historial import HistorialSQLite
+from motor import MODO_RO, MODO_DESCAL, catalogo_actual
+
+def llenar(h, n, semilla=0):
+    rnd = random.Random(semilla)
+    cat = catalogo_actual()
+    inicio = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    filas = []
+    for i in range(n):
+        empresa = "DISTRIBUIDOR A" if rnd.random() < 0.8 else f"DISTRIBUIDOR {rnd.choice('BCDE')}"
+        modo = MODO_RO if rnd.random() < 0.7 else MODO_DESCAL
+        ro = rnd.choice(cat.ro).nombre if modo == MODO_RO else None
+        filas.append({'empresa': empresa, 'usuario': 'u', 'fecha': (inicio + timedelta(minutes=5 * i)).isoformat(timespec='seconds'),
+                      'cliente': f"Cliente {rnd.randrange(5000)}", 'modo': modo, 'ro': ro, 'silex': None, 'carbon': None,
+                      'descal': rnd.choice(cat.descal).nombre, 'consumo': rnd.randrange(500, 40000), 'opex': rnd.random() * 1e4,
+                      'catalogo': cat.version, 'entrada': {'consumo': 1}, 'salida': {'ro': ro}})
+        if len(filas) == 10_000: h.guardar(filas); filas = []
+    if filas: h.guardar(filas)
+    return cat, inicio
+
+def medir(fn, rep):
+    fn()
+    t = time.perf_counter()
+    for _ in range(rep): r = fn()
+    return (time.perf_counter() - t) / rep * 1000, r
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--filas", type=int, default=150_000)
+    ap.add_argument("--repeticiones", type=int, default=50)
+    a = ap.parse_args(argv)
+    ruta = os.path.join(tempfile.mkdtemp(prefix="historial_"), "historial.db")
+    h = HistorialSQLite(ruta)
+    t = time.perf_counter(); cat, inicio = llenar(h, a.filas)
+    print(f"{a.filas:,} presupuestos escritos en {time.perf_counter() - t:.1f} s · empresa A: {h.contar('DISTRIBUIDOR A'):,}")
+    _, siguiente = h.pagina("DISTRIBUIDOR A")
+    profundo = siguiente - int(a.filas * 0.7)
+    mitad = (inicio + timedelta(minutes=5 * a.filas // 2)).date().isoformat()
+    casos = {
+        "primera página": lambda: h.pagina("DISTRIBUIDOR A"),
+        "página profunda (cursor)": lambda: h.pagina("DISTRIBUIDOR A", profundo),
+        "búsqueda cliente": lambda: h.pagina("DISTRIBUIDOR A", texto="Cliente 123"),
+        "búsqueda rara": lambda: h.pagina("DISTRIBUIDOR A", texto="Cliente 4999"),
+        "modo": lambda: h.pagina("DISTRIBUIDOR A", modo=MODO_DESCAL),
+        "equipo": lambda: h.pagina("DISTRIBUIDOR A", equipo=('ro', cat.ro[-1].nombre)),
+        "rango de fechas": lambda: h.pagina("DISTRIBUIDOR A", desde=mitad, hasta=mitad[:8] + "28"),
+        "detalle": lambda: h.obtener("DISTRIBUIDOR A", profundo),
+    }
+    for nombre, fn in casos.items():
+        ms, r = medir(fn, a.repeticiones)
+        print(f"{nombre:>26}: {ms:7.2f} ms")
+
+if __name__ == "__main__":
+    main()
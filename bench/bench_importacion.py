@@ -0,0 +1,41 @@
+# ==============================================================================
+# BENCHMARK: tiempo de importación en frío
+# Cada caso se importa en un proceso nuevo; se informa la mediana de N repeticiones.
+# Uso: python bench/bench_importacion.py [--repeticiones 7]
+# ==============================================================================
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+CASOS = [
+    ("python vacío", "pass"),
+    ("motor (núcleo sin dependencias)", "import motor"),
+    ("cli", "import cli"),
+    ("motor + cálculo", "import motor; motor.calcular_fila({'consumo': 5000})"),
+    ("lote (numpy + pandas)", "import lote"),
+    ("dependencias de app.py antes del cambio", "import streamlit, plotly.express, pandas, supabase, fpdf, requests, PIL.Image"),
+]
+
+def medir(codigo, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        prog = f"import time; t = time.perf_counter(); {codigo}; print(time.perf_counter() - t)"
+        out = subprocess.run([sys.executable, "-c", prog], cwd=RAIZ, capture_output=True, text=True)
+        if out.returncode: return None
+        tiempos.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(tiempos)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--repeticiones', type=int, default=7)
+    args = ap.parse_args()
+    for nombre, codigo in CASOS:
+        t = medir(codigo, args.repeticiones)
+        print(f"{nombre:<42} {'no disponible' if t is None else f'{t * 1000:8.1f} ms'}")
+
+if __name__ == "__main__":
+    main()
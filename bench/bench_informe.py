@@ -0,0 +1,101 @@
+# ==============================================================================
+# BENCHMARK: generación de informes PDF
+# Compara create_pdf() actual con la versión anterior (descarga del logo en cada informe,
+# NamedTemporaryFile sin borrar, PNG analizado por FPDF cada vez). El logo del cliente se
+# sirve desde un servidor HTTP local. Cada variante corre en un proceso propio.
+# Uso: python bench/bench_informe.py [--informes 1000] [--informes-legado 100]
+# ==============================================================================
+import argparse
+import http.server
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+def create_pdf_legado(res, inputs, modo, user_data):
+    import requests
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.add_page()
+    logo_impreso = False
+    if user_data.get("logo_url") and len(str(user_data["logo_url"])) > 5:
+        try:
+            response = requests.get(user_data["logo_url"])
+            if response.status_code == 200:
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
+                    tmp.write(response.content)
+                    pdf.image(tmp.name, 10, 8, 33)
+                    logo_impreso = True
+        except: pass
+    if not logo_impreso:
+        try: pdf.image(str(RAIZ / 'logo.png'), 10, 8, 33)
+        except: pass
+    pdf.ln(20)
+    def clean(text): return str(text).encode('latin-1', 'replace').decode('latin-1') if text else "N/A"
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, clean(f"INFORME TÉCNICO - {user_data.get('empresa', 'HYDROLOGIC').upper()}"), 0, 1, 'C')
+    pdf.set_font("Arial", '', 10)
+    pdf.cell(0, 8, clean(f"Consumo: {inputs['consumo']} L/dia | Punta: {inputs['punta']} L/min"), 0, 1)
+    pdf.cell(0, 8, clean(f"G. OSMOSIS: {res['ro'].nombre}"), 0, 1)
+    pdf.cell(0, 8, clean(f"TUBERIA: {res['tuberia']}"), 0, 1)
+    return pdf.output(dest='S').encode('latin-1')
+
+def _servidor_logo():
+    manejador = partial(http.server.SimpleHTTPRequestHandler, directory=str(RAIZ))
+    manejador.log_message = lambda *a: None
+    srv = http.server.ThreadingHTTPServer(('127.0.0.1', 0), manejador)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}/logo.png"
+
+def _ficheros_tmp():
+    return {e.path for e in os.scandir(tempfile.gettempdir()) if e.is_file()}
+
+def variante(nombre, n):
+    if nombre == "nuevo": os.environ["HYDROLOGIC_CACHE_LOGOS"] = tempfile.mkdtemp(prefix="bench_logos_")
+    from motor import calcular_fila, MODO_RO
+    from informe import create_pdf
+    crear = create_pdf if nombre == "nuevo" else create_pdf_legado
+    srv, url = _servidor_logo()
+    usuarios = [{'empresa': f"DISTRIBUIDOR {i % 10}", 'logo_url': url} for i in range(n)]
+    res = calcular_fila({'consumo': 5000, 'ppm': 800, 'dureza': 35})
+    inputs = {'consumo': 5000, 'horas': 20, 'origen': "Red Pública", 'ppm': 800, 'dureza': 35, 'punta': 40}
+    tmp0, rss0 = _ficheros_tmp(), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter(); primero = None
+    for u in usuarios:
+        crear(res, inputs, MODO_RO, u)
+        if primero is None: primero = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    srv.shutdown()
+    nuevos = _ficheros_tmp() - tmp0
+    for ruta in nuevos:  # la versión anterior los dejaba para siempre; aquí se cuentan y se borran
+        if ruta.endswith('.png'): os.remove(ruta)
+    return {'n': n, 'total': total, 'primero': primero, 'tmp': len(nuevos), 'rss_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss0) / 1024}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--informes', type=int, default=1000)
+    ap.add_argument('--informes-legado', type=int, default=100, help="informes con la versión anterior (se extrapola a --informes)")
+    ap.add_argument('--variante', choices=['legado', 'nuevo'], help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.variante:
+        print(json.dumps(variante(args.variante, args.informes))); return
+    for nombre, n in (("legado", min(args.informes_legado, args.informes)), ("nuevo", args.informes)):
+        out = subprocess.run([sys.executable, __file__, '--variante', nombre, '--informes', str(n)], capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        escala = args.informes / r['n']
+        nota = "" if escala == 1 else f" (extrapolado de {r['n']})"
+        print(f"{nombre:<7} {args.informes:>5} informes: {r['total'] * escala:8.2f} s{nota} | {r['total'] / r['n'] * 1000:7.2f} ms/informe | "
+              f"primero {r['primero'] * 1000:6.1f} ms | +{r['tmp'] * escala:.0f} ficheros en {tempfile.gettempdir()} | "
+              f"+RSS máx. {r['rss_mb']:.1f} MB")
+
+if __name__ == "__main__":
+    main()
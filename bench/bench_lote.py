@@ -0,0 +1,68 @@
+# ==============================================================================
+# BENCHMARK: calcular() escalar vs calcular_lote() vectorizado
+# Uso: python bench/bench_lote.py [--filas 10000 1000000] [--muestra 100000]
+# ==============================================================================
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from motor import calcular, aplanar, MODO_RO, MODO_DESCAL, SALIDAS
+from lote import calcular_lote
+
+def corpus(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'origen': rng.choice(["Red Pública", "Pozo"], n),
+        'modo': rng.choice([MODO_RO, MODO_DESCAL], n, p=[0.7, 0.3]),
+        'consumo': rng.integers(1, 400, n) * 100,
+        'caudal_punta': rng.integers(5, 200, n),
+        'ppm': rng.integers(50, 7000, n),
+        'dureza': rng.integers(0, 80, n),
+        'temp': rng.integers(5, 35, n),
+        'horas': rng.integers(4, 25, n),
+        'buffer_on': rng.random(n) < 0.7,
+        'descal_on': rng.random(n) < 0.8,
+        'man_fin': np.where(rng.random(n) < 0.1, rng.integers(500, 20000, n), 0),
+        'man_buffer': np.where(rng.random(n) < 0.1, rng.integers(100, 5000, n), 0),
+    })
+
+def escalar(df, costes):
+    filas = []
+    for r in df.itertuples(index=False):
+        res = calcular(r.origen, r.modo, r.consumo, r.caudal_punta, r.ppm, r.dureza, r.temp, r.horas, costes, r.buffer_on, r.descal_on, r.man_fin, r.man_buffer)
+        filas.append(aplanar(res))
+    return pd.DataFrame(filas, columns=SALIDAS, index=df.index)
+
+def comparar(a, b):
+    """Devuelve el número de filas que difieren entre dos DataFrames de SALIDAS."""
+    distintas = np.zeros(len(a), bool)
+    for k in SALIDAS:
+        x, y = a[k].to_numpy(), b[k].to_numpy()
+        if x.dtype.kind == 'f' or y.dtype.kind == 'f':
+            distintas |= ~np.isclose(x.astype(float), y.astype(float), rtol=1e-12, atol=0, equal_nan=True)
+        else:
+            distintas |= ~((x == y) | (pd.isna(x) & pd.isna(y)))
+    return int(distintas.sum())
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--filas', type=int, nargs='+', default=[10_000, 1_000_000])
+    ap.add_argument('--muestra', type=int, default=100_000, help="filas máximas a calcular en escalar (el resto se extrapola)")
+    args = ap.parse_args()
+    costes = {'agua': 1.5, 'sal': 0.45, 'luz': 0.20}
+    for n in args.filas:
+        df = corpus(n)
+        t0 = time.perf_counter(); vec = calcular_lote(df, costes); t_vec = time.perf_counter() - t0
+        m = min(n, args.muestra)
+        t0 = time.perf_counter(); esc = escalar(df.iloc[:m], costes); t_esc = (time.perf_counter() - t0) * n / m
+        difs = comparar(vec.iloc[:m], esc)
+        nota = "" if m == n else f" (extrapolado de {m:,})"
+        print(f"{n:>10,} filas | escalar {t_esc:8.3f} s{nota} | lote {t_vec:7.3f} s | x{t_esc / t_vec:7.1f} | filas distintas: {difs}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# ==============================================================================
+# BENCHMARK: modo probabilístico (Monte Carlo) en un proceso y en un pool
+# Mide el tiempo hasta el primer bloque (lo que tarda la interfaz en pintar algo) y el total.
+# Uso: python bench/bench_montecarlo.py [--sorteos 100000] [--bloque 10000] [--procesos 4]
+# ==============================================================================
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from incertidumbre import montecarlo
+from motor import MODO_RO
+
+BASE = {'origen': "Red Pública", 'modo': MODO_RO, 'consumo': 5000, 'caudal_punta': 40, 'horas': 20, 'buffer_on': True, 'descal_on': True}
+DISTRIBUCIONES = {'consumo': ('normal', 5000, 1500), 'ppm': ('normal', 800, 200), 'dureza': ('triangular', 20, 35, 60),
+                  'temp': ('muestras', [8, 11, 14, 15, 18, 22])}
+
+def medir(n, bloque, pool):
+    t = time.perf_counter()
+    primero = None
+    for acum in montecarlo(BASE, DISTRIBUCIONES, n, bloque, pool, semilla=1):
+        if primero is None: primero = time.perf_counter() - t
+    return primero, time.perf_counter() - t, acum.resumen()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sorteos", type=int, default=100_000)
+    ap.add_argument("--bloque", type=int, default=10_000)
+    ap.add_argument("--procesos", type=int, default=os.cpu_count())
+    a = ap.parse_args(argv)
+    primero, total, r = medir(a.sorteos, a.bloque, None)
+    print(f"1 proceso   · primer bloque {primero * 1000:6.0f} ms · total {total:.2f} s · {a.sorteos / total:,.0f} sorteos/s")
+    with ProcessPoolExecutor(a.procesos) as pool:
+        medir(a.bloque, a.bloque, pool)  # calentamiento: arranque de procesos e importaciones
+        primero, total, r2 = medir(a.sorteos, a.bloque, pool)
+    print(f"{a.procesos} procesos · primer bloque {primero * 1000:6.0f} ms · total {total:.2f} s · {a.sorteos / total:,.0f} sorteos/s")
+    assert r['opex_p90'] == r2['opex_p90'] and r['p_sin_solucion'] == r2['p_sin_solucion'], "el pool no reproduce el resultado"
+    print(f"OPEX P90 {r['opex_p90']:,.0f} € · sin solución {r['p_sin_solucion']:.2%} · autonomía P50 {r['dias_p50']:.1f} días")
+    print(r['p_ro'].head(5).to_string(float_format='{:.1%}'.format))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# ==============================================================================
+# SUITE DE RENDIMIENTO (REGRESIONES ANTES DE DESPLEGAR)
+# Corpus fijos por escenario (RO red, RO pozo, alta salinidad, solo descal) y throughput de cada etapa:
+# calcular() escalar, calcular_lote(), create_pdf(), optimizar() y simular(). Con --guardar escribe la
+# referencia de esta máquina; sin él compara contra ella y sale con código 1 si alguna etapa cae más
+# de --tolerancia.
+# Uso: python bench/bench_motor.py [--guardar] [--referencia bench/referencia_motor.json] [--tolerancia 0.25]
+# ==============================================================================
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from informe import create_pdf
+from lote import calcular_lote
+from motor import MODO_RO, MODO_DESCAL, calcular_fila, DEFECTOS
+from optimizador import optimizar
+from simulacion import perfil_demanda, simular
+
+REFERENCIA = Path(__file__).resolve().parent / "referencia_motor.json"
+USUARIO = {"empresa": "BENCH", "logo_url": ""}
+
+def corpus(escenario, n=2000):
+    """Entradas deterministas (semilla fija por escenario)."""
+    rng = np.random.default_rng(sum(map(ord, escenario)))
+    df = pd.DataFrame({
+        'origen': "Red Pública", 'modo': MODO_RO, 'consumo': rng.integers(5, 300, n) * 100, 'caudal_punta': rng.integers(10, 150, n),
+        'ppm': rng.integers(100, 1500, n), 'dureza': rng.integers(5, 60, n), 'temp': rng.integers(8, 30, n), 'horas': rng.integers(8, 24, n),
+        'buffer_on': rng.random(n) < 0.7, 'descal_on': rng.random(n) < 0.8, 'man_fin': 0, 'man_buffer': 0,
+    })
+    if escenario == 'ro_pozo': df['origen'] = "Pozo"
+    elif escenario == 'alta_tds': df['ppm'] = rng.integers(2500, 6000, n)
+    elif escenario == 'descal': df['modo'], df['ppm'], df['dureza'] = MODO_DESCAL, 0, rng.integers(10, 80, n)
+    return df
+
+ESCENARIOS = ('ro_red', 'ro_pozo', 'alta_tds', 'descal')
+
+def _por_segundo(fn, unidades, min_t=0.5):
+    fn()  # calentamiento (cachés, compilación)
+    n, t0 = 0, time.perf_counter()
+    while True:
+        fn(); n += 1
+        dt = time.perf_counter() - t0
+        if dt >= min_t: return unidades * n / dt
+
+def medir():
+    out = {}
+    for esc in ESCENARIOS:
+        df = corpus(esc)
+        filas = df.to_dict('records')
+        sol = [(f, r) for f, r in ((f, calcular_fila(f)) for f in filas[:200]) if r.get('ro') or r.get('descal')]
+        costes = {'agua': DEFECTOS['coste_agua'], 'sal': DEFECTOS['coste_sal'], 'luz': DEFECTOS['coste_luz']}
+        pdfs = [(r, {'consumo': f['consumo'], 'horas': f['horas'], 'origen': f['origen'], 'ppm': f['ppm'], 'dureza': f['dureza'], 'punta': f['caudal_punta']}, f['modo'])
+                for f, r in sol[:20]]
+        opt = [(f['origen'], f['modo'], f['consumo'], f['ppm'], f['dureza'], f['temp'], f['horas'], costes, f['buffer_on'], f['descal_on']) for f, _ in sol[:50]]
+        dem = {f['consumo']: perfil_demanda(f['consumo'], 30, 1, 'hotel') for f, _ in sol[:5]}
+        out[esc] = {
+            'calcular_filas_s': _por_segundo(lambda: [calcular_fila(f) for f in filas[:500]], 500),
+            'lote_filas_s': _por_segundo(lambda: calcular_lote(df), len(df)),
+            'create_pdf_s': _por_segundo(lambda: [create_pdf(r, i, m, USUARIO) for r, i, m in pdfs], len(pdfs)) if pdfs else 0.0,
+            'optimizar_s': _por_segundo(lambda: [optimizar(*a) for a in opt], len(opt)) if opt else 0.0,
+            'simular_dias_s': _por_segundo(lambda: [simular(r, dem[f['consumo']], 1, f['dureza']) for f, r in sol[:5]], 30 * len(sol[:5])) if sol else 0.0,
+        }
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--guardar", action="store_true", help="guardar los resultados como referencia")
+    ap.add_argument("--referencia", type=Path, default=REFERENCIA)
+    ap.add_argument("--tolerancia", type=float, default=0.25, help="caída máxima admitida (0.25 = 25%%)")
+    a = ap.parse_args(argv)
+    res = medir()
+    ref = json.loads(a.referencia.read_text()) if a.referencia.exists() and not a.guardar else {}
+    regresiones = 0
+    print(f"{'escenario':>10} {'etapa':>18} {'por segundo':>14} {'referencia':>12}")
+    for esc, etapas in res.items():
+        for etapa, v in etapas.items():
+            r = ref.get(esc, {}).get(etapa)
+            marca = ""
+            if r and v < r * (1 - a.tolerancia):
+                marca = f"  REGRESIÓN {v / r - 1:+.0%}"; regresiones += 1
+            print(f"{esc:>10} {etapa:>18} {v:14,.0f} {r if r is not None else float('nan'):12,.0f}{marca}")
+    if a.guardar:
+        a.referencia.write_text(json.dumps(res, indent=1))
+        print(f"Referencia guardada en {a.referencia}")
+    return regresiones
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,104 @@
+# ==============================================================================
+# BENCHMARK DEL OPTIMIZADOR
+# Tiempo de optimizar() sobre catálogos aleatorios de cientos de equipos y comprobación contra el
+# producto cartesiano completo (todas las combinaciones y tramos de bomba) en catálogos pequeños.
+# Uso: python bench/bench_optimizador.py [--equipos 100 300] [--casos 30] [--semillas 6] [--verificar 200]
+# ==============================================================================
+import argparse
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from catalogo import Catalogo, EquipoRO, Filtro
+from motor import MODO_RO, MODO_DESCAL, TRAMOS_BOMBA
+from optimizador import DIAS_MIN_REGEN, _pareto, optimizar, precio_bomba, precio_estimado
+
+COSTES = {'agua': 1.5, 'sal': 0.45, 'luz': 0.20}
+
+def catalogo_aleatorio(n, rnd):
+    ro = [EquipoRO(f"RO {i}", rnd.choice([300, 3000, 5000, 10000, 15000, 20000, 30000, 40000, 60000]) * rnd.uniform(0.8, 1.2),
+                   rnd.choice([1500, 2000, 3000, 6000]), rnd.choice([.5, .6, .7]), rnd.uniform(0.03, 4), "m",
+                   rnd.choice([0, rnd.uniform(1000, 30000)])) for i in range(n)]
+    f = lambda t: [Filtro(t, f"{t} {i}", "b", rnd.uniform(0.3, 10), rnd.uniform(1, 30), rnd.uniform(1, 50), rnd.choice([192, 256, 384, 640, 1800]),
+                          rnd.choice([0, rnd.uniform(200, 8000)])) for i in range(n)]
+    return Catalogo(ro, f("Silex"), f("Carbon"), f("Descal"))
+
+def caso(rnd):
+    return dict(origen=rnd.choice(["Red Pública", "Pozo"]), modo=rnd.choice([MODO_RO] * 3 + [MODO_DESCAL]), consumo=rnd.randrange(500, 40000, 100),
+                ppm=rnd.randrange(100, 6000), dureza=rnd.randrange(0, 80), temp=rnd.randrange(5, 35), horas=rnd.randrange(4, 24),
+                costes=COSTES, buffer_on=rnd.random() < 0.7, descal_on=rnd.random() < 0.8, sin_descal=rnd.random() < 0.3)
+
+def cartesiano(cat, origen, modo, consumo, ppm, dureza, temp, horas, costes, buffer_on, descal_on, sin_descal):
+    """Frente de Pareto por fuerza bruta: todas las combinaciones viables y todos los tramos de bomba suficientes."""
+    fs = 1.2 if origen == "Pozo" else 1.0
+    usa = descal_on and dureza > 5
+    if sin_descal is None: sin_descal = not usa
+    puntos = []
+    def descales(q, carga, permitir_sin):
+        viables = [d for d in cat.descal if d.caudal_max * 1000 >= q]
+        holgados = [d for d in viables if (d.capacidad / carga if carga > 0 else 99) >= DIAS_MIN_REGEN]
+        ops = [(d, (365 / (d.capacidad / carga if carga > 0 else 99)) * d.sal_kg * costes['sal']) for d in holgados or viables]
+        return ops + [(None, 0)] if permitir_sin or not ops else ops
+    def bombas(q):
+        return [kw for lim, (_, kw) in TRAMOS_BOMBA if lim is None or q < lim]
+    if modo != MODO_RO:
+        q = consumo / horas * fs
+        for d, sal in descales(q, consumo / 1000 * dureza, False):
+            if d is None: continue
+            for kw in bombas(max(q, d.caudal_wash * 1000)): puntos.append((precio_estimado('descal', d) + precio_bomba(kw), sal))
+    else:
+        tcf = 1.0 if temp >= 25 else max(1.0 - ((25 - temp) * 0.03), 0.1)
+        fr = 0.8 if ppm > 2500 else 1.0
+        for ro in cat.ro:
+            if ppm > ro.max_ppm or (ro.produccion_nominal * tcf / 24) * horas < consumo: continue
+            agua_in = consumo / (ro.eficiencia * fr)
+            q_f = (agua_in / 20) * fs if buffer_on else (ro.produccion_nominal / 24 / ro.eficiencia) * 1.5 * fs
+            ss = [s for s in cat.silex if s.caudal_max * 1000 >= q_f] or [None]
+            cs = [c for c in cat.carbon if c.caudal_max * 1000 >= q_f] or [None]
+            ds = descales(q_f, agua_in / 1000 * dureza, sin_descal) if usa or sin_descal else [(None, 0)]
+            base = (consumo / (ro.produccion_nominal * tcf / 24)) * ro.potencia_kw * 365 * costes['luz'] + agua_in / 1000 * 365 * costes['agua']
+            for s, c, (d, sal) in itertools.product(ss, cs, ds):
+                w = max([e.caudal_wash * 1000 for e in (s, c, d) if e] + [0])
+                capex = precio_estimado('ro', ro) + sum(precio_estimado(f, e) for f, e in (('silex', s), ('carbon', c), ('descal', d)) if e)
+                for kw in bombas(max(q_f, w)):
+                    puntos.append((capex + precio_bomba(kw), base + sal + consumo / q_f * kw * 365 * costes['luz']))
+    frente = sorted({(round(puntos[i][0], 6), round(puntos[i][1], 6)) for i in _pareto(puntos)})
+    return frente
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--equipos", type=int, nargs="+", default=[100, 300], help="equipos por familia")
+    ap.add_argument("--casos", type=int, default=30)
+    ap.add_argument("--verificar", type=int, default=200, help="casos contra el cartesiano (catálogos de 6-12 por familia)")
+    ap.add_argument("--semillas", type=int, default=6, help="catálogos aleatorios por tamaño (semillas 0..N-1)")
+    a = ap.parse_args(argv)
+    for n in a.equipos:
+        peor = (0, None)
+        for semilla in range(a.semillas):
+            rnd = random.Random(semilla)
+            cat = catalogo_aleatorio(n, rnd)
+            optimizar(**{k: v for k, v in caso(rnd).items()}, cat=cat)  # tablas precalculadas
+            tiempos, tam = [], []
+            for _ in range(a.casos):
+                c = caso(rnd)
+                t = time.perf_counter(); r = optimizar(**c, cat=cat); tiempos.append(time.perf_counter() - t); tam.append(len(r))
+            tiempos.sort()
+            peor = max(peor, (tiempos[-1], semilla))
+            print(f"{n:4d} equipos/familia ({4 * n} en total), semilla {semilla}: mediana {tiempos[len(tiempos) // 2] * 1000:6.1f} ms"
+                  f" · máx {tiempos[-1] * 1000:6.1f} ms · frente medio {sum(tam) / len(tam):.1f} soluciones")
+        print(f"{n:4d} equipos/familia: peor caso {peor[0] * 1000:.1f} ms (semilla {peor[1]})")
+    rnd = random.Random(7)
+    distintos = 0
+    for i in range(a.verificar):
+        cat = catalogo_aleatorio(rnd.randrange(6, 13), rnd)
+        c = caso(rnd)
+        got = sorted((round(s['capex'], 6), round(s['opex'], 6)) for s in optimizar(**c, cat=cat))
+        if got != cartesiano(cat, **c): distintos += 1
+    if a.verificar: print(f"{a.verificar} casos contra el producto cartesiano: {distintos} distintos")
+    return distintos
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
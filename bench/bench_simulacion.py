@@ -0,0 +1,45 @@
+# ==============================================================================
+# BENCHMARK: simulación de un año a 1 minuto (525.600 pasos) por diseño
+# Uso: python bench/bench_simulacion.py [--disenos 50] [--dias 365] [--paso 1]
+# ==============================================================================
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_lote import corpus
+from motor import calcular_fila
+from simulacion import njit, perfil_demanda, simular
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--disenos", type=int, default=50)
+    ap.add_argument("--dias", type=int, default=365)
+    ap.add_argument("--paso", type=int, default=1, help="minutos por paso")
+    a = ap.parse_args(argv)
+    disenos = []
+    for fila in corpus(a.disenos * 3, semilla=3).to_dict('records'):
+        res = calcular_fila(fila)
+        if res.get('ro') or res.get('descal'): disenos.append((fila, res))
+        if len(disenos) == a.disenos: break
+    compilado = getattr(njit, '__module__', '').startswith('numba')
+    t = time.perf_counter()
+    simular(disenos[0][1], perfil_demanda(disenos[0][0]['consumo'], 1, a.paso), a.paso, disenos[0][0]['dureza'])
+    print(f"{'numba' if compilado else 'Python puro'} · primera llamada (compilación/caché): {time.perf_counter() - t:.2f} s")
+    tiempos, sin_cubrir = [], 0
+    for fila, res in disenos:
+        dem = perfil_demanda(fila['consumo'], a.dias, a.paso, 'hotel', ruido=0.3)
+        t = time.perf_counter()
+        r = simular(res, dem, a.paso, fila['dureza'])
+        tiempos.append(time.perf_counter() - t)
+        sin_cubrir += r['deficit_l'] > 0
+    ms = np.array(tiempos) * 1000
+    print(f"{len(disenos)} diseños · {len(dem):,} pasos: media {ms.mean():.1f} ms · p95 {np.percentile(ms, 95):.1f} ms · máx {ms.max():.1f} ms"
+          f" · {sin_cubrir} con déficit")
+
+if __name__ == "__main__":
+    main()
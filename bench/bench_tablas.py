@@ -0,0 +1,49 @@
+# ==============================================================================
+# BENCHMARK: calcular() con selección por índices frente a calcular_tabla() (tablas de decisión)
+# Obras de la rejilla de las tablas (las que la app calcula con los controles por defecto) y fuera de ella.
+# Uso: python bench/bench_tablas.py [--obras 20000] [--carpeta tablas]
+# ==============================================================================
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from motor import MODO_RO, MODO_DESCAL, calcular, catalogo_actual
+from tablas import CARPETA, Tablas, calcular_tabla
+
+def obras(n, en_rejilla, semilla=5):
+    rng = random.Random(semilla)
+    costes = {'agua': 1.5, 'sal': 0.45, 'luz': 0.20}
+    out = []
+    for _ in range(n):
+        consumo = rng.randrange(5, 300) * 100 if en_rejilla else rng.uniform(500, 30000)
+        out.append((rng.choice(["Red Pública", "Pozo"]), MODO_RO if rng.random() < 0.8 else MODO_DESCAL, consumo, 40, rng.randrange(100, 4000),
+                    rng.randrange(5, 60), rng.randrange(5, 30), rng.randrange(8, 24), costes, rng.random() < 0.7, rng.random() < 0.8, 0, 0))
+    return out
+
+def _mejor(fn, casos, repeticiones=5):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        for a in casos: fn(*a)
+        mejor = min(mejor, time.perf_counter() - t)
+    return mejor / len(casos) * 1e6
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--obras", type=int, default=20_000)
+    ap.add_argument("--carpeta", default=CARPETA)
+    a = ap.parse_args(argv)
+    cat = catalogo_actual()
+    tablas = Tablas.abrir(a.carpeta, cat)
+    if tablas is None: sys.exit(f"No hay tablas en {a.carpeta}: python tablas.py construir --carpeta {a.carpeta}")
+    for nombre, en_rejilla in (("en rejilla", True), ("fuera de rejilla", False)):
+        casos = [c + (cat,) for c in obras(a.obras, en_rejilla)]
+        motor = _mejor(calcular, casos)
+        tabla = _mejor(lambda *x: calcular_tabla(*x, tablas=tablas), casos)
+        print(f"{nombre:>17}: motor {motor:6.2f} us · tabla {tabla:6.2f} us · {motor / tabla:4.2f}x")
+
+if __name__ == "__main__":
+    main()
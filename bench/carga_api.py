@@ -0,0 +1,99 @@
+# ==============================================================================
+# PRUEBA DE CARGA DE LA API
+# Lanza una instancia local de api.py (o usa --url) y mide latencia p50/p99 y peticiones/s.
+# Uso: python bench/carga_api.py [--peticiones 5000] [--concurrencia 64] [--batch 100000] [--url http://127.0.0.1:8080]
+# ==============================================================================
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_lote import corpus
+
+def percentil(valores, p):
+    v = sorted(valores)
+    return v[min(int(len(v) * p / 100), len(v) - 1)]
+
+def obras(n):
+    return [{k: (v.item() if hasattr(v, 'item') else v) for k, v in f.items()} for f in corpus(n, semilla=1).to_dict('records')]
+
+async def carga_calcular(url, filas, concurrencia):
+    latencias, errores = [], 0
+    cola = asyncio.Queue()
+    for f in filas: cola.put_nowait(f)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrencia)) as s:
+        async def trabajador():
+            nonlocal errores
+            while not cola.empty():
+                f = cola.get_nowait()
+                t = time.perf_counter()
+                async with s.post(f"{url}/calcular", json=f) as r:
+                    await r.read()
+                    if r.status >= 500: errores += 1
+                latencias.append(time.perf_counter() - t)
+        t0 = time.perf_counter()
+        await asyncio.gather(*[trabajador() for _ in range(concurrencia)])
+        total = time.perf_counter() - t0
+    print(f"/calcular        {len(filas):>8,} pet. | c={concurrencia:<4} | p50 {percentil(latencias, 50) * 1000:7.2f} ms | "
+          f"p99 {percentil(latencias, 99) * 1000:7.2f} ms | {len(filas) / total:9,.0f} pet/s | errores {errores}")
+
+async def carga_batch(url, filas):
+    cuerpo = "".join(json.dumps(f) + "\n" for f in filas).encode()
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None)) as s:
+        t0 = time.perf_counter(); primera, n = None, 0
+        async with s.post(f"{url}/calcular/batch", data=cuerpo, headers={'Content-Type': 'application/x-ndjson'}) as r:
+            async for _ in r.content:
+                if primera is None: primera = time.perf_counter() - t0
+                n += 1
+        total = time.perf_counter() - t0
+    print(f"/calcular/batch  {n:>8,} obras | primera fila {primera * 1000:7.1f} ms | total {total:6.2f} s | {n / total:9,.0f} obras/s")
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0)); return s.getsockname()[1]
+
+async def _esperar(url, proc):
+    async with aiohttp.ClientSession() as s:
+        for _ in range(200):
+            if proc.poll() is not None: raise RuntimeError("La API no ha arrancado")
+            try:
+                async with s.get(f"{url}/salud") as r:
+                    if r.status == 200: return
+            except aiohttp.ClientError: pass
+            await asyncio.sleep(0.05)
+
+async def principal(args):
+    proc = None
+    url = args.url
+    if not url:
+        puerto = _puerto_libre()
+        url = f"http://127.0.0.1:{puerto}"
+        cmd = [sys.executable, str(RAIZ / "api.py"), "--port", str(puerto)] + (["--procesos", str(args.procesos)] if args.procesos else [])
+        proc = subprocess.Popen(cmd, cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        await _esperar(url, proc)
+    try:
+        await carga_calcular(url, obras(args.peticiones), args.concurrencia)
+        if args.batch: await carga_batch(url, obras(args.batch))
+    finally:
+        if proc: proc.terminate(); proc.wait()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--url', help="API ya en marcha (si no, se lanza una local)")
+    ap.add_argument('--peticiones', type=int, default=5000)
+    ap.add_argument('--concurrencia', type=int, default=64)
+    ap.add_argument('--batch', type=int, default=100_000, help="obras a enviar a /calcular/batch (0 para omitir)")
+    ap.add_argument('--procesos', type=int, help="procesos de cálculo de la instancia local")
+    asyncio.run(principal(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# ==============================================================================
+# PRUEBA DE CARGA DE LOGINS
+# N inicios de sesión simultáneos contra supabase_local (SQLite con latencia de red simulada), cada uno
+# seguido de --reruns lecturas del perfil (lo que hace check_auth en cada rerun), sin caché de perfiles y
+# con ella. La contraseña se comprueba siempre en la base: la caché solo ahorra las lecturas del perfil.
+# Mide latencia p50/p99 del login, logins/s y peticiones que llegan a la base.
+# Uso: python bench/carga_logins.py [--logins 500] [--usuarios 100] [--reruns 5] [--latencia 0.02] [--hilos 500]
+# ==============================================================================
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from datos import AccesoDatos
+from supabase_local import ClienteLocal
+
+def percentil(valores, p):
+    v = sorted(valores)
+    return v[min(int(len(v) * p / 100), len(v) - 1)]
+
+def poblar(cliente, usuarios):
+    cliente.table("usuarios").insert([{"username": f"u{i}", "password": f"p{i}", "empresa": f"EMPRESA {i}", "rol": "cliente",
+                                       "activo": i % 10 != 0, "logo_url": ""} for i in range(usuarios)]).execute()
+
+def ronda(datos, logins, usuarios, hilos, reruns, semilla=0):
+    rnd = random.Random(semilla)
+    # 5% de contraseñas erróneas y 5% de usuarios inexistentes
+    intentos = [(f"u{rnd.randrange(usuarios * 21 // 20)}", "mal" if rnd.random() < 0.05 else None) for _ in range(logins)]
+    salida = threading.Barrier(min(hilos, logins))
+    def login(par):
+        user, pwd = par
+        try: salida.wait(timeout=5)
+        except threading.BrokenBarrierError: pass
+        t = time.perf_counter()
+        u = datos.autenticar(user, pwd or "p" + user[1:])
+        dt = time.perf_counter() - t
+        if u:
+            for _ in range(reruns): datos.perfil(user)
+        return dt, bool(u and u.get("activo"))
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ex: res = list(ex.map(login, intentos))
+    return time.perf_counter() - t0, [r[0] for r in res], sum(r[1] for r in res)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--logins", type=int, default=500)
+    ap.add_argument("--usuarios", type=int, default=100)
+    ap.add_argument("--reruns", type=int, default=5, help="lecturas del perfil tras cada login aceptado")
+    ap.add_argument("--latencia", type=float, default=0.02, help="segundos por petición simulada")
+    ap.add_argument("--hilos", type=int, default=500)
+    a = ap.parse_args(argv)
+    print(f"{a.logins} logins simultáneos · {a.usuarios} usuarios · {a.reruns} lecturas de perfil por sesión · {a.latencia * 1000:.0f} ms por petición")
+    for nombre, ttl in (("sin caché", 0), ("caché fría", 300), ("caché caliente", 300)):
+        if nombre != "caché caliente":
+            cliente = ClienteLocal(latencia=0); poblar(cliente, a.usuarios); cliente.latencia = a.latencia
+            datos = AccesoDatos(cliente, ttl_perfil=ttl)
+        antes = cliente.peticiones
+        total, lat, ok = ronda(datos, a.logins, a.usuarios, a.hilos, a.reruns)
+        m = datos.metricas().get('usuarios.autenticar', {})
+        print(f"{nombre:>15}: {a.logins / total:7.0f} logins/s  p50 {percentil(lat, 50) * 1000:6.1f} ms  p99 {percentil(lat, 99) * 1000:6.1f} ms"
+              f"  · {cliente.peticiones - antes:4d} peticiones a la base · {ok} aceptados · consulta p95 {m.get('p95_ms', 0):.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# ==============================================================================
+# PRUEBA DE RESISTENCIA: cientos de sesiones de la app vivas a la vez
+# Cada sesión (AppTest) entra, calcula una obra al azar y, una parte, abre el barrido 2D. Las sesiones
+# se mantienen abiertas y se imprime la memoria residente (RSS) del proceso cada --cada sesiones, junto
+# con el peso medio del estado de sesión y el uso de las cachés compartidas.
+# Uso: python bench/soak_sesiones.py [--sesiones 200] [--cada 20] [--barrido 0.2] [--empresas 20]
+# ==============================================================================
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+def rss_mb():
+    """Memoria residente actual (Linux); si no hay /proc, el máximo que da getrusage."""
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"): return int(linea.split()[1]) / 1024
+    except OSError: pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def sesion(rng, empresas, con_barrido):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(RAIZ / "app.py"), default_timeout=120)
+    at.run()
+    at.text_input[0].input("admin"); at.text_input[1].input("hydro2025"); at.button[0].click(); at.run(); at.run()
+    # Sin Supabase solo existe el usuario admin: se reparte entre empresas para ejercitar la marca por empresa
+    at.session_state["user_info"] = {"username": "admin", "empresa": f"DISTRIBUIDOR {rng.randrange(empresas)}", "rol": "cliente", "logo_url": ""}
+    at.number_input(key="consumo").set_value(rng.randrange(5, 300) * 100)
+    at.number_input(key="ppm").set_value(rng.randrange(100, 2500))
+    at.number_input(key="dureza").set_value(rng.randrange(5, 60))
+    at.run()
+    next(b for b in at.button if b.label == "CALCULAR").click(); at.run()
+    if con_barrido:
+        at.radio(key="vista").set_value("Barrido"); at.run()
+        at.selectbox(key="barrido_Y").set_value("temp"); at.run()
+    if at.exception: raise RuntimeError(at.exception[0].value)
+    return at
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sesiones", type=int, default=200)
+    ap.add_argument("--cada", type=int, default=20, help="sesiones entre mediciones")
+    ap.add_argument("--barrido", type=float, default=0.2, help="fracción de sesiones que abren el barrido 2D")
+    ap.add_argument("--empresas", type=int, default=20)
+    a = ap.parse_args(argv)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    from cache import PDFS, RESULTADOS
+    from recursos import peso
+    rng = random.Random(7)
+    vivas, t0 = [], time.perf_counter()
+    print(f"{'sesiones':>8} {'RSS MB':>8} {'sesión KB':>10} {'cálculos':>9} {'PDF disco MB':>13} {'s':>6}")
+    print(f"{0:8} {rss_mb():8.0f}")
+    for i in range(1, a.sesiones + 1):
+        vivas.append(sesion(rng, a.empresas, rng.random() < a.barrido))
+        if i % a.cada == 0 or i == a.sesiones:
+            media = sum(peso(at.session_state._state.filtered_state) for at in vivas) / len(vivas) / 1024
+            print(f"{i:8} {rss_mb():8.0f} {media:10.0f} {RESULTADOS.estadisticas()['entradas']:9} "
+                  f"{PDFS.estadisticas()['bytes'] / 2**20:13.1f} {time.perf_counter() - t0:6.0f}")
+
+if __name__ == "__main__":
+    main()
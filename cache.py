@@ -0,0 +1,166 @@
+# ==============================================================================
+# CACHÉ DE RESULTADOS
+# LRU con caducidad, compartida por todas las sesiones del proceso. CacheDisco guarda los valores
+# (bytes) en disco y deja en memoria solo el índice: para artefactos grandes como los informes PDF.
+# ==============================================================================
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+CARPETA_PDFS = os.environ.get("HYDROLOGIC_CACHE_PDFS") or os.path.join(tempfile.gettempdir(), "hydrologic_pdfs")
+
+def _canonico(v):
+    if hasattr(v, 'item') and not isinstance(v, (str, bytes)): v = v.item()  # escalares NumPy
+    if isinstance(v, dict): return {str(k): _canonico(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)): return [_canonico(x) for x in v]
+    if v is None or isinstance(v, (bool, int, float, str)): return v
+    return str(v)
+
+def clave(*partes):
+    """Hash estable de las partes (dicts ordenados por clave; 2000 y 2000.0 son claves distintas porque el informe las imprime distinto)."""
+    return hashlib.sha1(json.dumps(_canonico(partes), sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+class CacheLRU:
+    def __init__(self, max_entradas=1024, ttl=3600, reloj=time.monotonic):
+        self.max_entradas, self.ttl, self.reloj = max_entradas, ttl, reloj
+        self._datos = OrderedDict()
+        self._en_curso = {}
+        self._lock = threading.Lock()
+        self.aciertos = self.fallos = self.expulsiones = 0
+
+    def obtener(self, k, calcular_valor):
+        """
+        Devuelve el valor guardado para `k` o lo calcula con `calcular_valor()` y lo guarda (None no se guarda).
+        El valor no debe modificarse. Si otro hilo ya está calculando `k`, se espera a su resultado en lugar de
+        repetir el cálculo. El lock solo protege el índice: la lectura y escritura de los valores van fuera.
+        """
+        while True:
+            ahora = self.reloj()
+            with self._lock:
+                entrada = self._datos.get(k)
+                if entrada and entrada[0] > ahora: self._datos.move_to_end(k)
+                else:
+                    entrada, en_curso = None, self._en_curso.get(k)
+                    if en_curso is None:
+                        self._en_curso[k] = threading.Event()
+                        self.fallos += 1
+                        break
+            if entrada is None:
+                en_curso.wait()
+                continue
+            valor = self._cargar(entrada[1])
+            if valor is not None:
+                with self._lock: self.aciertos += 1
+                return valor
+            self._quitar(k, entrada)  # perdido (p.ej. borrado del disco): se recalcula
+        try:
+            valor = calcular_valor()
+            if valor is None: return None  # «no hay valor» no se guarda (sería un fallo perpetuo): se recalcula
+            guardado, soltados = self._guardar(k, valor), []
+            with self._lock:
+                previo = self._datos.pop(k, None)
+                if previo: soltados.append(previo[1])
+                self._datos[k] = (ahora + self.ttl, guardado)
+                self._anotar(guardado)
+                while len(self._datos) > 1 and self._excede():
+                    soltados.append(self._datos.popitem(last=False)[1][1])
+                    self.expulsiones += 1
+                for g in soltados: self._soltar(g)
+            for g in soltados: self._borrar(g)
+        finally:
+            with self._lock: self._en_curso.pop(k).set()
+        return valor
+
+    def _quitar(self, k, entrada):
+        """Retira `entrada` de `k` si sigue siendo la vigente."""
+        with self._lock:
+            if self._datos.get(k) is not entrada: return
+            del self._datos[k]
+            self._soltar(entrada[1])
+        self._borrar(entrada[1])
+
+    # Almacenamiento de los valores: en memoria tal cual; CacheDisco los lleva a disco.
+    # _guardar/_cargar/_borrar se llaman sin el lock (pueden hacer E/S); _anotar/_soltar con él (solo contabilidad).
+    def _guardar(self, k, valor): return valor
+    def _cargar(self, guardado): return guardado
+    def _borrar(self, guardado): pass
+    def _anotar(self, guardado): pass
+    def _soltar(self, guardado): pass
+    def _excede(self): return len(self._datos) > self.max_entradas
+
+    def invalidar(self, k):
+        with self._lock:
+            entrada = self._datos.pop(k, None)
+            if entrada: self._soltar(entrada[1])
+        if entrada: self._borrar(entrada[1])
+
+    def limpiar(self):
+        with self._lock:
+            guardados = [g for _, g in self._datos.values()]
+            for g in guardados: self._soltar(g)
+            self._datos.clear()
+        for g in guardados: self._borrar(g)
+
+    def estadisticas(self):
+        total = self.aciertos + self.fallos
+        return {'entradas': len(self._datos), 'aciertos': self.aciertos, 'fallos': self.fallos, 'expulsiones': self.expulsiones,
+                'tasa_acierto': self.aciertos / total if total else 0.0}
+
+class CacheDisco(CacheLRU):
+    """
+    CacheLRU de valores bytes guardados como ficheros en `carpeta`, acotada también en bytes. Cada escritura va a un
+    fichero nuevo (clave, proceso y contador), así que varios procesos pueden compartir carpeta; si un fichero
+    desaparece, esa entrada se recalcula.
+    """
+    def __init__(self, carpeta, max_entradas=4096, max_bytes=256 * 2**20, ttl=3600, reloj=time.monotonic):
+        super().__init__(max_entradas, ttl, reloj)
+        self.carpeta, self.max_bytes, self.bytes = carpeta, max_bytes, 0
+        self._contador = itertools.count()
+        os.makedirs(carpeta, exist_ok=True)
+        limite = time.time() - ttl
+        for f in os.listdir(carpeta):  # restos caducados de ejecuciones anteriores
+            ruta = os.path.join(carpeta, f)
+            try:
+                if os.path.getmtime(ruta) < limite: os.remove(ruta)
+            except OSError: pass
+
+    def _guardar(self, k, valor):
+        ruta = os.path.join(self.carpeta, f"{k}.{os.getpid()}.{next(self._contador)}.bin")
+        try:
+            with open(ruta, 'wb') as f: f.write(valor)
+        except BaseException:
+            self._borrar((ruta, 0))  # escritura fallida: no dejar el fichero a medias
+            raise
+        return ruta, len(valor)
+
+    def _cargar(self, guardado):
+        try:
+            with open(guardado[0], 'rb') as f: return f.read()
+        except FileNotFoundError: return None
+
+    def _borrar(self, guardado):
+        try: os.remove(guardado[0])
+        except OSError: pass
+
+    def _anotar(self, guardado):
+        self.bytes += guardado[1]
+
+    def _soltar(self, guardado):
+        self.bytes -= guardado[1]
+
+    def _excede(self):
+        return super()._excede() or self.bytes > self.max_bytes
+
+    def estadisticas(self):
+        return {**super().estadisticas(), 'bytes': self.bytes}
+
+RESULTADOS = CacheLRU(max_entradas=4096, ttl=3600)
+PDFS = CacheDisco(CARPETA_PDFS, max_entradas=4096, max_bytes=256 * 2**20, ttl=3600)
+
+def clave_calculo(origen, modo, consumo, caudal_punta, ppm, dureza, temp, horas, costes, buffer_on, descal_on, man_fin, man_buffer, cat):
+    return clave('calcular', origen, modo, consumo, caudal_punta, ppm, dureza, temp, horas, costes, bool(buffer_on), bool(descal_on), man_fin, man_buffer, cat.version)
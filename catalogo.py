@@ -0,0 +1,185 @@
+# ==============================================================================
+# CATÁLOGO DE EQUIPOS
+# Carga versionada (JSON / CSV / Supabase) e índices ordenados para la selección.
+# ==============================================================================
+import csv
+import hashlib
+import io
+import json
+import os
+from bisect import bisect_left
+
+RUTA_CATALOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogo.json")
+FAMILIAS = ('ro', 'silex', 'carbon', 'descal')
+
+class EquipoRO:
+    def __init__(self, n, prod, ppm, ef, kw, mem, precio=0):
+        self.nombre = n; self.produccion_nominal = prod; self.max_ppm = ppm; self.eficiencia = ef; self.potencia_kw = kw; self.membranas = mem; self.precio = precio
+class Filtro:
+    def __init__(self, tipo, n, bot, caud, wash, sal=0, cap=0, precio=0):
+        self.tipo = tipo; self.nombre = n; self.medida_botella = bot; self.caudal_max = caud; self.caudal_wash = wash; self.sal_kg = sal; self.capacidad = cap; self.precio = precio
+
+# `precio` (€, opcional): solo lo usa el optimizador; sin él se estima (optimizador.precio_estimado)
+_CAMPOS_RO = ('nombre', 'produccion_nominal', 'max_ppm', 'eficiencia', 'potencia_kw', 'membranas', 'precio')
+_CAMPOS_FILTRO = ('tipo', 'nombre', 'medida_botella', 'caudal_max', 'caudal_wash', 'sal_kg', 'capacidad', 'precio')
+_TEXTO = {'nombre', 'membranas', 'tipo', 'medida_botella'}
+
+def _num(v):
+    if isinstance(v, (int, float)): return v
+    s = str(v).strip().replace(',', '.')
+    return int(s) if s.lstrip('-').isdigit() else float(s)
+
+def _equipo(familia, d):
+    campos = _CAMPOS_RO if familia == 'ro' else _CAMPOS_FILTRO
+    vals = [d.get(k) if k in _TEXTO else _num(d.get(k) if d.get(k) not in (None, "") else 0) for k in campos]
+    return EquipoRO(*vals) if familia == 'ro' else Filtro(*vals)
+
+def _registro(familia, e):
+    r = {k: getattr(e, k) for k in (_CAMPOS_RO if familia == 'ro' else _CAMPOS_FILTRO)}
+    if not r['precio']: del r['precio']  # sin precio: mismo registro (y huella) que antes de existir el campo
+    return r
+
+def huella(datos):
+    return hashlib.sha1(json.dumps(datos, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+# ------------------------------------------------------------------------------
+# Índices
+# ------------------------------------------------------------------------------
+def _primer(valores, cumple):
+    """Primer índice de `valores` (ordenados) que cumple el predicado monótono `cumple`; len(valores) si ninguno."""
+    lo, hi = 0, len(valores)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if cumple(valores[mid]): hi = mid
+        else: lo = mid + 1
+    return lo
+
+class Indice:
+    """
+    Selección por dos umbrales "valor >= mínimo" (eje_a, eje_b). Para cada par de rangos de los valores distintos
+    ordenados guarda la posición en catálogo del primer y último equipo (y del primero `preferido`) que cumple ambos,
+    que es exactamente lo que devolvían las listas de candidatos recorridas en orden. Consulta: dos bisecciones.
+    """
+    def __init__(self, equipos, eje_a, eje_b=None, preferido=None):
+        eje_b = eje_b or (lambda e: 0)
+        n = len(equipos)
+        self.equipos, self.n = list(equipos), n
+        self.a = sorted({eje_a(e) for e in equipos})
+        self.b = sorted({eje_b(e) for e in equipos})
+        na, nb = len(self.a) + 1, len(self.b) + 1
+        primero, ultimo, pref = [[n] * nb for _ in range(na)], [[-1] * nb for _ in range(na)], [[n] * nb for _ in range(na)]
+        for idx, e in enumerate(equipos):
+            i, j = bisect_left(self.a, eje_a(e)), bisect_left(self.b, eje_b(e))
+            primero[i][j] = min(primero[i][j], idx); ultimo[i][j] = max(ultimo[i][j], idx)
+            if preferido and preferido(e): pref[i][j] = min(pref[i][j], idx)
+        for i in range(na - 2, -1, -1):
+            for j in range(nb):
+                primero[i][j] = min(primero[i][j], primero[i + 1][j]); ultimo[i][j] = max(ultimo[i][j], ultimo[i + 1][j]); pref[i][j] = min(pref[i][j], pref[i + 1][j])
+        for i in range(na):
+            for j in range(nb - 2, -1, -1):
+                primero[i][j] = min(primero[i][j], primero[i][j + 1]); ultimo[i][j] = max(ultimo[i][j], ultimo[i][j + 1]); pref[i][j] = min(pref[i][j], pref[i][j + 1])
+        self.t_primero, self.t_ultimo, self.t_pref = primero, ultimo, pref
+        self._np = None
+
+    def rango_a(self, cumple): return _primer(self.a, cumple)
+    def rango_b(self, cumple): return _primer(self.b, cumple)
+
+    def _eq(self, idx): return self.equipos[idx] if 0 <= idx < self.n else None
+    def primero(self, i, j=0): return self._eq(self.t_primero[i][j])
+    def ultimo(self, i, j=0): return self._eq(self.t_ultimo[i][j])
+    def preferido(self, i, j=0): return self._eq(self.t_pref[i][j])
+
+    def arrays(self):
+        """Las mismas tablas como arrays NumPy (para el cálculo por lotes). Se construyen una sola vez."""
+        if self._np is None:
+            import numpy as np
+            self._np = {'a': np.asarray(self.a, float), 'b': np.asarray(self.b, float), 'primero': np.asarray(self.t_primero),
+                        'ultimo': np.asarray(self.t_ultimo), 'pref': np.asarray(self.t_pref)}
+        return self._np
+
+class Catalogo:
+    def __init__(self, ro, silex, carbon, descal, version=""):
+        self.ro, self.silex, self.carbon, self.descal = list(ro), list(silex), list(carbon), list(descal)
+        self.version = version or self.huella()
+        self.idx_ro = Indice(self.ro, lambda r: r.max_ppm, lambda r: r.produccion_nominal, lambda r: "ALFA" in r.nombre or "AP" in r.nombre)
+        self.idx_silex = Indice(self.silex, lambda s: s.caudal_max)
+        self.idx_carbon = Indice(self.carbon, lambda c: c.caudal_max)
+        self.idx_descal = Indice(self.descal, lambda d: d.caudal_max, lambda d: d.capacidad)
+
+    def registros(self):
+        return {f: [_registro(f, e) for e in getattr(self, f)] for f in FAMILIAS}
+
+    def huella(self):
+        return huella(self.registros())
+
+    def __len__(self):
+        return sum(len(getattr(self, f)) for f in FAMILIAS)
+
+    @classmethod
+    def desde_registros(cls, datos, version=""):
+        return cls(*[[_equipo(f, d) for d in datos.get(f, [])] for f in FAMILIAS], version=version)
+
+# ------------------------------------------------------------------------------
+# Carga
+# ------------------------------------------------------------------------------
+def _leer_csv(texto):
+    """CSV plano con columna `familia` (ro/silex/carbon/descal) más los atributos del equipo."""
+    datos = {f: [] for f in FAMILIAS}
+    for fila in csv.DictReader(io.StringIO(texto)):
+        familia = (fila.pop('familia', '') or '').strip().lower()
+        if familia in datos: datos[familia].append(fila)
+    return datos
+
+def cargar(ruta=RUTA_CATALOGO):
+    """Catálogo desde JSON ({"version", "ro", "silex", "carbon", "descal"}) o CSV. Sin versión explícita se usa la huella."""
+    with open(ruta, encoding='utf-8') as f: texto = f.read()
+    if ruta.lower().endswith('.csv'): return Catalogo.desde_registros(_leer_csv(texto), _version_texto(ruta, texto))
+    return Catalogo.desde_registros(json.loads(texto), _version_texto(ruta, texto))
+
+def registros_supabase(cliente, tabla="equipos"):
+    """Filas de la tabla de Supabase (una por equipo, con columna `familia`) agrupadas por familia."""
+    filas = cliente.table(tabla).select("*").order("id").execute().data
+    datos = {f: [] for f in FAMILIAS}
+    for fila in filas:
+        familia = str(fila.get('familia', '')).lower()
+        if familia in datos: datos[familia].append(fila)
+    return datos
+
+def cargar_supabase(cliente, tabla="equipos"):
+    """Catálogo desde Supabase. La versión es la huella del contenido."""
+    datos = registros_supabase(cliente, tabla)
+    return Catalogo.desde_registros(datos, huella(datos))
+
+def guardar(cat, ruta=RUTA_CATALOGO):
+    """Escribe el catálogo en JSON con un equipo por línea (diffs legibles al versionarlo)."""
+    partes = [f'{{\n "version": {json.dumps(cat.version)}']
+    for f, regs in cat.registros().items():
+        filas = ",\n".join("  " + json.dumps(r, ensure_ascii=False) for r in regs)
+        partes.append(f' "{f}": [\n{filas}\n ]')
+    with open(ruta, 'w', encoding='utf-8') as fh: fh.write(",\n".join(partes) + "\n}\n")
+
+def _version_texto(ruta, texto):
+    version = "" if ruta.lower().endswith('.csv') else str(json.loads(texto).get('version', ''))
+    return version or huella(texto)
+
+_vigilado = {}
+
+def version_archivo(ruta=RUTA_CATALOGO):
+    """Versión del fichero de catálogo. Solo se relee cuando cambia su fecha de modificación o tamaño."""
+    st = os.stat(ruta)
+    firma = (st.st_mtime_ns, st.st_size)
+    previo = _vigilado.get(ruta)
+    if previo and previo[0] == firma: return previo[1]
+    with open(ruta, encoding='utf-8') as f: version = _version_texto(ruta, f.read())
+    _vigilado[ruta] = (firma, version)
+    return version
+
+_cargados = {}
+
+def actual(ruta=RUTA_CATALOGO):
+    """Catálogo vigente del fichero `ruta`; se recarga (y reindexa) solo si su versión ha cambiado."""
+    version = version_archivo(ruta)
+    cat = _cargados.get(ruta)
+    if cat is None or cat.version != version:
+        cat = _cargados[ruta] = cargar(ruta)
+    return cat
@@ -0,0 +1,79 @@
+# ==============================================================================
+# LÍNEA DE COMANDOS HYDROLOGIC
+# Dimensiona obras desde JSON / NDJSON / CSV sin Streamlit.
+#
+#   python cli.py obra.json                      (objeto, lista o NDJSON -> JSON por stdout)
+#   python cli.py obras.csv -o resultados.csv
+#   python cli.py obras.csv -o resultados.csv --lote    (motor vectorizado: requiere numpy/pandas)
+#   echo '{"consumo": 5000, "ppm": 1200}' | python cli.py -
+# ==============================================================================
+import argparse
+import csv
+import json
+import math
+import sys
+
+from motor import ENTRADAS, dimensionar_fila, error_no_finito
+
+def leer(ruta, formato=None):
+    if ruta == '-': texto = sys.stdin.read()
+    else:
+        with open(ruta, encoding='utf-8-sig') as f: texto = f.read()
+    formato = formato or ('csv' if ruta.lower().endswith('.csv') else 'json')
+    if formato == 'csv':
+        try: sep = csv.Sniffer().sniff(texto.split('\n', 1)[0], delimiters=',;\t').delimiter
+        except csv.Error: sep = ','  # una sola columna: no hay separador que deducir
+        return list(csv.DictReader(texto.splitlines(), delimiter=sep))
+    texto = texto.strip()
+    if not texto: return []
+    try:
+        datos = json.loads(texto)
+        return datos if isinstance(datos, list) else [datos]
+    except json.JSONDecodeError:
+        return [json.loads(linea) for linea in texto.splitlines() if linea.strip()]
+
+def _limpio(v):
+    return None if isinstance(v, float) and math.isnan(v) else v
+
+def calcular_filas(filas, lote=False):
+    """Devuelve una lista de dicts entrada + SALIDAS. Si una fila no se puede calcular, su campo 'error' lo explica."""
+    if lote:
+        import pandas as pd
+        from lote import calcular_lote
+        try: res = calcular_lote(pd.DataFrame(filas).replace("", None))
+        except (ValueError, TypeError, ArithmeticError) as e: return [{**f, 'error': str(e)} for f in filas]
+        out = []
+        for f, r in zip(filas, res.astype(object).to_dict('records')):
+            error = _limpio(r.pop('error')) or error_no_finito(r)  # como dimensionar_fila: la fila que falla lleva solo 'error'
+            out.append({**f, 'error': error} if error else {**f, **{k: _limpio(v) for k, v in r.items()}})
+        return out
+    return [dimensionar_fila(f) for f in filas]
+
+def escribir(filas, ruta, formato=None):
+    formato = formato or ('csv' if ruta and ruta.lower().endswith('.csv') else 'json')
+    f = open(ruta, 'w', newline='', encoding='utf-8') if ruta and ruta != '-' else sys.stdout
+    try:
+        if formato == 'csv':
+            campos = list(dict.fromkeys(k for fila in filas for k in fila))
+            w = csv.DictWriter(f, fieldnames=campos)
+            w.writeheader(); w.writerows(filas)
+        else:
+            json.dump(filas, f, ensure_ascii=False, indent=1)
+            f.write("\n")
+    finally:
+        if f is not sys.stdout: f.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Dimensionado HYDROLOGIC. Campos de entrada: " + ", ".join(ENTRADAS) + " (solo 'consumo' es obligatorio).")
+    ap.add_argument('entrada', help="fichero .json/.ndjson/.csv o '-' para stdin")
+    ap.add_argument('-o', '--salida', help="fichero .json/.csv (por defecto JSON por stdout)")
+    ap.add_argument('--formato-entrada', choices=['json', 'csv'])
+    ap.add_argument('--formato-salida', choices=['json', 'csv'])
+    ap.add_argument('--lote', action='store_true', help="usar el motor vectorizado (numpy/pandas)")
+    args = ap.parse_args(argv)
+    filas = calcular_filas(leer(args.entrada, args.formato_entrada), args.lote)
+    escribir(filas, args.salida, args.formato_salida)
+    return 1 if any('error' in f for f in filas) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
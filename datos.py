@@ -0,0 +1,154 @@
+# ==============================================================================
+# ACCESO A DATOS (SUPABASE)
+# Un cliente por proceso con pool de conexiones, reintentos con espera exponencial, caché de perfiles
+# con caducidad, escrituras agrupadas y latencia por consulta. Funciona con cualquier cliente con la API
+# de supabase-py (p.ej. supabase_local.ClienteLocal para pruebas).
+# ==============================================================================
+import threading
+import time
+from collections import defaultdict, deque
+
+from cache import CacheLRU
+
+TIMEOUT = 10
+CONEXIONES = 20
+REINTENTOS = 3
+ESPERA = 0.2
+TTL_PERFIL = 300
+MAX_LOTE = 200
+MAX_ESPERA = 30
+MUESTRAS = 1000
+_NO_EXISTE = {}  # marca en la caché de perfiles de un usuario inexistente (None no se guarda)
+
+def crear_cliente(url, key, timeout=TIMEOUT, conexiones=CONEXIONES):
+    """Cliente de Supabase sobre un httpx.Client compartido (keep-alive, `conexiones` simultáneas como máximo)."""
+    import httpx
+    from supabase import ClientOptions, create_client
+    http = httpx.Client(timeout=timeout, limits=httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones))
+    return create_client(url, key, options=ClientOptions(postgrest_client_timeout=timeout, storage_client_timeout=timeout, httpx_client=http))
+
+def _reintentable(e):
+    """Solo fallos de red o de tiempo; los errores de PostgREST (4xx, restricciones) se propagan sin reintentar."""
+    return isinstance(e, (ConnectionError, TimeoutError)) or type(e).__module__.split('.')[0] in ('httpx', 'httpcore')
+
+def _publico(u):
+    return {k: v for k, v in u.items() if k != 'password'} if u else u
+
+class AccesoDatos:
+    def __init__(self, cliente, ttl_perfil=TTL_PERFIL, reintentos=REINTENTOS, espera=ESPERA, max_lote=MAX_LOTE, max_espera=MAX_ESPERA):
+        self.cliente, self.reintentos, self.espera, self.max_lote, self.max_espera = cliente, reintentos, espera, max_lote, max_espera
+        self.perfiles = CacheLRU(max_entradas=10_000, ttl=ttl_perfil)
+        self._pendientes, self._desde = defaultdict(list), {}
+        self._lat = defaultdict(lambda: deque(maxlen=MUESTRAS))
+        self._cuentas = defaultdict(lambda: [0, 0, 0])  # llamadas, errores, reintentos
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------------------------------
+    # Ejecución medida
+    # --------------------------------------------------------------------------
+    def ejecutar(self, nombre, consulta):
+        for intento in range(self.reintentos + 1):
+            t = time.perf_counter()
+            try:
+                r = consulta()
+                self._medir(nombre, t, intento, ok=True)
+                return r
+            except Exception as e:
+                fin = intento == self.reintentos or not _reintentable(e)
+                self._medir(nombre, t, intento, ok=not fin)
+                if fin: raise
+                time.sleep(self.espera * 2 ** intento)
+
+    def _medir(self, nombre, t, intento, ok):
+        dt = time.perf_counter() - t
+        with self._lock:
+            self._lat[nombre].append(dt)
+            c = self._cuentas[nombre]
+            if intento == 0: c[0] += 1
+            else: c[2] += 1
+            if not ok: c[1] += 1
+
+    def metricas(self):
+        """Por consulta: llamadas, errores, reintentos y latencias p50/p95/máx (ms) de las últimas MUESTRAS."""
+        with self._lock:
+            out = {}
+            for nombre, lat in self._lat.items():
+                s = sorted(lat)
+                pct = lambda q: s[min(len(s) - 1, int(q * len(s)))] * 1000
+                n, err, rei = self._cuentas[nombre]
+                out[nombre] = {'llamadas': n, 'errores': err, 'reintentos': rei, 'p50_ms': pct(.5), 'p95_ms': pct(.95), 'max_ms': s[-1] * 1000}
+            return out
+
+    # --------------------------------------------------------------------------
+    # Usuarios
+    # --------------------------------------------------------------------------
+    def autenticar(self, username, password):
+        """
+        Perfil (sin contraseña) si las credenciales son válidas, si no None. No comprueba `activo`. La contraseña se
+        compara en la base en cada intento (nunca se guarda en caché); si es válida, el perfil refresca la caché.
+        """
+        d = self.ejecutar('usuarios.autenticar', lambda: self.cliente.table("usuarios").select("*")
+                          .eq("username", username).eq("password", password).limit(1).execute()).data
+        if not d: return None
+        u = _publico(d[0])
+        self.perfiles.invalidar(username)
+        self.perfiles.obtener(username, lambda: u)
+        return u
+
+    def perfil(self, username):
+        """Perfil del usuario/empresa (empresa, rol, logo_url, activo...) sin contraseña; en caché TTL_PERFIL segundos, también los inexistentes."""
+        def leer():
+            d = self.ejecutar('usuarios.leer', lambda: self.cliente.table("usuarios").select("*").eq("username", username).limit(1).execute()).data
+            return _publico(d[0]) if d else _NO_EXISTE
+        u = self.perfiles.obtener(username, leer)
+        return None if u is _NO_EXISTE else u
+
+    def invalidar(self, username=None):
+        if username is None: self.perfiles.limpiar()
+        else: self.perfiles.invalidar(username)
+
+    def crear_usuario(self, fila, logo=None):
+        """Sube el logo (si hay) al bucket `logos`, inserta el usuario y devuelve la fila creada."""
+        fila = dict(fila)
+        if logo:
+            ruta = f"logos/{fila['username']}_{int(time.time())}.png"
+            self.ejecutar('logos.subir', lambda: self.cliente.storage.from_("logos").upload(ruta, logo, {"content-type": "image/png"}))
+            fila["logo_url"] = self.cliente.storage.from_("logos").get_public_url(ruta)
+        r = self.insertar("usuarios", fila)
+        self.invalidar(fila['username'])
+        return r[0] if r else fila
+
+    # --------------------------------------------------------------------------
+    # Escrituras
+    # --------------------------------------------------------------------------
+    def insertar(self, tabla, filas):
+        return self.ejecutar(f'{tabla}.insertar', lambda: self.cliente.table(tabla).insert(filas).execute()).data
+
+    def encolar(self, tabla, fila):
+        """
+        Añade una fila a la cola de `tabla`. La cola se escribe en un solo insert al llegar a max_lote filas, si la más
+        antigua lleva más de max_espera segundos o al llamar a vaciar().
+        """
+        with self._lock:
+            self._pendientes[tabla].append(fila)
+            desde = self._desde.setdefault(tabla, time.monotonic())
+            lleno = len(self._pendientes[tabla]) >= self.max_lote or time.monotonic() - desde > self.max_espera
+        if lleno: self.vaciar(tabla)
+
+    def vaciar(self, tabla=None):
+        """Escribe las colas pendientes. Si un insert falla, sus filas vuelven a la cola y se propaga el error."""
+        escritas = 0
+        for t in [tabla] if tabla else list(self._pendientes):
+            with self._lock: filas, self._pendientes[t], desde = self._pendientes[t], [], self._desde.pop(t, None)
+            if not filas: continue
+            try: self.insertar(t, filas)
+            except Exception:
+                with self._lock:
+                    self._pendientes[t][:0] = filas
+                    self._desde[t] = desde
+                raise
+            escritas += len(filas)
+        return escritas
+
+    def pendientes(self):
+        with self._lock: return {t: len(f) for t, f in self._pendientes.items() if f}
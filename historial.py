@@ -0,0 +1,125 @@
+# ==============================================================================
+# HISTORIAL DE PRESUPUESTOS
+# Cada cálculo guardado con sus entradas y resultados, por empresa (tenant). En Supabase (tabla
+# `presupuestos`, ver SQL_SUPABASE) o en SQLite local. Consultas paginadas por cursor (id descendente):
+# cada página lee solo sus filas por índice, sin OFFSET ni cargar el historial entero.
+# ==============================================================================
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from motor import ENTRADAS, SALIDAS
+
+RUTA_HISTORIAL = os.environ.get("HYDROLOGIC_HISTORIAL", os.path.join(os.path.dirname(os.path.abspath(__file__)), "historial.db"))
+POR_PAGINA = 25
+COLUMNAS = ['id', 'fecha', 'usuario', 'cliente', 'modo', 'ro', 'silex', 'carbon', 'descal', 'consumo', 'opex', 'catalogo']
+EQUIPOS = ('ro', 'silex', 'carbon', 'descal')
+_INDICES = ('fecha', 'cliente', 'modo') + EQUIPOS  # cada filtro del historial tiene su índice (empresa, col)
+
+SQL_SUPABASE = """
+create table if not exists presupuestos (
+  id bigint generated always as identity primary key,
+  empresa text not null, usuario text, fecha timestamptz not null default now(), cliente text default '',
+  modo text, ro text, silex text, carbon text, descal text, consumo double precision, opex double precision,
+  catalogo text, entrada jsonb, salida jsonb
+);
+""" + "".join(f"create index if not exists presupuestos_{c} on presupuestos (empresa, {c}, id desc);\n" for c in _INDICES) + \
+    "create index if not exists presupuestos_empresa on presupuestos (empresa, id desc);\n"
+
+def _limpio(v):
+    if hasattr(v, 'item') and not isinstance(v, (str, bytes)): v = v.item()
+    return None if isinstance(v, float) and v != v else v
+
+def registro(empresa, usuario, cliente, entrada, salida, catalogo=""):
+    """Fila de `presupuestos` a partir de un dict de ENTRADAS y otro de SALIDAS (motor.aplanar)."""
+    entrada = {k: _limpio(entrada.get(k)) for k in ENTRADAS if k in entrada}
+    salida = {k: _limpio(salida.get(k)) for k in SALIDAS}
+    return {'empresa': empresa, 'usuario': usuario, 'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'cliente': (cliente or "").strip(), 'modo': entrada.get('modo'), **{k: salida[k] for k in EQUIPOS},
+            'consumo': entrada.get('consumo'), 'opex': salida.get('opex'), 'catalogo': catalogo, 'entrada': entrada, 'salida': salida}
+
+class HistorialSQLite:
+    """Historial en un fichero SQLite (WAL, una conexión por hilo)."""
+    def __init__(self, ruta=RUTA_HISTORIAL):
+        self.ruta = ruta
+        self._local = threading.local()
+        c = self._con()
+        c.execute("""CREATE TABLE IF NOT EXISTS presupuestos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, empresa TEXT NOT NULL, usuario TEXT, fecha TEXT NOT NULL, cliente TEXT COLLATE NOCASE DEFAULT '',
+            modo TEXT, ro TEXT, silex TEXT, carbon TEXT, descal TEXT, consumo REAL, opex REAL, catalogo TEXT, entrada TEXT, salida TEXT)""")
+        # Con rowid implícito al final, (empresa, x) sirve también para ORDER BY id DESC dentro de cada valor de x
+        c.execute("CREATE INDEX IF NOT EXISTS presupuestos_empresa ON presupuestos (empresa)")
+        for col in _INDICES: c.execute(f"CREATE INDEX IF NOT EXISTS presupuestos_{col} ON presupuestos (empresa, {col})")
+        c.commit()
+
+    def _con(self):
+        c = getattr(self._local, 'con', None)
+        if c is None:
+            c = self._local.con = sqlite3.connect(self.ruta, timeout=30)
+            c.execute("PRAGMA journal_mode=WAL"); c.execute("PRAGMA synchronous=NORMAL")
+        return c
+
+    def guardar(self, filas):
+        filas = filas if isinstance(filas, list) else [filas]
+        cols = [c for c in COLUMNAS if c != 'id'] + ['empresa', 'entrada', 'salida']
+        c = self._con()
+        with c:
+            c.executemany(f"INSERT INTO presupuestos ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                          [[json.dumps(f[k]) if k in ('entrada', 'salida') else f.get(k) for k in cols] for f in filas])
+        return len(filas)
+
+    def pagina(self, empresa, antes=None, n=POR_PAGINA, texto="", modo=None, equipo=None, desde=None, hasta=None):
+        """
+        Hasta `n` presupuestos de `empresa` con id < `antes`, del más reciente al más antiguo, y el cursor de la
+        página siguiente (None si no hay más). `equipo` es (familia, nombre); `desde`/`hasta` fechas ISO.
+        """
+        donde, args = ["empresa = ?"], [empresa]
+        if antes is not None: donde.append("id < ?"); args.append(antes)
+        if texto: donde.append("cliente LIKE ?"); args.append(f"%{texto}%")
+        if modo: donde.append("modo = ?"); args.append(modo)
+        if equipo: donde.append(f"{equipo[0]} = ?"); args.append(equipo[1])
+        if desde: donde.append("fecha >= ?"); args.append(str(desde))
+        if hasta: donde.append("fecha < ?"); args.append(str(hasta))
+        cur = self._con().execute(f"SELECT {', '.join(COLUMNAS)} FROM presupuestos WHERE {' AND '.join(donde)} ORDER BY id DESC LIMIT ?", args + [n + 1])
+        filas = [dict(zip(COLUMNAS, r)) for r in cur]
+        return filas[:n], (filas[n - 1]['id'] if len(filas) > n else None)
+
+    def obtener(self, empresa, id_):
+        r = self._con().execute("SELECT entrada, salida, cliente, fecha, catalogo FROM presupuestos WHERE empresa = ? AND id = ?", (empresa, id_)).fetchone()
+        if r is None: return None
+        return {'id': id_, 'entrada': json.loads(r[0]), 'salida': json.loads(r[1]), 'cliente': r[2], 'fecha': r[3], 'catalogo': r[4]}
+
+    def contar(self, empresa):
+        return self._con().execute("SELECT COUNT(*) FROM presupuestos WHERE empresa = ?", (empresa,)).fetchone()[0]
+
+class HistorialSupabase:
+    """Historial en la tabla `presupuestos` de Supabase, a través de datos.AccesoDatos (escrituras agrupadas)."""
+    def __init__(self, datos):
+        self.datos = datos
+
+    def guardar(self, filas):
+        filas = filas if isinstance(filas, list) else [filas]
+        for f in filas: self.datos.encolar("presupuestos", f)
+        return len(filas)
+
+    def pagina(self, empresa, antes=None, n=POR_PAGINA, texto="", modo=None, equipo=None, desde=None, hasta=None):
+        self.datos.vaciar("presupuestos")
+        def consulta():
+            q = self.datos.cliente.table("presupuestos").select(", ".join(COLUMNAS)).eq("empresa", empresa)
+            if antes is not None: q = q.lt("id", antes)
+            if texto: q = q.ilike("cliente", f"%{texto}%")
+            if modo: q = q.eq("modo", modo)
+            if equipo: q = q.eq(equipo[0], equipo[1])
+            if desde: q = q.gte("fecha", str(desde))
+            if hasta: q = q.lt("fecha", str(hasta))
+            return q.order("id", desc=True).limit(n + 1).execute()
+        filas = self.datos.ejecutar('presupuestos.pagina', consulta).data
+        return filas[:n], (filas[n - 1]['id'] if len(filas) > n else None)
+
+    def obtener(self, empresa, id_):
+        self.datos.vaciar("presupuestos")
+        d = self.datos.ejecutar('presupuestos.obtener', lambda: self.datos.cliente.table("presupuestos").select("id, entrada, salida, cliente, fecha, catalogo")
+                                 .eq("empresa", empresa).eq("id", id_).limit(1).execute()).data
+        return d[0] if d else None
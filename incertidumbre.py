@@ -0,0 +1,98 @@
+# ==============================================================================
+# MODO PROBABILÍSTICO (MONTE CARLO)
+# Las entradas inciertas (ppm, dureza, temp, consumo) se describen con una distribución y se sortean
+# N veces de golpe (numpy); los sorteos se dimensionan por bloques con el motor vectorizado, en un pool
+# de procesos si se da, y el acumulado se entrega tras cada bloque para poder pintarlo mientras avanza.
+#   for acum in montecarlo(base, {'ppm': ('normal', 800, 120)}, 50_000, pool=pool): pintar(acum.resumen())
+# ==============================================================================
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+
+from barrido import SIN_SOLUCION
+from lote import calcular_lote
+
+# ('fijo', v) · ('normal', media, desviación) · ('triangular', mínimo, moda, máximo) · ('muestras', [valores])
+DISTRIBUCIONES = ('fijo', 'normal', 'triangular', 'muestras')
+INCIERTAS = {'consumo': (1, None), 'ppm': (0, None), 'dureza': (0, None), 'temp': (1, 45)}  # límites físicos del sorteo
+BLOQUE = 10_000
+COLUMNAS = ['ro', 'descal', 'opex', 'dias', 'solucion']
+
+def muestrear(dist, n, rng):
+    tipo, *p = dist
+    if tipo == 'fijo': return np.full(n, float(p[0]))
+    if tipo == 'normal': return rng.normal(p[0], p[1], n)
+    if tipo == 'triangular':
+        lo, moda, hi = p
+        return np.full(n, float(moda)) if lo == hi else rng.triangular(lo, min(max(moda, lo), hi), hi, n)
+    if tipo == 'muestras':
+        v = np.asarray(p[0], float)
+        v = v[np.isfinite(v)]
+        if not len(v): raise ValueError("La distribución 'muestras' no tiene valores")
+        return rng.choice(v, n)
+    raise ValueError(f"Distribución desconocida: {tipo}")
+
+def sortear(distribuciones, n, semilla=None):
+    """DataFrame de `n` sorteos, una columna por variable incierta, recortados a sus límites físicos."""
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({k: np.clip(muestrear(d, n, rng), *INCIERTAS[k]) for k, d in distribuciones.items()})
+
+def _bloque(datos, fijos, cat):
+    """Trabajo de cada proceso: solo vuelven las columnas que se agregan."""
+    return calcular_lote(datos, cat=cat, **fijos)[COLUMNAS]
+
+class Acumulado:
+    """Agregado de los bloques ya dimensionados (independiente del orden en que lleguen)."""
+    def __init__(self, total):
+        self.total, self.n, self.sin_solucion = total, 0, 0
+        self._ro, self._descal = pd.Series(dtype=float), pd.Series(dtype=float)
+        self._opex, self._dias = [], []
+
+    def agregar(self, res):
+        self.n += len(res)
+        ok = res['solucion'].astype(bool)
+        self.sin_solucion += int((~ok).sum())
+        for attr, col, vacio in (('_ro', 'ro', "Sin osmosis"), ('_descal', 'descal', "Sin descal")):
+            v = res[col].astype(object)
+            cuenta = v.where(v.notna(), ok.map({True: vacio, False: SIN_SOLUCION})).value_counts()
+            setattr(self, attr, getattr(self, attr).add(cuenta, fill_value=0))
+        self._opex.append(res['opex'].to_numpy(float))
+        self._dias.append(res['dias'].to_numpy(float))
+
+    def resumen(self):
+        opex = np.concatenate(self._opex) if self._opex else np.empty(0)
+        dias = np.concatenate(self._dias) if self._dias else np.empty(0)
+        opex, dias = opex[np.isfinite(opex)], dias[np.isfinite(dias)]
+        pct = lambda v, q: float(np.percentile(v, q)) if len(v) else float('nan')
+        n = max(self.n, 1)
+        return {
+            'sorteos': self.n, 'progreso': self.n / self.total if self.total else 1.0,
+            'p_ro': (self._ro / n).sort_values(ascending=False), 'p_descal': (self._descal / n).sort_values(ascending=False),
+            'p_sin_solucion': self.sin_solucion / n,
+            'opex_p50': pct(opex, 50), 'opex_p90': pct(opex, 90),
+            'dias_p10': pct(dias, 10), 'dias_p50': pct(dias, 50), 'dias_p90': pct(dias, 90),
+            'opex': opex,
+        }
+
+def montecarlo(base, distribuciones, n, bloque=BLOQUE, pool=None, semilla=None, cat=None):
+    """
+    Generador: dimensiona `n` sorteos de `distribuciones` sobre las entradas fijas `base` (ENTRADAS y coste_*)
+    y entrega el Acumulado tras cada bloque. Con `pool` (concurrent.futures) los bloques se reparten entre procesos.
+    """
+    sorteos = sortear(distribuciones, n, semilla)
+    fijos = {k: v for k, v in base.items() if k not in distribuciones}
+    bloques = [sorteos.iloc[i:i + bloque] for i in range(0, n, bloque)]
+    acum = Acumulado(n)
+    if pool is None:
+        for b in bloques:
+            acum.agregar(_bloque(b, fijos, cat))
+            yield acum
+        return
+    futuros = [pool.submit(_bloque, b, fijos, cat) for b in bloques]
+    try:
+        for f in as_completed(futuros):
+            acum.agregar(f.result())
+            yield acum
+    finally:
+        for f in futuros: f.cancel()  # el consumidor dejó de leer (p.ej. la sesión se recargó)
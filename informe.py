@@ -0,0 +1,150 @@
+# ==============================================================================
+# INFORME PDF
+# ==============================================================================
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+from motor import DEFECTOS, calcular_fila
+
+LOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo.png")
+CACHE_LOGOS = os.environ.get("HYDROLOGIC_CACHE_LOGOS") or os.path.join(tempfile.gettempdir(), "hydrologic_logos")
+ANCHO_LOGO_PX = 264     # 33 mm impresos a ~200 ppp
+TIMEOUT_LOGO = 5        # segundos
+REINTENTO_LOGO = 300    # segundos antes de volver a pedir un logo que falló
+
+# ------------------------------------------------------------------------------
+# Logos: se descargan, decodifican y reducen una sola vez por URL (disco + memoria)
+# ------------------------------------------------------------------------------
+_logos = {}       # url -> (ruta PNG local o None, caducidad)
+_imagenes = {}    # ruta PNG -> info de imagen ya analizada por FPDF
+_lock = threading.Lock()
+
+def _preparar(origen, destino):
+    """Decodifica el logo, lo aplana sobre blanco y lo reduce a ANCHO_LOGO_PX. Escritura atómica."""
+    from PIL import Image
+    img = Image.open(origen)
+    img.load()
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        fondo = Image.new('RGB', img.size, (255, 255, 255))
+        fondo.paste(img, mask=img.split()[-1])
+        img = fondo
+    else: img = img.convert('RGB')
+    if img.width > ANCHO_LOGO_PX: img = img.resize((ANCHO_LOGO_PX, max(1, round(img.height * ANCHO_LOGO_PX / img.width))), Image.LANCZOS)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    img.save(tmp, format='PNG')
+    os.replace(tmp, destino)
+
+def _en_cache(clave, obtener):
+    ruta = os.path.join(CACHE_LOGOS, hashlib.sha1(clave.encode()).hexdigest() + ".png")
+    if not os.path.exists(ruta): _preparar(obtener(), ruta)
+    return ruta
+
+def logo_base():
+    """Logo HYDROLOGIC preparado (la clave incluye la fecha del fichero para recogerlo si cambia)."""
+    clave = f"base:{LOGO}:{os.path.getmtime(LOGO)}"
+    with _lock:
+        previo = _logos.get(clave)
+    if previo: return previo[0]
+    ruta = _en_cache(clave, lambda: LOGO)
+    with _lock: _logos[clave] = (ruta, float('inf'))
+    return ruta
+
+def logo_local(url):
+    """Ruta a un PNG local preparado con el logo del cliente; None si no tiene o no se puede obtener."""
+    if not url or len(str(url)) <= 5: return None
+    ahora = time.monotonic()
+    with _lock:
+        previo = _logos.get(url)
+    if previo and previo[1] > ahora: return previo[0]
+
+    def descargar():
+        import requests
+        r = requests.get(url, timeout=TIMEOUT_LOGO)
+        r.raise_for_status()
+        return io.BytesIO(r.content)
+
+    try: ruta, caduca = _en_cache(f"url:{url}", descargar), float('inf')
+    except Exception: ruta, caduca = None, ahora + REINTENTO_LOGO
+    with _lock: _logos[url] = (ruta, caduca)
+    return ruta
+
+def _imagen(pdf, ruta, x, y, w):
+    """pdf.image() reutilizando el análisis del PNG de informes anteriores (FPDF lo rehace en cada documento)."""
+    info = _imagenes.get(ruta)
+    if info is not None and isinstance(getattr(pdf, 'images', None), dict) and ruta not in pdf.images:
+        pdf.images[ruta] = dict(info, i=len(pdf.images) + 1)
+    pdf.image(ruta, x, y, w)
+    if info is None and isinstance(getattr(pdf, 'images', None), dict) and ruta in pdf.images: _imagenes[ruta] = dict(pdf.images[ruta])
+
+# ------------------------------------------------------------------------------
+# Informe
+# ------------------------------------------------------------------------------
+def create_pdf(res, inputs, modo, user_data):
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.add_page()
+    
+    for obtener in (lambda: logo_local(user_data.get("logo_url")), logo_base):
+        try:
+            ruta = obtener()
+            if ruta:
+                _imagen(pdf, ruta, 10, 8, 33)
+                break
+        except Exception: pass
+
+    pdf.ln(20)
+    def clean(text): return str(text).encode('latin-1', 'replace').decode('latin-1') if text else "N/A"
+    empresa_nombre = user_data.get("empresa", "HYDROLOGIC").upper()
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, clean(f"INFORME TÉCNICO - {empresa_nombre}"), 0, 1, 'C')
+    pdf.ln(10)
+    
+    pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, clean("1. PARAMETROS"), 0, 1)
+    pdf.set_font("Arial", '', 10); pdf.cell(0, 8, clean(f"Consumo: {inputs['consumo']} L/dia | Punta: {inputs['punta']} L/min"), 0, 1)
+    if modo == "Planta Completa (RO)": pdf.cell(0, 8, clean(f"TDS Entrada: {inputs['ppm']} ppm | Dureza: {inputs['dureza']} Hf"), 0, 1)
+    pdf.ln(5)
+    
+    pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, clean("2. EQUIPOS"), 0, 1)
+    pdf.set_font("Arial", '', 10)
+    
+    # AGUA BRUTA
+    pdf.cell(0, 8, clean(f"A. DEPOSITO AGUA BRUTA: {int(res.get('v_raw', 0))} L"), 0, 1)
+    pdf.cell(0, 8, clean(f"B. BOMBA APORTE: {res.get('bomba_nom', 'N/A')} @ 5 Bar"), 0, 1)
+
+    if modo == "Solo Descalcificación":
+        if res.get('descal'):
+            pdf.cell(0, 8, clean(f"C. DESCAL: {res['descal'].nombre} ({res['descal'].medida_botella})"), 0, 1)
+            pdf.set_font("Arial", 'I', 9)
+            pdf.cell(0, 6, clean(f"   Autonomia: {res['dias']:.1f} dias"), 0, 1)
+    else:
+        if res.get('silex'): pdf.cell(0, 8, clean(f"C. SILEX: {res['silex'].nombre} ({res['silex'].medida_botella})"), 0, 1)
+        if res.get('carbon'): pdf.cell(0, 8, clean(f"D. CARBON: {res['carbon'].nombre} ({res['carbon'].medida_botella})"), 0, 1)
+        if res.get('v_buffer', 0)>0: pdf.cell(0, 8, clean(f"E. BUFFER: {int(res['v_buffer'])} Litros"), 0, 1)
+        if res.get('descal'): pdf.cell(0, 8, clean(f"F. DESCAL: {res['descal'].nombre} ({res['descal'].medida_botella})"), 0, 1)
+        if res.get('ro'): 
+            pdf.cell(0, 8, clean(f"G. OSMOSIS: {res['ro'].nombre}"), 0, 1)
+            pdf.set_font("Arial", 'I', 9)
+            pdf.cell(0, 6, clean(f"   Config: {res['ro'].membranas} | Prod. Nominal: {res['ro'].produccion_nominal} L/d"), 0, 1)
+            pdf.set_font("Arial", '', 10)
+    
+    pdf.ln(5)
+    pdf.set_font("Arial", 'B', 12); pdf.cell(0, 10, clean("3. REQUISITOS"), 0, 1)
+    pdf.set_font("Arial", '', 10)
+    pdf.cell(0, 8, clean(f"DEPOSITO FINAL: {int(res['v_final'])} Litros"), 0, 1)
+    pdf.set_text_color(200,0,0); pdf.cell(0, 8, clean(f"ACOMETIDA REQUERIDA: {int(res.get('wash', 0))} L/h a 2.5 bar"), 0, 1); pdf.set_text_color(0,0,0)
+    pdf.cell(0, 8, clean(f"TUBERIA: {res['tuberia']}"), 0, 1)
+    return pdf.output(dest='S').encode('latin-1')
+
+def informe_fila(fila, user_data, cat=None):
+    """Informe PDF de una obra dada como dict de ENTRADAS (ver motor.calcular_fila). None si no hay solución."""
+    res = calcular_fila(fila, cat)
+    if not (res.get('ro') or res.get('descal')): return None
+    d = {**DEFECTOS, **{k: v for k, v in fila.items() if v is not None and v != ""}}
+    inputs = {'consumo': d['consumo'], 'horas': d['horas'], 'origen': d['origen'], 'ppm': d['ppm'], 'dureza': d['dureza'], 'punta': d['caudal_punta']}
+    return create_pdf(res, inputs, d['modo'], user_data)
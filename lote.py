@@ -0,0 +1,290 @@
+# ==============================================================================
+# CÁLCULO POR LOTES (VECTORIZADO)
+# Misma lógica que motor.calcular() pero sobre columnas NumPy: una fila por obra.
+# ==============================================================================
+import csv
+import re
+
+import numpy as np
+import pandas as pd
+
+from motor import TRAMOS_BOMBA, TRAMOS_TUBERIA, MODO_DESCAL, DEFECTOS, ENTRADAS, SALIDAS, NOTA_SALINIDAD, a_bool, catalogo_actual
+
+NUMERICAS = [k for k in ENTRADAS if k not in ('origen', 'modo', 'buffer_on', 'descal_on')]
+
+def _a_bool(col):
+    if col.dtype == object: return col.map(a_bool).to_numpy(bool)
+    return col.fillna(False).to_numpy(bool)
+
+def _a_numero(col):
+    """Columna a float como catalogo._num (coma decimal admitida). Devuelve (valores, no_numericos); vacío -> NaN."""
+    if pd.api.types.is_numeric_dtype(col): return col.astype(float), np.zeros(len(col), bool)
+    texto = col.astype(str).str.strip().str.replace(',', '.', regex=False)
+    vacio = col.isna().to_numpy() | (texto == "").to_numpy()
+    valores = pd.to_numeric(texto.where(~vacio), errors='coerce')
+    return valores, valores.isna().to_numpy() & ~vacio
+
+def normalizar(datos, costes=None, **fijos):
+    """
+    Devuelve un DataFrame con todas las ENTRADAS; las que falten se rellenan con `fijos`, `costes` o DEFECTOS.
+    La columna 'error' explica las filas con valores no numéricos (None en las demás).
+    """
+    df = pd.DataFrame(datos).reset_index(drop=True)
+    base = dict(DEFECTOS)
+    if costes: base.update({f'coste_{k}': v for k, v in costes.items()})
+    base.update(fijos)
+    if 'consumo' not in df and 'consumo' not in base: raise ValueError("Falta la columna obligatoria 'consumo'")
+    malos = {}
+    for k in ENTRADAS:
+        if k not in df: df[k] = base[k]
+        else:
+            if k in NUMERICAS:
+                df[k], m = _a_numero(df[k])
+                if m.any(): malos[k] = m
+            if k != 'consumo' and df[k].isna().any(): df[k] = df[k].where(df[k].notna(), base[k])
+    for k in ('buffer_on', 'descal_on'): df[k] = _a_bool(df[k])
+    df['error'] = None
+    for i in np.flatnonzero(np.any(list(malos.values()), axis=0)) if malos else ():
+        df.at[i, 'error'] = "Valor no numérico en " + ", ".join(k for k, m in malos.items() if m[i])
+    return df[ENTRADAS + ['error']]
+
+# ------------------------------------------------------------------------------
+# Índices de selección
+# ------------------------------------------------------------------------------
+def _rango(valores, aprox, cumple):
+    """
+    Primer índice de `valores` (ordenados) que cumple el predicado monótono `cumple(v)`. `aprox` es el umbral
+    despejado; se corrige un paso en cada sentido para reproducir exactamente la comparación en coma flotante.
+    """
+    n = len(valores)
+    ext = np.append(valores, np.inf)
+    with np.errstate(invalid='ignore'):
+        i = np.searchsorted(valores, np.nan_to_num(aprox, nan=np.inf, posinf=np.inf, neginf=-np.inf))
+        ant = np.maximum(i - 1, 0)
+        i = np.where((i > 0) & cumple(ext[ant]), ant, i)
+        i = np.where((i < n) & ~cumple(ext[i]), i + 1, i)
+    return np.minimum(i, n)
+
+def _col(db, attr):
+    return np.array([getattr(e, attr) for e in db] + [np.nan], dtype=float)
+
+def _categorias(codigos, valido, nombres):
+    return pd.Categorical.from_codes(np.where(valido, codigos, -1), categories=pd.Index(nombres, dtype=object))
+
+def _nombres(db, codigos, valido):
+    return _categorias(codigos, valido, [e.nombre for e in db])
+
+def _filtro(ix, q):
+    t = ix.arrays()
+    return t['primero'][_rango(t['a'], q / 1000, lambda v: (v * 1000) >= q), 0]
+
+def _descal(ix, q, carga):
+    t = ix.arrays()
+    ia = _rango(t['a'], q / 1000, lambda v: (v * 1000) >= q)
+    ib = np.where(carga > 0, _rango(t['b'], carga * 5, lambda v: (v / carga) >= 5), 0)
+    elegido = t['primero'][ia, ib]
+    return np.where(elegido < ix.n, elegido, t['ultimo'][ia, 0]), t['primero'][ia, 0] < ix.n
+
+def _tramos(tramos, caudal):
+    limites = np.array([lim for lim, _ in tramos[:-1]], dtype=float)
+    return np.searchsorted(limites, caudal, side='right')
+
+# ------------------------------------------------------------------------------
+# Cálculo
+# ------------------------------------------------------------------------------
+def calcular_lote(datos, costes=None, cat=None, **fijos):
+    """
+    Dimensiona todas las filas de `datos` (DataFrame o dict de arrays). Las columnas admitidas son ENTRADAS;
+    las ausentes toman el valor de `fijos`/`costes` o de DEFECTOS. Devuelve un DataFrame con las columnas SALIDAS,
+    equivalente fila a fila a aplanar(calcular(..., cat)), y 'error' (valores no numéricos; esas filas quedan vacías).
+    """
+    df = normalizar(datos, costes, **fijos)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = _calcular(df, catalogo_actual() if cat is None else cat)
+    malas = df['error'].notna().to_numpy()
+    if malas.any():  # filas con valores no numéricos: sin resultado, solo el error
+        out.loc[malas, [c for c in SALIDAS if c != 'solucion']] = None
+        out.loc[malas, 'solucion'] = False
+    out['error'] = df['error'].to_numpy()
+    out.index = getattr(datos, 'index', out.index)
+    return out
+
+def _calcular(df, cat):
+    ro_db, silex_db, carbon_db, descal_db = cat.ro, cat.silex, cat.carbon, cat.descal
+    ix_ro, ix_silex, ix_carbon, ix_descal = cat.idx_ro, cat.idx_silex, cat.idx_carbon, cat.idx_descal
+    n = len(df)
+    f = lambda k: df[k].to_numpy(float)
+    consumo, punta, ppm, dureza, temp, horas = f('consumo'), f('caudal_punta'), f('ppm'), f('dureza'), f('temp'), f('horas')
+    man_fin, man_buffer, c_agua, c_sal, c_luz = f('man_fin'), f('man_buffer'), f('coste_agua'), f('coste_sal'), f('coste_luz')
+    buffer_on, descal_on = df['buffer_on'].to_numpy(bool), df['descal_on'].to_numpy(bool)
+    es_descal = (df['modo'] == MODO_DESCAL).to_numpy()
+    es_ro = ~es_descal
+    fs = np.where((df['origen'] == "Pozo").to_numpy(), 1.2, 1.0)
+    nan = np.full(n, np.nan)
+
+    v_final = np.where(man_fin > 0, man_fin, np.maximum(consumo * 0.75, punta * 60))
+
+    # --- MODO SOLO DESCALCIFICACIÓN ---
+    q_target = (consumo / horas) * fs
+    carga = (consumo / 1000) * dureza
+    d_idx, d_ok = _descal(ix_descal, q_target, carga)
+    d_ok &= es_descal
+    d_cap, d_sal, d_wash = _col(descal_db, 'capacidad')[d_idx], _col(descal_db, 'sal_kg')[d_idx], _col(descal_db, 'caudal_wash')[d_idx]
+    dias_d = np.where(carga > 0, d_cap / carga, 99)
+    sal_d = (365 / dias_d) * d_sal
+    wash_d = d_wash * 1000
+
+    # --- MODO PLANTA COMPLETA (RO) ---
+    tcf = np.where(temp >= 25, 1.0, np.maximum(1.0 - ((25 - temp) * 0.03), 0.1))
+    factor = np.where(ppm > 2500, 0.8, 1.0)
+    t = ix_ro.arrays()
+    ia = np.searchsorted(t['a'], ppm)
+    ib = _rango(t['b'], consumo * 24 / (tcf * horas), lambda p: ((p * tcf / 24) * horas) >= consumo)
+    pref, primero, ultimo = t['pref'][ia, ib], t['primero'][ia, ib], t['ultimo'][ia, ib]
+    r_idx = np.where(consumo > 600, np.where(pref < ix_ro.n, pref, ultimo), primero)
+    r_ok = es_ro & (primero < ix_ro.n)
+    r_idx = np.where(primero < ix_ro.n, r_idx, ix_ro.n)
+    r_prod, r_ef, r_kw = _col(ro_db, 'produccion_nominal')[r_idx], _col(ro_db, 'eficiencia')[r_idx], _col(ro_db, 'potencia_kw')[r_idx]
+
+    efi_real = r_ef * factor
+    q_prod_hora = (r_prod * tcf) / 24
+    agua_in = consumo / efi_real
+    q_bomba = (r_prod / 24 / r_ef) * 1.5
+    q_filtros_ro = np.where(buffer_on, (agua_in / 20) * fs, q_bomba * fs)
+    v_buffer = np.where(buffer_on, np.where(man_buffer > 0, man_buffer, q_bomba * 2), 0)
+
+    s_idx, c_idx = _filtro(ix_silex, q_filtros_ro), _filtro(ix_carbon, q_filtros_ro)
+    s_ok, c_ok = s_idx < ix_silex.n, c_idx < ix_carbon.n
+    carga_ro = (agua_in / 1000) * dureza
+    rd_idx, rd_ok = _descal(ix_descal, q_filtros_ro, carga_ro)
+    con_descal = r_ok & descal_on & (dureza > 5)
+    rd_ok &= con_descal
+    rd_cap, rd_salkg = _col(descal_db, 'capacidad')[rd_idx], _col(descal_db, 'sal_kg')[rd_idx]
+    dias_ro = np.where(carga_ro > 0, rd_cap / carga_ro, 99)
+    sal_ro = np.where(rd_ok, (365 / dias_ro) * rd_salkg, 0)
+
+    kwh = (consumo / q_prod_hora) * r_kw * 365
+    m3 = (agua_in / 1000) * 365
+    opex_ro = (kwh * c_luz) + (sal_ro * c_sal) + (m3 * c_agua)
+    luz_ro = kwh * c_luz
+    wash_ro = np.maximum.reduce([np.where(s_ok, _col(silex_db, 'caudal_wash')[s_idx], 0), np.where(c_ok, _col(carbon_db, 'caudal_wash')[c_idx], 0),
+                                 np.where(rd_ok, _col(descal_db, 'caudal_wash')[rd_idx], 0)]) * 1000
+
+    # --- COMBINACIÓN ---
+    q_filtros = np.where(es_descal, np.where(d_ok, q_target, nan), np.where(r_ok, q_filtros_ro, nan))
+    wash = np.where(es_descal, np.where(d_ok, wash_d, nan), np.where(r_ok, wash_ro, nan))
+    max_flow = np.maximum(np.nan_to_num(q_filtros), np.nan_to_num(wash))
+    t_bomba = _tramos(TRAMOS_BOMBA, max_flow)
+    bomba_kw = np.array([v[1] for _, v in TRAMOS_BOMBA], dtype=float)[t_bomba]
+    tiene_bomba = es_descal | r_ok
+
+    kwh_ap = (consumo / q_filtros_ro) * bomba_kw * 365
+    opex = np.where(es_descal, np.where(d_ok, sal_d * c_sal, nan), np.where(r_ok, opex_ro + (kwh_ap * c_luz), nan))
+
+    return pd.DataFrame({
+        'ro': _nombres(ro_db, r_idx, r_ok),
+        'silex': _nombres(silex_db, s_idx, r_ok & s_ok),
+        'carbon': _nombres(carbon_db, c_idx, r_ok & c_ok),
+        'descal': _nombres(descal_db, np.where(d_ok, d_idx, rd_idx), d_ok | rd_ok),
+        'efi_real': np.where(r_ok, efi_real, nan),
+        'q_prod_hora': np.where(r_ok, q_prod_hora, nan),
+        'q_filtros': q_filtros,
+        'v_final': v_final,
+        'v_buffer': np.where(r_ok, v_buffer, nan),
+        'v_raw': np.where(es_descal, np.where(man_buffer > 0, man_buffer, np.nan_to_num(wash) * 0.4), np.where(r_ok, wash_ro * 0.35, nan)),
+        'dias': np.where(d_ok, dias_d, np.where(rd_ok, dias_ro, nan)),
+        'sal_anual': np.where(d_ok, sal_d, np.where(rd_ok, sal_ro, nan)),
+        'wash': wash,
+        'opex': opex,
+        'opex_agua': np.where(r_ok, m3 * c_agua, nan),
+        'opex_sal': np.where(r_ok, sal_ro * c_sal, nan),
+        'opex_luz': np.where(r_ok, luz_ro + (kwh_ap * c_luz), nan),
+        'bomba_nom': _categorias(t_bomba, tiene_bomba, [v[0] for _, v in TRAMOS_BOMBA]),
+        'bomba_kw': np.where(tiene_bomba, bomba_kw, nan),
+        'tuberia': _categorias(_tramos(TRAMOS_TUBERIA, max_flow), True, [v for _, v in TRAMOS_TUBERIA]),
+        'msgs': _categorias((es_ro & (ppm > 2500)).astype(int), True, ["", NOTA_SALINIDAD]),
+        'solucion': d_ok | r_ok,
+    })
+
+# ------------------------------------------------------------------------------
+# Ficheros de obras (CSV / XLSX) por bloques
+# ------------------------------------------------------------------------------
+TAM_BLOQUE = 2000
+
+def _es_excel(nombre):
+    return nombre.lower().endswith(('.xlsx', '.xlsm'))
+
+def contar_filas(archivo, nombre):
+    """Número de filas de datos (sin cabecera), para la barra de progreso. Deja el archivo al principio."""
+    archivo.seek(0)
+    if _es_excel(nombre):
+        from openpyxl import load_workbook
+        hoja = load_workbook(archivo, read_only=True).active
+        n = max((hoja.max_row or 1) - 1, 0)
+    else:
+        n, ultimo = 0, b"\n"
+        for trozo in iter(lambda: archivo.read(1 << 20), b""):
+            n += trozo.count(b"\n"); ultimo = trozo[-1:]
+        n = max(n - (ultimo == b"\n"), 0)
+    archivo.seek(0)
+    return n
+
+def _separador(archivo):
+    """Separador del CSV (',', ';' o tabulador) deducido de las primeras líneas; ',' si no se puede deducir."""
+    muestra = archivo.read(1 << 16)
+    archivo.seek(0)
+    if isinstance(muestra, bytes): muestra = muestra.decode('utf-8-sig', errors='ignore')
+    try: return csv.Sniffer().sniff(muestra, delimiters=',;\t').delimiter
+    except csv.Error: return ','  # p.ej. una sola columna
+
+def leer_bloques(archivo, nombre, tam=TAM_BLOQUE):
+    """Itera el fichero de obras en DataFrames de `tam` filas sin cargarlo entero en memoria."""
+    archivo.seek(0)
+    if not _es_excel(nombre):
+        yield from pd.read_csv(archivo, chunksize=tam, sep=_separador(archivo), encoding='utf-8-sig')
+        return
+    from openpyxl import load_workbook
+    filas = load_workbook(archivo, read_only=True, data_only=True).active.iter_rows(values_only=True)
+    cabecera = [str(c).strip() for c in next(filas, ())]
+    bloque = []
+    for fila in filas:
+        if all(v is None for v in fila): continue
+        bloque.append(fila)
+        if len(bloque) == tam:
+            yield pd.DataFrame(bloque, columns=cabecera); bloque = []
+    if bloque: yield pd.DataFrame(bloque, columns=cabecera)
+
+def procesar_lote(archivo, nombre, destino_csv, costes=None, fijos=None, crear_pdf=None, destino_zip=None, tam=TAM_BLOQUE, cat=None):
+    """
+    Calcula el fichero de obras bloque a bloque y va escribiendo los resultados en `destino_csv` (columnas originales
+    + SALIDAS + 'error'; una fila con valores no numéricos se marca ahí sin parar el fichero). Si se da
+    `crear_pdf(res, inputs, modo) -> bytes`, añade un informe por obra a `destino_zip`.
+    Es un generador: cede el número de obras procesadas tras cada bloque.
+    """
+    import zipfile
+    from motor import calcular
+    fijos = fijos or {}
+    costes = costes or {k[6:]: v for k, v in DEFECTOS.items() if k.startswith('coste_')}
+    zf = zipfile.ZipFile(destino_zip, 'w', zipfile.ZIP_DEFLATED) if crear_pdf else None
+    hechas = 0
+    try:
+        with open(destino_csv, 'w', newline='', encoding='utf-8') as f:
+            for bloque in leer_bloques(archivo, nombre, tam):
+                bloque.columns = [str(c).strip() for c in bloque.columns]
+                bloque.index = range(hechas, hechas + len(bloque))
+                res = calcular_lote(bloque, costes, cat, **fijos)
+                pd.concat([bloque, res], axis=1).to_csv(f, header=(hechas == 0), index=False)
+                if zf:
+                    for i, r in normalizar(bloque, costes, **fijos).iterrows():
+                        if r.error: continue
+                        c = {'agua': r.coste_agua, 'sal': r.coste_sal, 'luz': r.coste_luz}
+                        res_i = calcular(r.origen, r.modo, r.consumo, r.caudal_punta, r.ppm, r.dureza, r.temp, r.horas, c, r.buffer_on, r.descal_on, r.man_fin, r.man_buffer, cat)
+                        if not (res_i.get('ro') or res_i.get('descal')): continue
+                        inputs = {'consumo': r.consumo, 'horas': r.horas, 'origen': r.origen, 'ppm': r.ppm, 'dureza': r.dureza, 'punta': r.caudal_punta}
+                        ref = bloque['obra'].iloc[i] if 'obra' in bloque else None
+                        ref = "_" + re.sub(r'[^\w\-]+', '_', str(ref)) if pd.notna(ref) and str(ref).strip() else ""
+                        zf.writestr(f"informe_{hechas + i + 1:05d}{ref}.pdf", crear_pdf(res_i, inputs, r.modo))
+                hechas += len(bloque)
+                yield hechas
+    finally:
+        if zf: zf.close()
@@ -0,0 +1,76 @@
+# ==============================================================================
+# INSTRUMENTACIÓN
+# Tramos cronometrados por etapa (ventana móvil por proceso, p50/p95) y volcados opcionales de cProfile.
+#   with tramo('calcular'): ...
+# ==============================================================================
+import cProfile
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+MUESTRAS = 1000
+CARPETA_PERFIL = os.environ.get("HYDROLOGIC_PERFIL", os.path.join(tempfile.gettempdir(), "hydrologic_perfil"))
+
+class Tramos:
+    def __init__(self, muestras=MUESTRAS):
+        self._lat = defaultdict(lambda: deque(maxlen=muestras))
+        self._n = defaultdict(int)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.perfil = None  # carpeta de volcado de cProfile, None = desactivado
+
+    @contextmanager
+    def tramo(self, nombre):
+        # cProfile no admite perfiles anidados: solo se perfila el tramo más externo de cada hilo
+        nivel = getattr(self._local, 'nivel', 0)
+        prof = cProfile.Profile() if self.perfil and nivel == 0 else None
+        self._local.nivel = nivel + 1
+        t = time.perf_counter()
+        if prof:
+            try: prof.enable()
+            except ValueError: prof = None  # otro perfilador activo (p.ej. la app lanzada con python -m cProfile)
+        try: yield
+        finally:
+            if prof: prof.disable()
+            self.registrar(nombre, time.perf_counter() - t)
+            self._local.nivel = nivel
+            if prof: self._volcar(prof, nombre)
+
+    def _volcar(self, prof, nombre):
+        os.makedirs(self.perfil, exist_ok=True)
+        prof.dump_stats(os.path.join(self.perfil, f"{re.sub(r'[^A-Za-z0-9_]+', '_', nombre)}_{time.strftime('%Y%m%d_%H%M%S')}_{time.perf_counter_ns() % 10**6:06d}.prof"))
+
+    def medir(self, nombre, fn, *args, **kwargs):
+        with self.tramo(nombre): return fn(*args, **kwargs)
+
+    def registrar(self, nombre, segundos):
+        with self._lock:
+            self._lat[nombre].append(segundos)
+            self._n[nombre] += 1
+
+    def resumen(self):
+        """Por etapa: llamadas totales y p50/p95/máx (ms) de las últimas MUESTRAS."""
+        with self._lock:
+            out = {}
+            for nombre, lat in self._lat.items():
+                s = sorted(lat)
+                pct = lambda q: s[min(len(s) - 1, int(q * len(s)))] * 1000
+                out[nombre] = {'llamadas': self._n[nombre], 'p50_ms': pct(.5), 'p95_ms': pct(.95), 'max_ms': s[-1] * 1000}
+            return out
+
+    def limpiar(self):
+        with self._lock: self._lat.clear(); self._n.clear()
+
+    def volcados(self, n=20):
+        """Los `n` volcados .prof más recientes de la carpeta de perfiles (ruta completa)."""
+        carpeta = self.perfil or CARPETA_PERFIL
+        if not os.path.isdir(carpeta): return []
+        rutas = [os.path.join(carpeta, f) for f in os.listdir(carpeta) if f.endswith('.prof')]
+        return sorted(rutas, key=os.path.getmtime, reverse=True)[:n]
+
+TRAMOS = Tramos()
+tramo = TRAMOS.tramo
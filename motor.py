@@ -0,0 +1,178 @@
+# ==============================================================================
+# MOTOR DE CÁLCULO HYDROLOGIC
+# Lógica de dimensionado sin dependencias de Streamlit, Supabase ni FPDF.
+# ==============================================================================
+
+MODO_RO = "Planta Completa (RO)"
+MODO_DESCAL = "Solo Descalcificación"
+NOTA_SALINIDAD = "Nota: Eficiencia reducida por alta salinidad."
+
+from catalogo import _num, actual as catalogo_actual
+
+# Catálogo base (catalogo.json). Las listas se mantienen por compatibilidad; calcular() usa los índices del catálogo.
+CATALOGO_BASE = catalogo_actual()
+ro_db, silex_db, carbon_db, descal_db = CATALOGO_BASE.ro, CATALOGO_BASE.silex, CATALOGO_BASE.carbon, CATALOGO_BASE.descal
+
+# Tramos (límite superior exclusivo en L/h, resultado). El último tramo no tiene límite.
+TRAMOS_BOMBA = [(2000, ("0.75 CV", 0.55)), (4000, ("1.0 CV", 0.75)), (6000, ("1.5 CV", 1.1)), (10000, ("2.0 CV", 1.5)), (15000, ("3.0 CV", 2.2)), (None, ("5.5 CV", 4.0))]
+TRAMOS_TUBERIA = [(1500, '3/4"'), (3000, '1"'), (5000, '1 1/4"'), (9000, '1 1/2"'), (20000, '2"'), (None, '2 1/2"')]
+
+def _tramo(tramos, caudal_lh):
+    for limite, valor in tramos:
+        if limite is None or caudal_lh < limite: return valor
+
+def calcular_bomba(caudal_lh):
+    return _tramo(TRAMOS_BOMBA, caudal_lh)
+
+def calcular_tuberia(caudal_lh):
+    return _tramo(TRAMOS_TUBERIA, caudal_lh)
+
+# Selección de equipos con los índices del catálogo (dos bisecciones por familia)
+def _descal_para(cat, q, carga):
+    """Primer descalcificador con caudal suficiente y >= 5 días de autonomía; si ninguno llega, el mayor. None si no hay caudal."""
+    ix = cat.idx_descal
+    i = ix.rango_a(lambda c: (c * 1000) >= q)
+    if not ix.primero(i): return None
+    j = ix.rango_b(lambda cap: (cap/carga if carga>0 else 99) >= 5)
+    return ix.primero(i, j) or ix.ultimo(i)
+
+def _ro_para(cat, ppm, tcf, horas, q_target):
+    ix = cat.idx_ro
+    i, j = ix.rango_a(lambda mp: ppm <= mp), ix.rango_b(lambda p: ((p * tcf / 24) * horas) >= q_target)
+    if not ix.primero(i, j): return None
+    return (ix.preferido(i, j) or ix.ultimo(i, j)) if q_target > 600 else ix.primero(i, j)
+
+def _filtro_para(ix, q):
+    return ix.primero(ix.rango_a(lambda c: (c * 1000) >= q))
+
+# --- FIX: UNIFICACIÓN DE NOMBRE DE VARIABLE (man_buffer) ---
+def calcular(origen, modo, consumo, caudal_punta, ppm, dureza, temp, horas, costes, buffer_on, descal_on, man_fin, man_buffer, cat=None, elegidos=None):
+    """`elegidos` (dict ro/silex/carbon/descal) sustituye a la selección por índices: lo usa tablas.calcular_tabla."""
+    if cat is None: cat = catalogo_actual()
+    res = {}
+    msgs = []
+    fs = 1.2 if origen == "Pozo" else 1.0
+    res['v_final'] = man_fin if man_fin > 0 else max(consumo * 0.75, caudal_punta * 60)
+    
+    if modo == "Solo Descalcificación":
+        q_target = (consumo / horas) * fs
+        carga = (consumo/1000)*dureza
+        res['descal'] = elegidos['descal'] if elegidos else _descal_para(cat, q_target, carga)
+        if res['descal']:
+            res['dias'] = res['descal'].capacidad / carga if carga > 0 else 99
+            res['sal_anual'] = (365/res['dias']) * res['descal'].sal_kg
+            res['opex'] = res['sal_anual'] * costes['sal']
+            res['wash'] = res['descal'].caudal_wash * 1000
+            res['q_filtros'] = q_target
+        
+        q_bomba = max(res.get('q_filtros', 0), res.get('wash', 0))
+        res['bomba_nom'], res['bomba_kw'] = calcular_bomba(q_bomba)
+        # Aquí usamos man_buffer para el depósito de agua bruta
+        res['v_raw'] = man_buffer if man_buffer > 0 else res.get('wash', 0) * 0.4
+    else: 
+        tcf = 1.0 if temp >= 25 else max(1.0 - ((25 - temp) * 0.03), 0.1)
+        factor_recuperacion = 0.8 if ppm > 2500 else 1.0
+        if ppm > 2500: msgs.append(NOTA_SALINIDAD)
+        q_target = consumo
+        res['ro'] = elegidos['ro'] if elegidos else _ro_para(cat, ppm, tcf, horas, q_target)
+        
+        if res['ro']:
+            res['efi_real'] = res['ro'].eficiencia * factor_recuperacion
+            res['q_prod_hora'] = (res['ro'].produccion_nominal * tcf) / 24
+            agua_in = consumo / res['efi_real']
+            q_bomba = (res['ro'].produccion_nominal / 24 / res['ro'].eficiencia) * 1.5
+            
+            if buffer_on:
+                q_filtros = (agua_in / 20) * fs 
+                # Aquí usamos man_buffer para el depósito intermedio
+                res['v_buffer'] = man_buffer if man_buffer > 0 else q_bomba * 2
+            else:
+                q_filtros = q_bomba * fs 
+                res['v_buffer'] = 0
+            res['q_filtros'] = q_filtros
+            
+            res['silex'] = elegidos['silex'] if elegidos else _filtro_para(cat.idx_silex, q_filtros)
+            res['carbon'] = elegidos['carbon'] if elegidos else _filtro_para(cat.idx_carbon, q_filtros)
+            
+            if descal_on and dureza > 5:
+                carga = (agua_in/1000)*dureza
+                res['descal'] = elegidos['descal'] if elegidos else _descal_para(cat, q_filtros, carga)
+                if res['descal']:
+                    res['dias'] = res['descal'].capacidad / carga if carga > 0 else 99
+                    res['sal_anual'] = (365/res['dias']) * res['descal'].sal_kg
+                    res['wash'] = res['descal'].caudal_wash * 1000
+            
+            kwh = (consumo / res['q_prod_hora']) * res['ro'].potencia_kw * 365
+            sal = res.get('sal_anual', 0)
+            m3 = (agua_in/1000)*365
+            res['opex'] = (kwh*costes['luz']) + (sal*costes['sal']) + (m3*costes['agua'])
+            res['breakdown'] = {'Agua': m3*costes['agua'], 'Sal': sal*costes['sal'], 'Luz': kwh*costes['luz']}
+            res['wash'] = max((res['silex'].caudal_wash if res.get('silex') else 0), (res['carbon'].caudal_wash if res.get('carbon') else 0), (res['descal'].caudal_wash if res.get('descal') else 0)) * 1000
+            
+            q_bomba_aporte = max(res['q_filtros'], res['wash'])
+            res['bomba_nom'], res['bomba_kw'] = calcular_bomba(q_bomba_aporte)
+            # Y aquí si quisiéramos otro depósito bruto manual, necesitaríamos otro input, 
+            # pero por ahora asumimos automático para el bruto en modo RO.
+            res['v_raw'] = res['wash'] * 0.35 
+            
+            kwh_ap = (consumo / res['q_filtros']) * res['bomba_kw'] * 365 
+            res['opex'] += (kwh_ap * costes['luz'])
+            res['breakdown']['Luz'] += (kwh_ap * costes['luz'])
+            
+        else: res['ro'] = None
+
+    max_flow = max(res.get('q_filtros', 0), res.get('wash', 0))
+    res['tuberia'] = calcular_tuberia(max_flow)
+    res['msgs'] = msgs
+    return res
+
+# ==============================================================================
+# ENTRADAS / SALIDAS PLANAS (lotes, línea de comandos, API)
+# ==============================================================================
+# Valores por defecto de la interfaz para los campos que falten en la entrada.
+DEFECTOS = {
+    'origen': "Red Pública", 'modo': MODO_RO, 'caudal_punta': 40, 'ppm': 0, 'dureza': 0, 'temp': 25, 'horas': 20,
+    'buffer_on': True, 'descal_on': True, 'man_fin': 0, 'man_buffer': 0, 'coste_agua': 1.5, 'coste_sal': 0.45, 'coste_luz': 0.20,
+}
+ENTRADAS = ['origen', 'modo', 'consumo'] + [k for k in DEFECTOS if k not in ('origen', 'modo')]
+SALIDAS = ['ro', 'silex', 'carbon', 'descal', 'efi_real', 'q_prod_hora', 'q_filtros', 'v_final', 'v_buffer', 'v_raw', 'dias', 'sal_anual',
+           'wash', 'opex', 'opex_agua', 'opex_sal', 'opex_luz', 'bomba_nom', 'bomba_kw', 'tuberia', 'msgs', 'solucion']
+VERDADEROS = {'1', 'true', 'si', 'sí', 's', 'yes', 'y', 'x'}
+NAN, INF = float('nan'), float('inf')
+
+def a_bool(v):
+    return str(v).strip().lower() in VERDADEROS if isinstance(v, str) else bool(v)
+
+def calcular_fila(fila, cat=None):
+    """calcular() a partir de un dict con claves ENTRADAS (las ausentes o vacías toman DEFECTOS). Solo 'consumo' es obligatoria."""
+    d = {**DEFECTOS, **{k: v for k, v in fila.items() if v is not None and v != ""}}
+    if 'consumo' not in d: raise ValueError("Falta el campo obligatorio 'consumo'")
+    n = lambda k: _num(d[k])
+    costes = {'agua': n('coste_agua'), 'sal': n('coste_sal'), 'luz': n('coste_luz')}
+    return calcular(str(d['origen']), str(d['modo']), n('consumo'), n('caudal_punta'), n('ppm'), n('dureza'), n('temp'), n('horas'), costes,
+                    a_bool(d['buffer_on']), a_bool(d['descal_on']), n('man_fin'), n('man_buffer'), cat)
+
+def aplanar(res):
+    """Convierte el dict de motor.calcular() en una fila con las columnas SALIDAS."""
+    fila = {k: (res[k].nombre if res.get(k) else None) for k in ('ro', 'silex', 'carbon', 'descal')}
+    for k in ('efi_real', 'q_prod_hora', 'q_filtros', 'v_final', 'v_buffer', 'v_raw', 'dias', 'sal_anual', 'wash', 'opex'):
+        fila[k] = res.get(k, NAN)
+    bd = res.get('breakdown', {})
+    fila['opex_agua'], fila['opex_sal'], fila['opex_luz'] = bd.get('Agua', NAN), bd.get('Sal', NAN), bd.get('Luz', NAN)
+    fila['bomba_nom'], fila['bomba_kw'] = res.get('bomba_nom'), res.get('bomba_kw', NAN)
+    fila['tuberia'], fila['msgs'] = res['tuberia'], " | ".join(res['msgs'])
+    fila['solucion'] = bool(res.get('ro') or res.get('descal'))
+    return {k: fila[k] for k in SALIDAS}
+
+def error_no_finito(salida):
+    """Mensaje si alguna salida es infinita (entradas desorbitadas); None si todas son finitas o NaN."""
+    infinitos = [k for k, v in salida.items() if isinstance(v, float) and v in (INF, -INF)]
+    return f"Resultado no finito en {', '.join(infinitos)}: revise los valores de entrada" if infinitos else None
+
+def dimensionar_fila(fila, cat=None):
+    """Entrada + SALIDAS en un dict serializable (NaN -> None). Si la fila no se puede calcular, devuelve la entrada con 'error'."""
+    try: res = aplanar(calcular_fila(fila, cat))
+    except (ValueError, TypeError, ArithmeticError) as e: return {**fila, 'error': str(e) or type(e).__name__}
+    error = error_no_finito(res)
+    if error: return {**fila, 'error': error}
+    return {**fila, **{k: (None if isinstance(v, float) and v != v else v) for k, v in res.items()}}
@@ -0,0 +1,172 @@
+# ==============================================================================
+# OPTIMIZADOR DE COSTE DE CICLO DE VIDA
+# Explora las combinaciones viables osmosis x silex x carbón x descal x bomba y devuelve el frente de
+# Pareto (CAPEX, OPEX anual) ordenado por CAPEX + N años de OPEX. Misma física y costes que motor.calcular.
+# Sin producto cartesiano: por familia de filtros solo se combinan los equipos no dominados en (precio,
+# caudal de lavado) a partir del caudal exigido (tablas precalculadas por catálogo), la bomba es el tramo
+# mínimo (los mayores cuestan más y gastan más) y cada osmosis se descarta si su cota inferior (con mínimos
+# de precio y sal del descal precalculados por catálogo) ya está dominada por una solución encontrada.
+# ==============================================================================
+from bisect import bisect_left
+
+from motor import MODO_RO, TRAMOS_BOMBA, catalogo_actual
+
+ANIOS = 10
+DIAS_MIN_REGEN = 5
+
+# Precio estimado (€) cuando el catálogo no trae `precio`. Orientativo: solo sirve para comparar alternativas.
+def precio_estimado(familia, e):
+    if e.precio: return e.precio
+    if familia == 'ro': return 600 + 0.45 * e.produccion_nominal + 1500 * e.potencia_kw
+    if familia == 'descal': return 300 + 450 * e.caudal_max + 2.5 * e.capacidad
+    return 250 + 450 * e.caudal_max
+
+def precio_bomba(kw):
+    return 250 + 350 * kw
+
+def _pareto(puntos):
+    """Índices de los puntos no dominados (minimizar todas las coordenadas). Empates exactos: se conserva uno."""
+    orden = sorted(range(len(puntos)), key=lambda i: puntos[i])
+    frente = []
+    for i in orden:
+        p = puntos[i]
+        if not any(all(a <= b for a, b in zip(puntos[j], p)) for j in frente): frente.append(i)
+    return frente
+
+class _Frentes:
+    """Para una familia de filtros: por cada umbral de caudal, los equipos no dominados en (precio, lavado) con caudal suficiente."""
+    def __init__(self, equipos, familia):
+        eqs = sorted(equipos, key=lambda e: e.caudal_max)
+        self.caudales = [e.caudal_max * 1000 for e in eqs]
+        self.frentes = [None] * (len(eqs) + 1)
+        self.frentes[len(eqs)] = []
+        for i in range(len(eqs) - 1, -1, -1):
+            cand = self.frentes[i + 1] + [(precio_estimado(familia, eqs[i]), eqs[i].caudal_wash * 1000, eqs[i])]
+            self.frentes[i] = [cand[k] for k in _pareto([c[:2] for c in cand])]
+
+    def viables(self, q):
+        return self.frentes[bisect_left(self.caudales, q)]
+
+class _Descales:
+    """
+    Descalcificadores ordenados por caudal, con el mínimo precio y el mínimo coste de sal relativo de cada sufijo:
+    cotas inferiores baratas para podar osmosis antes de construir sus opciones de descal.
+    """
+    def __init__(self, equipos):
+        self.equipos = sorted(equipos, key=lambda e: e.caudal_max)
+        self.caudales = [e.caudal_max * 1000 for e in self.equipos]
+        n = len(self.equipos)
+        self.precio, self.ratio, self.sal = [float('inf')] * (n + 1), [float('inf')] * (n + 1), [float('inf')] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            e = self.equipos[i]
+            self.precio[i] = min(self.precio[i + 1], precio_estimado('descal', e))
+            self.ratio[i] = min(self.ratio[i + 1], e.sal_kg / e.capacidad if e.capacidad > 0 else float('inf'))
+            self.sal[i] = min(self.sal[i + 1], e.sal_kg)
+
+    def cota(self, q, carga, precio_sal, sin_descal):
+        """(precio, sal anual) mínimos de las opciones de opciones(); (0, 0) si cabe ir sin descal."""
+        i = bisect_left(self.caudales, q)
+        if sin_descal or i == len(self.equipos): return 0, 0
+        sal = 365 * carga * precio_sal * self.ratio[i] if carga > 0 else (365 / 99) * precio_sal * self.sal[i]
+        return self.precio[i], sal * (1 - 1e-9)  # holgura de redondeo: la cota nunca supera el valor real
+
+    def opciones(self, q, carga, precio_sal, sin_descal):
+        """Opciones de descalcificador: (precio, lavado, coste sal anual, equipo, días) no dominadas; None = sin descal."""
+        viables = self.equipos[bisect_left(self.caudales, q):]
+        holgados = [d for d in viables if (d.capacidad / carga if carga > 0 else 99) >= DIAS_MIN_REGEN]
+        ops = []
+        for d in holgados or viables:
+            dias = d.capacidad / carga if carga > 0 else 99
+            ops.append((precio_estimado('descal', d), d.caudal_wash * 1000, (365 / dias) * d.sal_kg * precio_sal, d, dias))
+        if sin_descal or not ops: ops.append((0, 0, 0, None, None))
+        return [ops[k] for k in _pareto([o[:3] for o in ops])]
+
+_tablas = {}
+
+def _tablas_de(cat):
+    t = _tablas.get(id(cat))
+    if t is None or t[0] is not cat:
+        t = _tablas[id(cat)] = (cat, _Frentes(cat.silex, 'silex'), _Frentes(cat.carbon, 'carbon'), _Descales(cat.descal))
+        while len(_tablas) > 4: _tablas.pop(next(iter(_tablas)))
+    return t[1:]
+
+def _bomba(q):
+    """Tramo mínimo de bomba para el caudal (el mismo que motor.calcular_bomba)."""
+    for limite, (nombre, kw) in TRAMOS_BOMBA:
+        if limite is None or q < limite: return nombre, kw
+
+def optimizar(origen, modo, consumo, ppm, dureza, temp, horas, costes, buffer_on, descal_on, anios=ANIOS, sin_descal=None, cat=None):
+    """
+    Frente de Pareto (CAPEX, OPEX) de las combinaciones viables, ordenado por coste total a `anios` años.
+    `sin_descal` permite la alternativa sin descalcificador (por defecto solo si descal_on es False o la dureza no lo exige).
+    """
+    if cat is None: cat = catalogo_actual()
+    fs = 1.2 if origen == "Pozo" else 1.0
+    usa_descal = descal_on and dureza > 5
+    if sin_descal is None: sin_descal = not usa_descal
+    sols = []
+    if modo != MODO_RO:
+        q = (consumo / horas) * fs
+        carga = (consumo / 1000) * dureza
+        for pd_, wd, sal, d, dias in _tablas_de(cat)[2].opciones(q, carga, costes['sal'], False):
+            if d is None: continue
+            nombre, kw = _bomba(max(q, wd))
+            sols.append({'ro': None, 'silex': None, 'carbon': None, 'descal': d, 'bomba': nombre, 'dias': dias,
+                         'capex': pd_ + precio_bomba(kw), 'opex': sal})
+        return _ordenar(sols, anios)
+
+    silex, carbon, descal = _tablas_de(cat)
+    tcf = 1.0 if temp >= 25 else max(1.0 - ((25 - temp) * 0.03), 0.1)
+    fr = 0.8 if ppm > 2500 else 1.0
+    candidatos = []
+    for ro in cat.ro:
+        if ppm > ro.max_ppm or (ro.produccion_nominal * tcf / 24) * horas < consumo: continue
+        efi = ro.eficiencia * fr
+        q_prod = ro.produccion_nominal * tcf / 24
+        agua_in = consumo / efi
+        q_bomba = (ro.produccion_nominal / 24 / ro.eficiencia) * 1.5
+        q_filtros = (agua_in / 20) * fs if buffer_on else q_bomba * fs
+        s_ops = silex.viables(q_filtros) or [(0, 0, None)]
+        c_ops = carbon.viables(q_filtros) or [(0, 0, None)]
+        carga = (agua_in / 1000) * dureza
+        con_descal = usa_descal or sin_descal
+        d_min = descal.cota(q_filtros, carga, costes['sal'], sin_descal) if con_descal else (0, 0)
+        opex_ro = (consumo / q_prod) * ro.potencia_kw * 365 * costes['luz'] + (agua_in / 1000) * 365 * costes['agua']
+        kw_min = _bomba(q_filtros)[1]
+        cota = (precio_estimado('ro', ro) + min(o[0] for o in s_ops) + min(o[0] for o in c_ops) + d_min[0] + precio_bomba(kw_min),
+                opex_ro + d_min[1] + (consumo / q_filtros) * kw_min * 365 * costes['luz'])
+        candidatos.append((cota, ro, q_filtros, s_ops, c_ops, (carga, con_descal), opex_ro))
+
+    # Ramificación y poda: las osmosis con mejor cota primero; una cota dominada no puede aportar al frente
+    candidatos.sort(key=lambda c: c[0][0] + anios * c[0][1])
+    frente = []
+    for (cota, ro, q_filtros, s_ops, c_ops, (carga, con_descal), opex_ro) in candidatos:
+        if any(f[0] <= cota[0] and f[1] <= cota[1] for f in frente): continue
+        # las opciones de descal (lo caro) solo para las osmosis que sobreviven a la poda
+        d_ops = descal.opciones(q_filtros, carga, costes['sal'], sin_descal) if con_descal else [(0, 0, 0, None, None)]
+        capex_ro = precio_estimado('ro', ro)
+        luz = (consumo / q_filtros) * 365 * costes['luz']
+        pc_min, pd_min, sal_min = min(o[0] for o in c_ops), min(o[0] for o in d_ops), min(o[2] for o in d_ops)
+        # cotas parciales: con el silex (y luego el carbón) fijado, el resto al mínimo y la bomba de lo ya elegido
+        dominada = lambda capex, opex: any(f[0] <= capex and f[1] <= opex for f in frente)
+        for ps, ws, s in s_ops:
+            kw = _bomba(max(q_filtros, ws))[1]
+            if dominada(capex_ro + ps + pc_min + pd_min + precio_bomba(kw), opex_ro + sal_min + luz * kw): continue
+            for pc, wc, c in c_ops:
+                w = max(q_filtros, ws, wc)
+                kw = _bomba(w)[1]
+                if dominada(capex_ro + ps + pc + pd_min + precio_bomba(kw), opex_ro + sal_min + luz * kw): continue
+                for pd_, wd, sal, d, dias in d_ops:
+                    nombre, kw = _bomba(max(w, wd))
+                    capex = capex_ro + ps + pc + pd_ + precio_bomba(kw)
+                    opex = opex_ro + sal + luz * kw
+                    if dominada(capex, opex): continue
+                    frente = [f for f in frente if not (capex <= f[0] and opex <= f[1])] + [(capex, opex)]
+                    sols.append({'ro': ro, 'silex': s, 'carbon': c, 'descal': d, 'bomba': nombre, 'dias': dias, 'capex': capex, 'opex': opex})
+    return _ordenar(sols, anios)
+
+def _ordenar(sols, anios):
+    """Filtra a no dominadas (CAPEX, OPEX) y ordena por CAPEX + anios * OPEX."""
+    frente = [sols[k] for k in _pareto([(s['capex'], s['opex']) for s in sols])]
+    for s in frente: s['total'] = s['capex'] + anios * s['opex']
+    return sorted(frente, key=lambda s: s['total'])
@@ -0,0 +1,69 @@
+# ==============================================================================
+# RECURSOS POR EMPRESA Y LÍMITE DE SESIÓN
+# Lo que es igual para todas las sesiones de una empresa (marca y logo preparado) se construye una vez
+# y se comparte de solo lectura (la app lo envuelve en st.cache_resource). Lo que vive en cada sesión
+# se mide y, por encima de MAX_SESION, se sueltan las entradas que se pueden reconstruir.
+# ==============================================================================
+import os
+import shutil
+import sys
+import tempfile
+import time
+import weakref
+
+MAX_SESION = int(os.environ.get("HYDROLOGIC_MAX_SESION", 16 * 2**20))   # bytes por sesión
+SOLTABLES = ('barrido', 'historial')  # cachés de la sesión que se rehacen solas si desaparecen
+CARPETA_LOTES = os.environ.get("HYDROLOGIC_LOTES") or os.path.join(tempfile.gettempdir(), "hydrologic_lotes")
+EDAD_LOTES = 24 * 3600   # segundos: carpetas de lote huérfanas (proceso caído) que se purgan al crear otra
+
+def marca(empresa, logo_url):
+    """Marca de una empresa: nombre, URL del logo y el logo ya preparado en PNG (bytes); el de HYDROLOGIC si no tiene."""
+    from informe import logo_base, logo_local
+    ruta = logo_local(logo_url) or logo_base()
+    with open(ruta, 'rb') as f: logo = f.read()
+    return {'empresa': empresa or "HYDROLOGIC", 'logo_url': logo_url or "", 'logo': logo}
+
+class CarpetaTemporal:
+    """
+    Carpeta en CARPETA_LOTES que vive lo que este objeto: se borra al soltarlo (otro lote, fin de la sesión)
+    o con borrar(). Al crearla se purgan las de más de EDAD_LOTES que quedaron de procesos caídos.
+    """
+    def __init__(self, prefijo="lote_", base=CARPETA_LOTES, edad=EDAD_LOTES):
+        os.makedirs(base, exist_ok=True)
+        limite = time.time() - edad
+        for f in os.listdir(base):
+            ruta = os.path.join(base, f)
+            try:
+                if os.path.getmtime(ruta) < limite: shutil.rmtree(ruta, ignore_errors=True)
+            except OSError: pass
+        self.ruta = tempfile.mkdtemp(prefix=prefijo, dir=base)
+        self._fin = weakref.finalize(self, shutil.rmtree, self.ruta, True)
+
+    def borrar(self): self._fin()
+
+def peso(v, _vistos=None):
+    """Bytes aproximados de `v`: DataFrames y arrays por su memoria real, objetos con peso() por su método."""
+    vistos = set() if _vistos is None else _vistos
+    if id(v) in vistos: return 0
+    vistos.add(id(v))
+    if hasattr(v, 'peso'): return v.peso()
+    if hasattr(v, 'memory_usage'):
+        m = v.memory_usage(deep=True)
+        return int(m.sum() if hasattr(m, 'sum') else m)
+    if hasattr(v, 'nbytes'): return int(v.nbytes)
+    if isinstance(v, dict): return sys.getsizeof(v) + sum(peso(k, vistos) + peso(x, vistos) for k, x in v.items())
+    if isinstance(v, (list, tuple, set, frozenset)): return sys.getsizeof(v) + sum(peso(x, vistos) for x in v)
+    return sys.getsizeof(v)
+
+def acotar_sesion(estado, max_bytes=MAX_SESION, soltables=SOLTABLES):
+    """
+    Si el estado de la sesión (st.session_state o dict) pasa de `max_bytes`, borra las entradas `soltables`
+    de mayor a menor hasta quedar por debajo. Devuelve los bytes que quedan.
+    """
+    pesos = {k: peso(estado[k]) for k in list(estado.keys())}
+    total = sum(pesos.values())
+    for k in sorted((k for k in pesos if k in soltables), key=pesos.get, reverse=True):
+        if total <= max_bytes: break
+        del estado[k]
+        total -= pesos[k]
+    return total
@@ -0,0 +1,169 @@
+# ==============================================================================
+# SIMULACIÓN TEMPORAL DE LA PLANTA
+# Paso a paso (minuto u hora) sobre un perfil de demanda: red -> depósito bruto -> bomba -> filtros
+# (+ descal) -> buffer -> osmosis -> depósito final -> consumo. Incluye contralavados de filtros y
+# regeneraciones del descalcificador; informa de déficit, arranques y energía. El bucle se compila
+# con numba si está instalado (un año a 1 minuto en milisegundos); si no, corre en Python puro.
+# ==============================================================================
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # mismo código, sin compilar
+    njit = lambda *a, **k: (lambda f: f)
+
+HISTERESIS = 0.7          # la bomba / la osmosis arrancan por debajo del 70% del depósito y paran al llenarlo
+LAVADO_CADA_H = 72        # contralavado de silex/carbón
+LAVADO_MIN = 15
+REGEN_MIN = 60
+DESCAL_CONTINUO = ('TWIN', 'DUPLEX', 'BI BLOC')  # dos columnas: sigue dando agua mientras regenera
+
+# Reparto horario del consumo diario (pesos relativos por hora, 0-23)
+PERFILES = {
+    'constante': [1] * 24,
+    'diurno': [0.2] * 7 + [1, 1.5, 1.5, 1.5, 1.5, 1.5, 1.5, 1.5, 1.5, 1.5, 1.5, 1.5, 1, 0.6] + [0.2] * 3,
+    'hotel': [0.3] * 6 + [1.2, 2.5, 2.5, 1.5, 1, 0.8, 0.8, 0.8, 0.6, 0.6, 0.8, 1, 1.5, 2.2, 2.2, 1.5, 0.8, 0.5],
+}
+
+def perfil_demanda(consumo, dias=365, paso_min=1, forma='diurno', ruido=0.0, semilla=0):
+    """Litros consumidos en cada paso. Cada día suma `consumo`; `ruido` (0-1) reparte el consumo del día al azar."""
+    pasos_hora = 60 / paso_min
+    if pasos_hora != int(pasos_hora) or paso_min > 60: raise ValueError("paso_min debe dividir 60")
+    pesos = np.repeat(np.asarray(PERFILES[forma] if isinstance(forma, str) else forma, float), int(pasos_hora))
+    dem = np.tile(pesos, dias).reshape(dias, -1)
+    if ruido: dem = dem * np.random.default_rng(semilla).lognormal(0, ruido, dem.shape)
+    return (dem / dem.sum(axis=1, keepdims=True) * consumo).ravel()
+
+@njit(cache=True)
+def _simular(dem, v_raw, v_buf, v_fin, r_red, r_bomba, r_ro, efi, con_ro, con_buffer,
+             lav_cada, lav_pasos, r_lav, cap_descal, dureza, regen_pasos, r_regen, continuo, serie):
+    raw, buf, fin = v_raw, v_buf, v_fin
+    ro_on = bomba_on = bomba_prev = ro_prev = False
+    lav_rest = regen_rest = 0
+    prox_lav = lav_cada
+    carga = deficit = agua_red = agua_lav = falta_lav = 0.0
+    fin_min = v_fin
+    sin_agua = pasos_bomba = pasos_ro = arr_bomba = arr_ro = lavados = regens = 0
+    for t in range(dem.shape[0]):
+        entra = min(r_red, v_raw - raw)
+        raw += entra; agua_red += entra
+        # Eventos: contralavado periódico y regeneración al agotar la capacidad del descal
+        if lav_pasos > 0 and t >= prox_lav:
+            lav_rest = lav_pasos; prox_lav += lav_cada; lavados += 1
+        if cap_descal > 0 and carga >= cap_descal and regen_rest == 0:
+            regen_rest = regen_pasos; carga -= cap_descal; regens += 1
+        bloqueado = lav_rest > 0 or (regen_rest > 0 and not continuo)
+        bomba = False
+        if lav_rest > 0:
+            w = min(r_lav, raw); raw -= w; agua_lav += w; falta_lav += r_lav - w; lav_rest -= 1; bomba = True
+        if regen_rest > 0:
+            w = min(r_regen, raw); raw -= w; agua_lav += w; falta_lav += r_regen - w; regen_rest -= 1
+        tratada = 0.0
+        if fin < HISTERESIS * v_fin: ro_on = True
+        produce = False
+        if con_ro:
+            if ro_on:
+                p = min(r_ro, v_fin - fin)
+                f = p / efi
+                disp = buf if con_buffer else (0.0 if bloqueado else min(raw, r_bomba))
+                if f > disp:
+                    f = disp; p = f * efi
+                if con_buffer: buf -= f
+                else:
+                    raw -= f; tratada = f
+                    if f > 0: bomba = True
+                fin += p
+                produce = p > 0
+                if fin >= v_fin: ro_on = False
+            if con_buffer:
+                if buf < HISTERESIS * v_buf: bomba_on = True
+                if bomba_on and not bloqueado:
+                    w = min(r_bomba, raw, v_buf - buf)
+                    raw -= w; buf += w; tratada = w
+                    if w > 0: bomba = True
+                    if buf >= v_buf: bomba_on = False
+        elif ro_on and not bloqueado:
+            w = min(r_bomba, raw, v_fin - fin)
+            raw -= w; fin += w; tratada = w
+            if w > 0: bomba = True
+            if fin >= v_fin: ro_on = False
+        carga += tratada / 1000 * dureza
+        if produce:
+            pasos_ro += 1
+            if not ro_prev: arr_ro += 1
+        if bomba:
+            pasos_bomba += 1
+            if not bomba_prev: arr_bomba += 1
+        ro_prev, bomba_prev = produce, bomba
+        d = dem[t]
+        s = min(d, fin)
+        fin -= s
+        if d - s > 1e-9:
+            deficit += d - s; sin_agua += 1
+        if fin < fin_min: fin_min = fin
+        if serie.shape[0]:
+            serie[t, 0] = raw; serie[t, 1] = buf; serie[t, 2] = fin
+    return deficit, sin_agua, pasos_bomba, pasos_ro, arr_bomba, arr_ro, lavados, regens, agua_red, agua_lav, falta_lav, fin_min
+
+def simular(res, demanda, paso_min=1, dureza=0, q_red=None, lavado_cada_h=LAVADO_CADA_H, series=False):
+    """
+    Simula el diseño `res` (resultado de motor.calcular) con la demanda `demanda` (litros por paso de `paso_min`).
+    `q_red` es el caudal disponible de la acometida en L/h (por defecto la acometida mínima recomendada, res['wash']).
+    Devuelve un dict de indicadores; con `series=True` añade 'niveles' (pasos x [bruto, buffer, final], litros).
+    """
+    dem = np.ascontiguousarray(demanda, dtype=np.float64)
+    dt = paso_min / 60
+    con_ro = bool(res.get('ro'))
+    if not (con_ro or res.get('descal')): raise ValueError("Diseño sin solución")
+    q_filtros = res['q_filtros']
+    q_red = q_red if q_red is not None else max(res.get('wash', 0), q_filtros)
+    v_buf = float(res.get('v_buffer', 0) or 0) if con_ro else 0.0
+    con_buffer = v_buf > 0
+    # Depósito bruto: sin volumen, la red alimenta directamente (lo que entra en el paso)
+    v_raw = max(float(res.get('v_raw', 0) or 0), q_red * dt)
+    q_ro = res['q_prod_hora'] if con_ro else 0.0
+    efi = res['efi_real'] if con_ro else 1.0
+    filtros = [res[k] for k in ('silex', 'carbon') if res.get(k)]
+    q_lav = max((f.caudal_wash for f in filtros), default=0) * 1000
+    d = res.get('descal')
+    # Lavado y regeneración duran lo que duran: el volumen se reparte entre los pasos que ocupan (al menos uno)
+    pasos_lav = max(1, int(round(LAVADO_MIN / paso_min))) if filtros else 0
+    pasos_regen = max(1, int(round(REGEN_MIN / paso_min)))
+    r_lav = q_lav * LAVADO_MIN / 60 / pasos_lav if filtros else 0.0
+    r_regen = d.caudal_wash * 1000 * REGEN_MIN / 60 / pasos_regen if d else 0.0
+    serie = np.zeros((len(dem), 3) if series else (0, 3))
+    r = _simular(dem, v_raw, v_buf, float(res['v_final']), q_red * dt, q_filtros * dt, q_ro * dt, efi, con_ro, con_buffer,
+                 max(1, int(lavado_cada_h * 60 / paso_min)), pasos_lav, r_lav,
+                 float(d.capacidad) if d and dureza > 0 else 0.0, float(dureza), pasos_regen,
+                 r_regen, bool(d and any(p in d.nombre for p in DESCAL_CONTINUO)), serie)
+    deficit, sin_agua, pasos_bomba, pasos_ro, arr_bomba, arr_ro, lavados, regens, agua_red, agua_lav, falta_lav, fin_min = r
+    total = float(dem.sum())
+    horas_bomba, horas_ro = pasos_bomba * dt, pasos_ro * dt
+    out = {
+        'dias': len(dem) * dt / 24, 'demanda_l': total, 'deficit_l': deficit, 'cobertura': 1 - deficit / total if total else 1.0,
+        'minutos_sin_agua': sin_agua * paso_min, 'nivel_min_final': fin_min / res['v_final'] if res['v_final'] else 0.0,
+        'arranques_bomba': arr_bomba, 'arranques_ro': arr_ro, 'horas_bomba': horas_bomba, 'horas_ro': horas_ro,
+        'kwh_bomba': horas_bomba * res.get('bomba_kw', 0), 'kwh_ro': horas_ro * (res['ro'].potencia_kw if con_ro else 0),
+        'lavados': lavados, 'regeneraciones': regens, 'sal_kg': regens * (d.sal_kg if d else 0),
+        'agua_red_l': agua_red, 'agua_lavado_l': agua_lav, 'falta_lavado_l': falta_lav,
+    }
+    out['kwh'] = out['kwh_bomba'] + out['kwh_ro']
+    if series: out['niveles'] = serie
+    return out
+
+def deposito_minimo(res, demanda, paso_min=1, dureza=0, q_red=None, tolerancia=0.01):
+    """
+    Menor depósito final (L) con el que la demanda se cubre sin déficit, por bisección sobre simular().
+    None si ni con 10 veces el depósito del diseño se cubre (falta producción, no almacenamiento).
+    """
+    cubre = lambda v: simular({**res, 'v_final': v}, demanda, paso_min, dureza, q_red)['deficit_l'] <= 1e-6
+    hi = float(res['v_final'])
+    if not cubre(hi):
+        lo, hi = hi, hi * 10
+        if not cubre(hi): return None
+    else: lo = 0.0
+    while hi - lo > tolerancia * hi:
+        mid = (lo + hi) / 2
+        if cubre(mid): hi = mid
+        else: lo = mid
+    return hi
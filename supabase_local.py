@@ -0,0 +1,139 @@
+# ==============================================================================
+# SUPABASE LOCAL (SQLite)
+# Sustituto en proceso del cliente de Supabase para pruebas y pruebas de carga. Implementa el
+# subconjunto de la API fluida que usa la aplicación:
+#   table(t).select(cols, count=).eq/neq/gt/gte/lt/lte/ilike/in_(...).order(col, desc=).range(a, b).limit(n).execute()
+#   table(t).insert(fila | [filas]).execute()    table(t).update({...}).eq(...).execute()    table(t).delete().eq(...).execute()
+#   storage.from_(bucket).upload(ruta, bytes, opciones) / get_public_url(ruta)
+# `latencia` (segundos) simula el viaje de ida y vuelta de cada petición.
+# ==============================================================================
+import json
+import sqlite3
+import threading
+import time
+
+class Respuesta:
+    def __init__(self, data, count=None):
+        self.data, self.count = data, count
+
+class _Consulta:
+    _OPS = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+    def __init__(self, cliente, tabla):
+        self.c, self.tabla = cliente, tabla
+        self.accion, self.valores, self.cols, self.contar = 'select', None, '*', None
+        self.filtros, self.args, self.orden, self.desde, self.hasta = [], [], [], None, None
+
+    def select(self, cols='*', count=None):
+        self.accion, self.cols, self.contar = 'select', cols, count
+        return self
+
+    def insert(self, filas):
+        self.accion, self.valores = 'insert', filas if isinstance(filas, list) else [filas]
+        return self
+
+    def update(self, valores):
+        self.accion, self.valores = 'update', valores
+        return self
+
+    def delete(self):
+        self.accion = 'delete'
+        return self
+
+    def _filtro(self, col, sql, valor):
+        self.filtros.append(f"json_extract(datos, ?) {sql}"); self.args += [f"$.{col}", valor]
+        return self
+
+    def __getattr__(self, nombre):
+        if nombre in self._OPS: return lambda col, valor: self._filtro(col, f"{self._OPS[nombre]} ?", valor)
+        raise AttributeError(nombre)
+
+    def ilike(self, col, patron):
+        return self._filtro(col, "LIKE ?", patron)
+
+    def in_(self, col, valores):
+        valores = list(valores)
+        self.filtros.append(f"json_extract(datos, ?) IN ({','.join('?' * len(valores)) or 'NULL'})"); self.args += [f"$.{col}"] + valores
+        return self
+
+    def order(self, col, desc=False):
+        self.orden.append(f"json_extract(datos, '$.{col}') {'DESC' if desc else 'ASC'}")
+        return self
+
+    def range(self, desde, hasta):
+        self.desde, self.hasta = desde, hasta
+        return self
+
+    def limit(self, n):
+        self.desde, self.hasta = self.desde or 0, (self.desde or 0) + n - 1
+        return self
+
+    def execute(self):
+        return self.c._ejecutar(self)
+
+class _Cubo:
+    def __init__(self, cliente, nombre):
+        self.c, self.nombre = cliente, nombre
+
+    def upload(self, ruta, datos, opciones=None):
+        self.c._peticion()
+        with self.c._lock: self.c.ficheros[(self.nombre, ruta)] = bytes(datos)
+        return Respuesta({'Key': f"{self.nombre}/{ruta}"})
+
+    def get_public_url(self, ruta):
+        return f"local://{self.nombre}/{ruta}"
+
+class _Storage:
+    def __init__(self, cliente): self.c = cliente
+    def from_(self, nombre): return _Cubo(self.c, nombre)
+
+class ClienteLocal:
+    def __init__(self, ruta=":memory:", latencia=0.0):
+        self.latencia = latencia
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS filas (tabla TEXT NOT NULL, id INTEGER PRIMARY KEY AUTOINCREMENT, datos TEXT NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS filas_tabla ON filas (tabla)")
+        self._lock = threading.Lock()
+        self.ficheros = {}
+        self.peticiones = 0
+        self.storage = _Storage(self)
+
+    def table(self, nombre):
+        return _Consulta(self, nombre)
+
+    def _peticion(self):
+        with self._lock: self.peticiones += 1
+        if self.latencia: time.sleep(self.latencia)
+
+    def _ejecutar(self, q):
+        self._peticion()
+        donde = " AND ".join(["tabla = ?"] + q.filtros)
+        args = [q.tabla] + q.args
+        with self._lock:
+            if q.accion == 'insert':
+                filas = []
+                for v in q.valores:
+                    cur = self._db.execute("INSERT INTO filas (tabla, datos) VALUES (?, ?)", (q.tabla, json.dumps(v)))
+                    filas.append({'id': cur.lastrowid, **v})
+                self._db.commit()
+                return Respuesta(filas)
+            if q.accion == 'update':
+                ids = [r[0] for r in self._db.execute(f"SELECT id FROM filas WHERE {donde}", args)]
+                for i in ids:
+                    (datos,) = self._db.execute("SELECT datos FROM filas WHERE id = ?", (i,)).fetchone()
+                    self._db.execute("UPDATE filas SET datos = ? WHERE id = ?", (json.dumps({**json.loads(datos), **q.valores}), i))
+                self._db.commit()
+                return Respuesta([{'id': i} for i in ids])
+            if q.accion == 'delete':
+                n = self._db.execute(f"DELETE FROM filas WHERE {donde}", args).rowcount
+                self._db.commit()
+                return Respuesta([], n)
+            total = self._db.execute(f"SELECT COUNT(*) FROM filas WHERE {donde}", args).fetchone()[0] if q.contar else None
+            sql = f"SELECT id, datos FROM filas WHERE {donde}"
+            if q.orden: sql += " ORDER BY " + ", ".join(q.orden)
+            if q.desde is not None: sql += f" LIMIT {q.hasta - q.desde + 1} OFFSET {q.desde}"
+            filas = [{'id': i, **json.loads(d)} for i, d in self._db.execute(sql, args)]
+        if q.cols != '*':
+            cols = [c.strip() for c in q.cols.split(',')]
+            filas = [{c: f.get(c) for c in cols} for f in filas]
+        return Respuesta(filas, total)
@@ -0,0 +1,239 @@
+# ==============================================================================
+# TABLAS DE DECISIÓN PRECALCULADAS
+# La elección de equipos solo cambia en los umbrales del catálogo. Se precalcula con el motor vectorizado
+# sobre rejillas de entradas cuantizadas (consumo cada PASO_CONSUMO L, horas, temp y dureza enteras; ppm
+# por tramos, que es exacto para cualquier valor) y se guarda en .npy que se abren con mmap, compartidos
+# por todos los procesos. calcular_tabla() elige los equipos por consulta y hace en vivo solo las cuentas
+# continuas (caudales, depósitos, OPEX) con motor.calcular; fuera de la rejilla usa el motor completo.
+#   python tablas.py construir [--carpeta tablas]
+#   python tablas.py verificar [--carpeta tablas] [--muestra 100000]
+# ==============================================================================
+import argparse
+import json
+import os
+import sys
+import time
+from bisect import bisect_left
+
+import numpy as np
+
+from motor import MODO_RO, MODO_DESCAL, aplanar, calcular, catalogo_actual
+
+CARPETA = os.environ.get("HYDROLOGIC_TABLAS") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablas")
+PASO_CONSUMO, MAX_CONSUMO = 100, 50_000
+MAX_HORAS, MAX_DUREZA = 24, 100
+TEMP_PLENA = 25             # desde 25 °C el factor de temperatura es 1: todas comparten fila
+NOMBRES = ('ro', 'silex', 'carbon', 'descal_ro', 'descal')
+# Ejes (el índice de osmosis de las tablas de filtros y descal es el que devuelve la tabla 'ro'):
+#   ro[tramo_ppm, temp-1, horas-1, consumo]              silex/carbon[ro, ppm>2500, pozo, buffer, consumo]
+#   descal_ro[ro, ppm>2500, pozo, buffer, consumo, dureza]   descal[pozo, horas-1, consumo, dureza]
+
+def _tipo(cat):
+    return np.uint8 if max(len(cat.ro), len(cat.silex), len(cat.carbon), len(cat.descal)) < 254 else np.uint16
+
+def _codigos(serie, sin):
+    """Códigos de catálogo de una columna categórica de calcular_lote; `sin` donde no hay equipo."""
+    c = serie.cat.codes.to_numpy()
+    return np.where(c < 0, sin, c)
+
+def _limites(cat):
+    """Umbrales de ppm: los max_ppm del catálogo y la caída de recuperación a 2500 ppm."""
+    return sorted({float(r.max_ppm) for r in cat.ro} | {2500.0})
+
+def _entero(v, lo, hi):
+    try: f = float(v)
+    except (TypeError, ValueError): return None
+    return int(f) if f.is_integer() and lo <= f <= hi else None
+
+class Tablas:
+    def __init__(self, carpeta, meta, arrays):
+        self.carpeta, self.meta, self.version = carpeta, meta, meta['version']
+        # vista ndarray del mmap: la indexación escalar de np.memmap pasa por Python y es varias veces más lenta
+        self.ro, self.silex, self.carbon, self.descal_ro, self.descal = (arrays[k].view(np.ndarray) for k in NOMBRES)
+        self.limites = meta['limites']
+        self.sin, self.fuera_de_tabla = meta['sin'], meta['sin'] - 1
+        self.consultas = self.fallos = 0
+
+    @classmethod
+    def abrir(cls, carpeta=CARPETA, cat=None):
+        """Tablas de `carpeta` mapeadas en memoria; None si no existen o son de otro catálogo (versión o contenido)."""
+        if cat is None: cat = catalogo_actual()
+        try:
+            with open(os.path.join(carpeta, "meta.json")) as f: meta = json.load(f)
+        except (OSError, ValueError): return None
+        if meta.get('version') != cat.version or meta.get('huella') != cat.huella(): return None
+        return cls(carpeta, meta, {k: np.load(os.path.join(carpeta, f"{k}.npy"), mmap_mode='r') for k in NOMBRES})
+
+    def elegir(self, cat, origen, modo, consumo, ppm, dureza, temp, horas, buffer_on, descal_on):
+        """Equipos por consulta (dict para motor.calcular) o None si la entrada cae fuera de la rejilla."""
+        n_c = _entero(consumo, PASO_CONSUMO, MAX_CONSUMO)
+        c = n_c // PASO_CONSUMO - 1 if n_c is not None and n_c % PASO_CONSUMO == 0 else None
+        h, d = _entero(horas, 1, MAX_HORAS), _entero(dureza, 0, MAX_DUREZA)
+        if c is None or h is None: return None
+        pozo = int(origen == "Pozo")
+        eq = lambda db, i: None if i == self.sin else db[i]
+        if modo == MODO_DESCAL:
+            if d is None: return None
+            i = self.descal.item(pozo, h - 1, c, d)
+            return None if i == self.fuera_de_tabla else {'descal': eq(cat.descal, i)}
+        t = _entero(temp, 1, float('inf'))
+        if t is None: return None
+        r = self.ro.item(bisect_left(self.limites, ppm), min(t, TEMP_PLENA) - 1, h - 1, c)
+        if r == self.sin: return {'ro': None}
+        k = (r, int(ppm > 2500), pozo, int(bool(buffer_on)), c)
+        s, cb = self.silex.item(k), self.carbon.item(k)
+        con_descal = descal_on and dureza > 5
+        if con_descal and d is None: return None
+        dr = self.descal_ro.item(k + (d,)) if con_descal else self.sin
+        if self.fuera_de_tabla in (r, s, cb, dr): return None
+        return {'ro': cat.ro[r], 'silex': eq(cat.silex, s), 'carbon': eq(cat.carbon, cb), 'descal': eq(cat.descal, dr)}
+
+def calcular_tabla(origen, modo, consumo, caudal_punta, ppm, dureza, temp, horas, costes, buffer_on, descal_on, man_fin, man_buffer,
+                   cat=None, tablas=None):
+    """motor.calcular() con la selección de equipos por tabla; sin tablas o fuera de la rejilla, el motor completo."""
+    if cat is None: cat = catalogo_actual()
+    elegidos = None
+    if tablas is not None and tablas.version == cat.version:
+        elegidos = tablas.elegir(cat, origen, modo, consumo, ppm, dureza, temp, horas, buffer_on, descal_on)
+        tablas.consultas += 1
+        tablas.fallos += elegidos is None
+    return calcular(origen, modo, consumo, caudal_punta, ppm, dureza, temp, horas, costes, buffer_on, descal_on, man_fin, man_buffer,
+                    cat, elegidos=elegidos)
+
+# ------------------------------------------------------------------------------
+# Construcción (motor vectorizado sobre la rejilla)
+# ------------------------------------------------------------------------------
+def _ejes():
+    return (np.arange(1, MAX_CONSUMO // PASO_CONSUMO + 1) * PASO_CONSUMO, np.arange(1, TEMP_PLENA + 1),
+            np.arange(1, MAX_HORAS + 1), np.arange(0, MAX_DUREZA + 1))
+
+def _representantes(ro, limites, temps, horas, sin):
+    """
+    Por cada celda alcanzable (osmosis, ppm>2500, consumo) una entrada (ppm, temp, horas) que la produce: las tablas
+    de filtros y descal solo se rellenan (y se verifican) en esas celdas.
+    """
+    reps = {}
+    ppms = limites + [limites[-1] + 1]
+    for p, plano in enumerate(ro):
+        fr = int(ppms[p] > 2500)
+        plano = plano.reshape(-1, plano.shape[-1])
+        for c in range(plano.shape[1]):
+            valores, primeros = np.unique(plano[:, c], return_index=True)
+            for v, i in zip(valores, primeros):
+                if v != sin: reps.setdefault((int(v), fr, c), (ppms[p], temps[i // len(horas)], horas[i % len(horas)]))
+    return reps
+
+def construir(carpeta=CARPETA, cat=None, avisar=print):
+    from lote import calcular_lote
+    if cat is None: cat = catalogo_actual()
+    tipo = _tipo(cat)
+    sin = int(np.iinfo(tipo).max)
+    consumos, temps, horas, durezas = _ejes()
+    limites = _limites(cat)
+    ppms = limites + [limites[-1] + 1]
+    nc = len(consumos)
+    t0 = time.perf_counter()
+
+    ro = np.empty((len(ppms), len(temps), len(horas), nc), tipo)
+    T, H, C = (a.ravel() for a in np.meshgrid(temps, horas, consumos, indexing='ij'))
+    for p, ppm in enumerate(ppms):
+        res = calcular_lote({'consumo': C, 'temp': T, 'horas': H}, cat=cat, modo=MODO_RO, ppm=ppm, descal_on=False)
+        ro[p] = _codigos(res['ro'], sin).reshape(ro.shape[1:])
+    avisar(f"ro {ro.shape} · {time.perf_counter() - t0:.1f} s")
+
+    forma = (len(cat.ro), 2, 2, 2, nc)
+    silex, carbon = np.full(forma, sin - 1, tipo), np.full(forma, sin - 1, tipo)
+    descal_ro = np.full(forma + (len(durezas),), sin - 1, tipo)
+    reps = _representantes(ro, limites, temps, horas, sin)
+    claves = list(reps)
+    base = np.array([reps[k] + (consumos[k[2]],) for k in claves], float)
+    for pozo in (0, 1):
+        for buffer in (0, 1):
+            n = len(claves)
+            filas = {'ppm': np.repeat(base[:, 0], len(durezas)), 'temp': np.repeat(base[:, 1], len(durezas)),
+                     'horas': np.repeat(base[:, 2], len(durezas)), 'consumo': np.repeat(base[:, 3], len(durezas)),
+                     'dureza': np.tile(durezas, n)}
+            res = calcular_lote(filas, cat=cat, modo=MODO_RO, origen="Pozo" if pozo else "Red Pública", buffer_on=bool(buffer), descal_on=True)
+            r = np.array([k[0] for k in claves])
+            if (_codigos(res['ro'], sin).reshape(n, -1) != r[:, None]).any(): raise RuntimeError("El representante no reproduce la osmosis de la tabla")
+            fr, c = np.array([k[1] for k in claves]), np.array([k[2] for k in claves])
+            silex[r, fr, pozo, buffer, c] = _codigos(res['silex'], sin).reshape(n, -1)[:, 0]
+            carbon[r, fr, pozo, buffer, c] = _codigos(res['carbon'], sin).reshape(n, -1)[:, 0]
+            descal_ro[r, fr, pozo, buffer, c] = _codigos(res['descal'], sin).reshape(n, -1)
+    avisar(f"silex/carbon/descal_ro · {len(claves):,} celdas alcanzables · {time.perf_counter() - t0:.1f} s")
+
+    descal = np.empty((2, len(horas), nc, len(durezas)), tipo)
+    H, C, D = (a.ravel() for a in np.meshgrid(horas, consumos, durezas, indexing='ij'))
+    for pozo in (0, 1):
+        res = calcular_lote({'consumo': C, 'horas': H, 'dureza': D}, cat=cat, modo=MODO_DESCAL, origen="Pozo" if pozo else "Red Pública")
+        descal[pozo] = _codigos(res['descal'], sin).reshape(descal.shape[1:])
+    avisar(f"descal {descal.shape} · {time.perf_counter() - t0:.1f} s")
+
+    os.makedirs(carpeta, exist_ok=True)
+    for k, a in zip(NOMBRES, (ro, silex, carbon, descal_ro, descal)): np.save(os.path.join(carpeta, f"{k}.npy"), a)
+    meta = {'version': cat.version, 'huella': cat.huella(), 'limites': limites, 'sin': sin, 'paso_consumo': PASO_CONSUMO, 'max_consumo': MAX_CONSUMO,
+            'max_horas': MAX_HORAS, 'max_dureza': MAX_DUREZA, 'temp_plena': TEMP_PLENA}
+    tmp = os.path.join(carpeta, "meta.json.tmp")  # meta.json al final: unas tablas a medio escribir no se abren
+    with open(tmp, 'w') as f: json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(carpeta, "meta.json"))
+    avisar(f"{sum(a.nbytes for a in (ro, silex, carbon, descal_ro, descal)) / 2**20:.1f} MB en {carpeta}")
+
+# ------------------------------------------------------------------------------
+# Verificación exhaustiva contra calcular()
+# ------------------------------------------------------------------------------
+def _celdas(tablas):
+    """Una entrada de calcular() por cada celda alcanzable de las tablas (sin repetir celdas de 'ro')."""
+    consumos, temps, horas, durezas = _ejes()
+    ppms = tablas.limites + [tablas.limites[-1] + 1]
+    for p, ppm in enumerate(ppms):
+        for t in temps:
+            for h in horas:
+                for c in consumos: yield ("Red Pública", MODO_RO, int(c), ppm, 0, int(t), int(h), True, False)
+    for (r, fr, c), (ppm, t, h) in _representantes(tablas.ro, tablas.limites, temps, horas, tablas.sin).items():
+        for pozo in ("Red Pública", "Pozo"):
+            for buffer in (True, False):
+                for d in durezas: yield (pozo, MODO_RO, int(consumos[c]), ppm, int(d), int(t), int(h), buffer, True)
+    for pozo in ("Red Pública", "Pozo"):
+        for h in horas:
+            for c in consumos:
+                for d in durezas: yield (pozo, MODO_DESCAL, int(c), 0, int(d), 25, int(h), False, True)
+
+def _iguales(a, b):
+    return all(x == y or (isinstance(x, float) and isinstance(y, float) and x != x and y != y) for x, y in zip(a.values(), b.values()))
+
+def verificar(carpeta=CARPETA, cat=None, muestra=None, semilla=0, avisar=print):
+    """Compara calcular_tabla() con calcular() en todas las celdas (o en `muestra` al azar). Devuelve las discrepancias."""
+    if cat is None: cat = catalogo_actual()
+    tablas = Tablas.abrir(carpeta, cat)
+    if tablas is None: raise FileNotFoundError(f"No hay tablas para el catálogo {cat.version} en {carpeta}: python tablas.py construir")
+    celdas = _celdas(tablas)
+    if muestra:
+        todas = list(celdas)
+        rng = np.random.default_rng(semilla)
+        celdas = [todas[i] for i in rng.choice(len(todas), min(muestra, len(todas)), replace=False)]
+    costes = {'agua': 1.5, 'sal': 0.45, 'luz': 0.20}
+    malas, n, t0 = [], 0, time.perf_counter()
+    for origen, modo, consumo, ppm, dureza, temp, horas, buffer_on, descal_on in celdas:
+        args = (origen, modo, consumo, 40, ppm, dureza, temp, horas, costes, buffer_on, descal_on, 0, 0, cat)
+        if tablas.elegir(cat, origen, modo, consumo, ppm, dureza, temp, horas, buffer_on, descal_on) is None:
+            malas.append((args[:-1], "fuera de tabla"))
+        elif not _iguales(aplanar(calcular(*args)), aplanar(calcular_tabla(*args, tablas=tablas))):
+            malas.append((args[:-1], "distinto"))
+        n += 1
+        if n % 500_000 == 0: avisar(f"{n:,} celdas · {len(malas)} discrepancias · {time.perf_counter() - t0:.0f} s")
+    avisar(f"{n:,} celdas verificadas · {len(malas)} discrepancias · {time.perf_counter() - t0:.0f} s")
+    return malas
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tablas de decisión precalculadas")
+    ap.add_argument("accion", choices=["construir", "verificar"])
+    ap.add_argument("--carpeta", default=CARPETA)
+    ap.add_argument("--muestra", type=int, default=None, help="verificar solo N celdas al azar")
+    a = ap.parse_args(argv)
+    if a.accion == "construir": construir(a.carpeta); return 0
+    malas = verificar(a.carpeta, muestra=a.muestra)
+    for args, motivo in malas[:20]: print(motivo, args)
+    return 1 if malas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())